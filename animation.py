@@ -0,0 +1,78 @@
+import math
+
+
+def build_steps(graph):
+    # the order in which build_graph used to add nodes and edges, one (nodes, edges) addition per step
+    seen = set()
+    for node in graph.nodes:
+        if node not in seen:
+            seen.add(node)
+            yield [node], []
+        for neighbor in graph.neighbors(node):
+            seen.add(neighbor)
+            yield [neighbor], [(node, neighbor)]
+
+
+class BuildScheduler:
+    # drives the construction animation from root.after callbacks instead of sleeping on the Tk thread, so the
+    # window stays interactive; instant=True (or no root) skips straight to the finished graph
+    def __init__(self, root, renderer, graph, delay=0.5, max_fps=30, max_duration=30, instant=False,
+                 on_done=None):
+        self.root = root
+        self.renderer = renderer
+        self.graph = graph
+        self.on_done = on_done
+        self.instant = instant or root is None or delay <= 0
+        self._steps = build_steps(graph)
+        self._job = None
+        self.done = False
+
+        # the animation keeps its original pace of one addition per delay, but never draws more than max_fps frames
+        # per second and never lasts longer than max_duration
+        num_steps = graph.number_of_nodes() + graph.number_of_edges()
+        duration = min(delay * num_steps, max_duration)
+        frames = max(1, min(num_steps, int(duration * max_fps)))
+        self.per_frame = math.ceil(num_steps / frames) if num_steps else 1
+        self.interval = duration / frames
+
+    def start(self):
+        self.renderer.set_graph(self.graph, visible=self.instant)
+        if self.instant:
+            self._finish()
+        else:
+            self._job = self.root.after(0, self._tick)
+
+    def _tick(self):
+        self._job = None
+        if self.done or self.renderer.graph is not self.graph:
+            # the graph was replaced (Refine, Recover) while animating
+            self.done = True
+            return
+        nodes, edges = [], []
+        for _ in range(self.per_frame):
+            step = next(self._steps, None)
+            if step is None:
+                self._finish()
+                return
+            nodes.extend(step[0])
+            edges.extend(step[1])
+        self.renderer.reveal(nodes, edges)
+        self.renderer.highlight(nodes=nodes, edges=edges)
+        self._job = self.root.after(int(self.interval * 1000), self._tick)
+
+    def skip(self):
+        if not self.done:
+            self._finish()
+
+    def cancel(self):
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+        self.done = True
+
+    def _finish(self):
+        self.cancel()
+        if self.renderer.graph is self.graph:
+            self.renderer.reveal_all()
+        if self.on_done is not None:
+            self.on_done()
@@ -0,0 +1,421 @@
+import bz2
+import os
+import re
+import struct
+import sys
+import numpy as np
+import networkx as nx
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+
+# ROS bag v2.0 record op codes
+OP_BAG_HEADER = 0x03
+OP_INDEX_DATA = 0x04
+OP_CHUNK = 0x05
+OP_CHUNK_INFO = 0x06
+OP_CONNECTION = 0x07
+
+MAGIC = b'#ROSBAG V2.0\n'
+
+_uint32 = struct.Struct('<I')
+_time = struct.Struct('<II')
+
+# struct codes of the fixed-size ROS primitives; byte is signed and char unsigned, as in ROS1
+PRIMITIVES = {'bool': '?', 'int8': 'b', 'uint8': 'B', 'byte': 'b', 'char': 'B', 'int16': 'h', 'uint16': 'H',
+              'int32': 'i', 'uint32': 'I', 'int64': 'q', 'uint64': 'Q', 'float32': 'f', 'float64': 'd',
+              'time': 'II', 'duration': 'ii'}
+NUMPY_TYPES = {'bool': np.bool_, 'int8': np.int8, 'byte': np.int8, 'int16': np.int16, 'uint16': np.uint16,
+               'int32': np.int32, 'uint32': np.uint32, 'int64': np.int64, 'uint64': np.uint64, 'float32': np.float32,
+               'float64': np.float64}
+
+
+def parse_header(buffer):
+    # a record header is a sequence of <uint32 length><name>=<value> fields
+    fields = {}
+    offset = 0
+    while offset < len(buffer):
+        (length,) = _uint32.unpack_from(buffer, offset)
+        offset += 4
+        name, _, value = bytes(buffer[offset:offset + length]).partition(b'=')
+        fields[name.decode('ascii')] = value
+        offset += length
+    return fields
+
+
+def read_record(file, with_data=True):
+    # (header fields, data) of the record at the current file position, or None at the end of the file; with
+    # with_data=False the data is skipped and its (offset, length) returned instead
+    raw = file.read(4)
+    if len(raw) < 4:
+        return None
+    (header_length,) = _uint32.unpack(raw)
+    header = parse_header(file.read(header_length))
+    (data_length,) = _uint32.unpack(file.read(4))
+    if with_data:
+        return header, file.read(data_length)
+    offset = file.tell()
+    file.seek(data_length, os.SEEK_CUR)
+    return header, (offset, data_length)
+
+
+def to_time(secs, nsecs):
+    return secs + nsecs * 1e-9
+
+
+def parse_definition(type_name, text):
+    # {message type: [(field type, field name, array length)]} of a connection's message_definition, where the array
+    # length is None for scalars and -1 for variable-length arrays
+    specs = {}
+    sections = re.split(r'^=+\s*$', text, flags=re.M)
+    for i, section in enumerate(sections):
+        lines = section.strip().splitlines()
+        current = type_name
+        if i > 0:
+            if not lines or not lines[0].startswith('MSG:'):
+                continue
+            current = lines[0][4:].strip()
+            lines = lines[1:]
+        fields = []
+        for line in lines:
+            line = line.split('#', 1)[0].strip()
+            if not line or '=' in line:
+                # comments and constants
+                continue
+            field_type, name = line.split()[:2]
+            length = None
+            match = re.fullmatch(r'(.+)\[(\d*)\]', field_type)
+            if match:
+                field_type, length = match.group(1), int(match.group(2)) if match.group(2) else -1
+            fields.append((field_type, name, length))
+        specs[current] = fields
+    return specs
+
+
+def _resolve(field_type, package, specs):
+    if field_type in PRIMITIVES or field_type == 'string':
+        return field_type
+    if field_type == 'Header':
+        return 'std_msgs/Header'
+    if '/' in field_type:
+        return field_type
+    if f'{package}/{field_type}' in specs:
+        return f'{package}/{field_type}'
+    return next((name for name in specs if name.rsplit('/', 1)[-1] == field_type), field_type)
+
+
+def _read_string(buffer, offset):
+    (length,) = _uint32.unpack_from(buffer, offset)
+    offset += 4
+    return bytes(buffer[offset:offset + length]).decode('utf-8', 'replace'), offset + length
+
+
+def compile_decoder(type_name, specs, _cache=None):
+    # returns decode(buffer, offset) -> (message dict, offset). Runs of scalar primitives are read with one precompiled
+    # struct and primitive arrays become numpy arrays, so a message costs a handful of calls whatever its size
+    cache = {} if _cache is None else _cache
+    if type_name in cache:
+        return cache[type_name]
+    package = type_name.split('/', 1)[0]
+    steps = []
+    scalars = []
+
+    def flush():
+        if scalars:
+            steps.append(_scalar_step(scalars))
+            scalars.clear()
+
+    for field_type, name, length in specs.get(type_name, []):
+        field_type = _resolve(field_type, package, specs)
+        if length is None and field_type in PRIMITIVES:
+            scalars.append((name, PRIMITIVES[field_type]))
+            continue
+        flush()
+        if length is None and field_type == 'string':
+            steps.append(_string_step(name))
+        elif length is None:
+            steps.append(_message_step(name, compile_decoder(field_type, specs, cache)))
+        else:
+            steps.append(_array_step(name, field_type, length, specs, cache))
+    flush()
+
+    def decode(buffer, offset):
+        message = {}
+        for step in steps:
+            offset = step(buffer, offset, message)
+        return message, offset
+
+    cache[type_name] = decode
+    return decode
+
+
+def _scalar_step(scalars):
+    # one struct for a run of (name, code) scalars; time and duration take two slots and become float seconds
+    packed = struct.Struct('<' + ''.join(code for _, code in scalars))
+    names = [name for name, _ in scalars]
+    if all(len(code) == 1 for _, code in scalars):
+        def step(buffer, offset, message):
+            message.update(zip(names, packed.unpack_from(buffer, offset)))
+            return offset + packed.size
+        return step
+
+    layout = [(name, len(code)) for name, code in scalars]
+
+    def step(buffer, offset, message):
+        values = packed.unpack_from(buffer, offset)
+        i = 0
+        for name, width in layout:
+            message[name] = values[i] if width == 1 else to_time(values[i], values[i + 1])
+            i += width
+        return offset + packed.size
+    return step
+
+
+def _string_step(name):
+    def step(buffer, offset, message):
+        message[name], offset = _read_string(buffer, offset)
+        return offset
+    return step
+
+
+def _message_step(name, decode):
+    def step(buffer, offset, message):
+        message[name], offset = decode(buffer, offset)
+        return offset
+    return step
+
+
+def _array_step(name, field_type, length, specs, cache):
+    def count(buffer, offset):
+        if length >= 0:
+            return length, offset
+        return _uint32.unpack_from(buffer, offset)[0], offset + 4
+
+    if field_type in ('uint8', 'char'):
+        def step(buffer, offset, message):
+            size, offset = count(buffer, offset)
+            message[name] = bytes(buffer[offset:offset + size])
+            return offset + size
+    elif field_type in NUMPY_TYPES:
+        dtype = np.dtype(NUMPY_TYPES[field_type]).newbyteorder('<')
+
+        def step(buffer, offset, message):
+            size, offset = count(buffer, offset)
+            message[name] = np.frombuffer(buffer, dtype=dtype, count=size, offset=offset).copy()
+            return offset + size * dtype.itemsize
+    elif field_type in ('time', 'duration'):
+        packed = struct.Struct('<' + PRIMITIVES[field_type])
+
+        def step(buffer, offset, message):
+            size, offset = count(buffer, offset)
+            values = [to_time(*packed.unpack_from(buffer, offset + i * 8)) for i in range(size)]
+            message[name] = values
+            return offset + size * 8
+    elif field_type == 'string':
+        def step(buffer, offset, message):
+            size, offset = count(buffer, offset)
+            values = []
+            for _ in range(size):
+                value, offset = _read_string(buffer, offset)
+                values.append(value)
+            message[name] = values
+            return offset
+    else:
+        decode = compile_decoder(field_type, specs, cache)
+
+        def step(buffer, offset, message):
+            size, offset = count(buffer, offset)
+            values = []
+            for _ in range(size):
+                value, offset = decode(buffer, offset)
+                values.append(value)
+            message[name] = values
+            return offset
+    return step
+
+
+def decompress(compression, data, size):
+    if compression == 'none':
+        return data
+    if compression == 'bz2':
+        return bz2.decompress(data)
+    if compression == 'lz4':
+        if lz4_frame is None:
+            raise ImportError("lz4 compressed bags need the lz4 package (pip install lz4)")
+        return lz4_frame.decompress(data)
+    raise ValueError(f"Unsupported chunk compression {compression}")
+
+
+class BagReader:
+    # reads a ROS1 bag through its index: the connection and chunk info records at the end of the file tell which
+    # chunks hold the requested topics, and the index records after each chunk where their messages are. Only those
+    # chunks are read and decompressed, one at a time
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.file = open(file_path, 'rb')
+        if self.file.read(len(MAGIC)) != MAGIC:
+            self.file.close()
+            raise ValueError(f"{file_path} is not a ROS bag v2.0 file")
+        self.connections = {}
+        self.chunks = []
+        self._decoders = {}
+        self._read_index()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.file.close()
+
+    def _read_index(self):
+        header, _ = read_record(self.file, with_data=False)
+        if header['op'][0] != OP_BAG_HEADER:
+            raise ValueError(f"{self.file_path} does not start with a bag header record")
+        (index_pos,) = struct.unpack('<Q', header['index_pos'])
+        (conn_count,) = _uint32.unpack(header['conn_count'])
+        (chunk_count,) = _uint32.unpack(header['chunk_count'])
+        if index_pos == 0:
+            raise ValueError(f"{self.file_path} is not indexed, run rosbag reindex on it first")
+
+        self.file.seek(index_pos)
+        for _ in range(conn_count):
+            header, data = self._expect(OP_CONNECTION)
+            (conn,) = _uint32.unpack(header['conn'])
+            info = {name: value.decode('utf-8', 'replace') for name, value in parse_header(data).items()}
+            info['topic'] = header['topic'].decode('utf-8', 'replace')
+            self.connections[conn] = info
+        for _ in range(chunk_count):
+            header, data = self._expect(OP_CHUNK_INFO)
+            (chunk_pos,) = struct.unpack('<Q', header['chunk_pos'])
+            counts = {}
+            for offset in range(0, len(data), 8):
+                conn, count = struct.unpack_from('<II', data, offset)
+                counts[conn] = count
+            self.chunks.append({'pos': chunk_pos, 'start_time': to_time(*_time.unpack(header['start_time'])),
+                                'end_time': to_time(*_time.unpack(header['end_time'])), 'counts': counts})
+        self.chunks.sort(key=lambda chunk: chunk['start_time'])
+
+    def _expect(self, op, with_data=True):
+        record = read_record(self.file, with_data)
+        if record is None or record[0].get('op', b'\0')[0] != op:
+            raise ValueError(f"{self.file_path} is truncated or its index is corrupt")
+        return record
+
+    @property
+    def topics(self):
+        # {topic: message type}
+        return {info['topic']: info['type'] for info in self.connections.values()}
+
+    def message_count(self, topics=None):
+        conns = self._conns(topics)
+        return sum(count for chunk in self.chunks for conn, count in chunk['counts'].items() if conn in conns)
+
+    def _conns(self, topics):
+        if topics is None:
+            return set(self.connections)
+        topics = {topics} if isinstance(topics, str) else set(topics)
+        return {conn for conn, info in self.connections.items() if info['topic'] in topics}
+
+    def decoder(self, conn):
+        decode = self._decoders.get(conn)
+        if decode is None:
+            info = self.connections[conn]
+            specs = parse_definition(info['type'], info.get('message_definition', ''))
+            decode = compile_decoder(info['type'], specs)
+            self._decoders[conn] = decode
+        return decode
+
+    def raw_messages(self, topics=None, start_time=None, end_time=None):
+        # (topic, serialized message, time) in time order within each chunk, chunks in start time order
+        for conn, data, time in self._entries(topics, start_time, end_time):
+            yield self.connections[conn]['topic'], data, time
+
+    def messages(self, topics=None, start_time=None, end_time=None):
+        # (topic, message as nested dicts, time)
+        for conn, data, time in self._entries(topics, start_time, end_time):
+            yield self.connections[conn]['topic'], self.decoder(conn)(data, 0)[0], time
+
+    def _entries(self, topics, start_time, end_time):
+        conns = self._conns(topics)
+        for chunk in self.chunks:
+            if not conns.intersection(chunk['counts']):
+                continue
+            if (start_time is not None and chunk['end_time'] < start_time) or \
+                    (end_time is not None and chunk['start_time'] > end_time):
+                continue
+            self.file.seek(chunk['pos'])
+            header, (data_offset, data_length) = self._expect(OP_CHUNK, with_data=False)
+            entries = []
+            # one index record per connection of the chunk follows the chunk record
+            for _ in range(len(chunk['counts'])):
+                index_header, data = self._expect(OP_INDEX_DATA)
+                (conn,) = _uint32.unpack(index_header['conn'])
+                if conn not in conns:
+                    continue
+                for offset in range(0, len(data), 12):
+                    secs, nsecs, message_offset = struct.unpack_from('<III', data, offset)
+                    time = to_time(secs, nsecs)
+                    if (start_time is None or time >= start_time) and (end_time is None or time <= end_time):
+                        entries.append((time, message_offset, conn))
+            if not entries:
+                continue
+
+            self.file.seek(data_offset)
+            (size,) = _uint32.unpack(header['size'])
+            buffer = memoryview(decompress(header['compression'].decode('ascii'), self.file.read(data_length), size))
+            entries.sort()
+            for time, message_offset, conn in entries:
+                (header_length,) = _uint32.unpack_from(buffer, message_offset)
+                offset = message_offset + 4 + header_length
+                (message_length,) = _uint32.unpack_from(buffer, offset)
+                yield conn, buffer[offset + 4:offset + 4 + message_length], time
+
+
+def activity_name(name):
+    # the graph topic keeps the ontology description after granular activity ids, task_graph.txt exports (see
+    # modify_file) only keep the id
+    if name.startswith('GranularActivity_'):
+        return name.split(' ', 1)[0]
+    return name
+
+
+def graph_from_message(message):
+    # an ontology_msgs/Graph message as the DiGraph parse_graph builds from task_graph.txt, in the same node order;
+    # counts are recorded as float32 and turned back into ints
+    graph = nx.DiGraph()
+    for node in message['nodes']:
+        name = activity_name(node['name'])
+        graph.add_node(name)
+        weights = [int(weight) if float(weight).is_integer() else float(weight) for weight in node['weights']]
+        graph.add_edges_from((name, activity_name(neighbor), {'weight': weight})
+                             for neighbor, weight in zip(node['neighbors'], weights))
+    return graph
+
+
+def read_graph_bag(file_path, topic=None):
+    # the last task graph recorded in the bag, on topic or on the first connection carrying ontology_msgs/Graph
+    with BagReader(file_path) as bag:
+        if topic is None:
+            topic = next((name for name, message_type in bag.topics.items() if message_type.endswith('/Graph')), None)
+            if topic is None:
+                raise ValueError(f"{file_path} has no task graph topic")
+        graph = None
+        for _, message, _ in bag.messages(topic):
+            graph = message
+    if graph is None:
+        raise ValueError(f"{file_path} has no message on {topic}")
+    return graph_from_message(graph)
+
+
+if __name__ == "__main__":
+    for path in sys.argv[1:] or ['data/13_demos/task_graph.bag']:
+        with BagReader(path) as bag:
+            print(path)
+            for name, message_type in sorted(bag.topics.items()):
+                print(f"  {name:<24} {message_type:<36} {bag.message_count(name):>8}")
@@ -0,0 +1,480 @@
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+import networkx as nx
+import numpy as np
+import pandas as pd
+import pre_eff
+import profiling
+import utils
+from csr import CSRGraph
+from jobs import JobRunner
+from profiling import peak_memory, timed
+from reference import (EventLoop, reference_curved_label_layout, reference_extract, reference_hit_test,
+                       reference_monte_carlo_widest_path, reference_nx_to_matrix, reference_read_data,
+                       reference_refine_graph, reference_segment_stats, reference_transitions, sequence)
+from rich_index import RichIndex, Refiner
+from synthetic import (random_task_graph, synthetic_activity_log, synthetic_rich_info, write_activity_log,
+                       write_trajectory_log)
+
+
+def bench_widest_path(sizes=(10, 100, 1000, 10000, 100000), iterations=3000, queries=5, seed=0):
+    rng = random.Random(seed)
+    print(f"{'nodes':>8} {'monte carlo (s)':>16} {'exact (s)':>12} {'speedup':>10} {'mc width':>9} {'exact width':>12}")
+    for num_nodes in sizes:
+        graph = random_task_graph(num_nodes, seed=seed)
+        pairs = [tuple(rng.sample(range(num_nodes), 2)) for _ in range(queries)]
+        # a single random walk may cross the whole graph, so large graphs run fewer walks and are scaled up
+        mc_iterations = max(10, min(iterations, iterations * 100 // num_nodes))
+        mc_time, exact_time = 0.0, 0.0
+        mc_widths, exact_widths = [], []
+        for start_node, end_node in pairs:
+            (_, mc_width), elapsed = timed(utils.monte_carlo_widest_path, graph, start_node, end_node,
+                                           iterations=mc_iterations)
+            mc_time += elapsed * iterations / mc_iterations
+            mc_widths.append(mc_width)
+            (_, exact_width), elapsed = timed(utils.widest_path, graph, start_node, end_node)
+            exact_time += elapsed
+            exact_widths.append(exact_width)
+        print(f"{num_nodes:>8} {mc_time / queries:>16.4f} {exact_time / queries:>12.6f} "
+              f"{mc_time / exact_time:>9.0f}x {np.mean(mc_widths):>9.1f} {np.mean(exact_widths):>12.1f}")
+
+
+def bench_extract(sizes=(1000, 10000, 100000), threshold=20, seed=0):
+    print(f"{'rows':>8} {'iterrows (s)':>13} {'vectorized (s)':>15} {'speedup':>10}")
+    for num_rows in sizes:
+        df = sequence(synthetic_activity_log(num_rows, seed=seed))
+        _, reference_time = timed(reference_extract, df, threshold)
+        _, vectorized_time = timed(pre_eff.extract, df, threshold)
+        print(f"{num_rows:>8} {reference_time:>13.4f} {vectorized_time:>15.6f} "
+              f"{reference_time / vectorized_time:>9.0f}x")
+
+
+def bench_refine(sizes=(100, 1000, 10000, 100000), seed=0):
+    print(f"{'nodes':>8} {'edges':>8} {'match loop (s)':>15} {'compile (s)':>12} {'bitset check (s)':>17} "
+          f"{'speedup':>8}")
+    for num_nodes in sizes:
+        graph = random_task_graph(num_nodes, seed=seed)
+        rich_info = synthetic_rich_info(graph.nodes, values_per_attribute=3, seed=seed)
+        _, reference_time = timed(reference_refine_graph, graph, rich_info)
+        index, compile_time = timed(RichIndex, rich_info)
+        edges = list(graph.edges())
+        sources, targets = [u for u, _ in edges], [v for _, v in edges]
+        _, check_time = timed(index.compatible_edges, sources, targets)
+        print(f"{num_nodes:>8} {len(edges):>8} {reference_time:>15.4f} {compile_time:>12.4f} {check_time:>17.4f} "
+              f"{reference_time / check_time:>7.1f}x")
+
+
+def bench_incremental_refine(num_nodes=100000, changed_nodes=20, added_edges=200, seed=0):
+    rng = random.Random(seed)
+    graph = random_task_graph(num_nodes, seed=seed)
+    rich_info = synthetic_rich_info(graph.nodes, values_per_attribute=3, seed=seed)
+    refiner = Refiner(rich_info)
+    _, cold_time = timed(refiner.refine, graph)
+    _, warm_time = timed(refiner.refine, graph)
+
+    changed = rng.sample(list(graph.nodes), changed_nodes)
+    rich_info.update(synthetic_rich_info(changed, values_per_attribute=3, seed=seed + 1))
+    refiner.update(changed)
+    for _ in range(added_edges):
+        graph.add_edge(rng.randrange(num_nodes), rng.randrange(num_nodes), weight=rng.randint(1, 50))
+    _, update_time = timed(refiner.refine, graph)
+    _, full_time = timed(utils.refine_graph, graph, rich_info)
+    print(f"{graph.number_of_edges()} edges: refine_graph {full_time:.4f}s, refiner cold {cold_time:.4f}s, "
+          f"unchanged {warm_time:.4f}s, after {changed_nodes} changed nodes and {added_edges} new edges "
+          f"{update_time:.4f}s")
+
+
+def bench_highlight(sizes=(1000, 10000), clicks=20, seed=0):
+    # headless Agg canvas; set_graph is what every click used to cost, since draw_graph rebuilt the whole scene
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from renderer import GraphRenderer
+
+    rng = random.Random(seed)
+    print(f"{'nodes':>8} {'full redraw (s)':>16} {'highlight (ms)':>15} {'speedup':>10}")
+    for num_nodes in sizes:
+        graph = random_task_graph(num_nodes, out_degree=2, seed=seed)
+        pos = nx.random_layout(graph, seed=seed)
+        fig, ax = plt.subplots(figsize=(10, 7), dpi=100)
+        renderer = GraphRenderer(ax, pos)
+        _, redraw_time = timed(renderer.set_graph, graph)
+        highlight_time = 0.0
+        for _ in range(clicks):
+            start_node, end_node = rng.sample(range(num_nodes), 2)
+            path, _ = utils.widest_path(graph, start_node, end_node)
+            edges = list(zip(path, path[1:]))
+            _, elapsed = timed(renderer.highlight, edges=edges, start=start_node, end=end_node)
+            highlight_time += elapsed
+        plt.close(fig)
+        highlight_time /= clicks
+        print(f"{num_nodes:>8} {redraw_time:>16.3f} {highlight_time * 1000:>15.2f} "
+              f"{redraw_time / highlight_time:>9.0f}x")
+
+
+def bench_hit_test(sizes=(100, 10000, 100000), clicks=2000, seed=0):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from hit_test import HitIndex
+
+    rng = np.random.default_rng(seed)
+    print(f"{'nodes':>8} {'build (ms)':>11} {'loop (ms)':>10} {'index (ms)':>11} {'speedup':>10}")
+    for num_nodes in sizes:
+        pos = dict(enumerate(rng.random((num_nodes, 2))))
+        index, build_time = timed(HitIndex, pos)
+        radius = 0.3 / num_nodes ** 0.5
+        points = rng.random((clicks, 2))
+        start = time.perf_counter()
+        for x, y in points[:20]:
+            reference_hit_test(pos, x, y, radius)
+        loop_time = (time.perf_counter() - start) / 20
+
+        fig, ax = plt.subplots(figsize=(10, 7), dpi=100)
+        ax.set_xlim(0, 1)
+        ax.set_ylim(0, 1)
+        display = ax.transData.transform(points)
+        start = time.perf_counter()
+        for x, y in display:
+            index.node_at(ax, x, y, 12)
+        index_time = (time.perf_counter() - start) / clicks
+        plt.close(fig)
+        print(f"{num_nodes:>8} {build_time * 1000:>11.2f} {loop_time * 1000:>10.3f} {index_time * 1000:>11.3f} "
+              f"{loop_time / index_time:>9.0f}x")
+
+
+def bench_edge_labels(sizes=(100, 1000, 5000), rad=0.1, seed=0):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import my_networkx as my_nx
+
+    print(f"{'labels':>8} {'loop (ms)':>10} {'batched (ms)':>13} {'draw (s)':>9} {'update (ms)':>12}")
+    for num_nodes in sizes:
+        graph = random_task_graph(num_nodes, out_degree=3, seed=seed)
+        pos = nx.random_layout(graph, seed=seed)
+        edges = list(graph.edges)
+        fig, ax = plt.subplots(figsize=(10, 7), dpi=100)
+        _, loop_time = timed(reference_curved_label_layout, ax, pos, edges, rad)
+        _, batched_time = timed(my_nx._curved_label_layout, ax, pos, edges, False, rad)
+        labels = {edge: graph.edges[edge]['weight'] for edge in edges}
+        text_items, draw_time = timed(my_nx.my_draw_networkx_edge_labels, graph, pos, edge_labels=labels, ax=ax,
+                                      rotate=False, rad=rad)
+        moved = nx.random_layout(graph, seed=seed + 1)
+        _, update_time = timed(my_nx.my_update_networkx_edge_labels, text_items, moved, ax=ax, rotate=False, rad=rad)
+        plt.close(fig)
+        print(f"{len(edges):>8} {loop_time * 1000:>10.2f} {batched_time * 1000:>13.2f} {draw_time:>9.3f} "
+              f"{update_time * 1000:>12.2f}")
+
+
+def bench_layout(sizes=(400, 10000, 100000), changed_edges=20, seed=0):
+    # full spring layout (networkx needs scipy from 500 nodes on) against the incremental relaxation after a refine-like
+    # edit, and the cost of a structural-hash hit in the store
+    from layout import LayoutStore, affected_nodes, incremental_layout
+
+    rng = random.Random(seed)
+    print(f"{'nodes':>8} {'spring (s)':>11} {'incremental (s)':>16} {'moved':>6} {'stored hit (s)':>15}")
+    for num_nodes in sizes:
+        graph = random_task_graph(num_nodes, out_degree=2, seed=seed)
+        pos = nx.circular_layout(graph)
+        spring_time = timed(nx.spring_layout, graph, seed=seed)[1] if num_nodes < 500 else float('nan')
+        refined = graph.copy()
+        refined.remove_edges_from(rng.sample(list(graph.edges), changed_edges))
+        affected = affected_nodes(refined, graph)
+        new_pos, incremental_time = timed(incremental_layout, refined, pos, affected)
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            store = LayoutStore('circular', cache_dir=cache_dir)
+            store.store(refined, new_pos)
+            _, hit_time = timed(LayoutStore('circular', cache_dir=cache_dir).update, refined, graph, pos)
+        print(f"{num_nodes:>8} {spring_time:>11.3f} {incremental_time:>16.3f} {len(affected):>6} {hit_time:>15.3f}")
+
+
+def bench_bag(directories=('data/bagfiles', 'data/bagfiles231206'), topic='/unity_data'):
+    # reading one topic through the index against decoding every message of the bag
+    from bag_reader import BagReader
+
+    print(f"{'bag':>24} {'messages':>9} {'all (s)':>8} {topic + ' (s)':>16} {'topic (MB)':>10}")
+    for directory in directories:
+        for file_name in sorted(os.listdir(directory))[:3]:
+            file_path = os.path.join(directory, file_name)
+            with BagReader(file_path) as bag:
+                count, all_time = timed(lambda: sum(1 for _ in bag.messages()))
+                _, topic_time = timed(lambda: sum(1 for _ in bag.messages(topic)))
+                read = sum(len(data) for _, data, _ in bag.raw_messages(topic))
+            print(f"{file_name:>24} {count:>9} {all_time:>8.3f} {topic_time:>16.3f} {read / 2 ** 20:>10.2f}")
+
+
+def bench_read_data(sizes=(10000, 100000, 1000000), seed=0):
+    print(f"{'rows':>8} {'readlines (s)':>14} {'streaming (s)':>14} {'readlines peak':>15} {'streaming peak':>15}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for num_rows in sizes:
+            file_path = os.path.join(tmp_dir, f'data4testing_{num_rows}.txt')
+            write_activity_log(file_path, synthetic_activity_log(num_rows, seed=seed))
+            _, reference_time = timed(reference_read_data, file_path)
+            _, streaming_time = timed(pre_eff.read_data, file_path)
+            _, reference_peak = peak_memory(reference_read_data, file_path)
+            _, streaming_peak = peak_memory(pre_eff.read_data, file_path)
+            print(f"{num_rows:>8} {reference_time:>14.4f} {streaming_time:>14.4f} "
+                  f"{reference_peak / 2 ** 20:>13.1f}MB {streaming_peak / 2 ** 20:>13.1f}MB")
+
+
+def bench_playback(directory='data/playback'):
+    # json.load of the whole document against the streaming reader, and reopening the memory-mapped cache
+    import json
+    import playback
+
+    print(f"{'file':>36} {'json.load (s)':>14} {'stream (s)':>11} {'json peak':>10} {'stream peak':>12} "
+          f"{'cached (ms)':>12}")
+    for file_name in sorted(os.listdir(directory)):
+        file_path = os.path.join(directory, file_name)
+
+        def load_json():
+            with open(file_path) as file:
+                return json.load(file)
+
+        _, json_time = timed(load_json)
+        _, stream_time = timed(playback.read_playback, file_path)
+        _, json_peak = peak_memory(load_json)
+        _, stream_peak = peak_memory(playback.read_playback, file_path)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            playback.load_playback(file_path, cache_dir=cache_dir)
+            _, cached_time = timed(playback.load_playback, file_path, cache_dir=cache_dir)
+        print(f"{file_name:>36} {json_time:>14.4f} {stream_time:>11.4f} {json_peak / 2 ** 20:>8.1f}MB "
+              f"{stream_peak / 2 ** 20:>10.1f}MB {cached_time * 1000:>12.2f}")
+
+
+def bench_trajectory(sizes=(10000, 100000), threshold=20, seed=0):
+    import trajectory
+
+    print(f"{'rows':>8} {'segments':>9} {'loop (s)':>9} {'vectorized (s)':>15} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for num_rows in sizes:
+            demo_file = os.path.join(tmp_dir, 'data4testing_R.txt')
+            trajectory_file = os.path.join(tmp_dir, 'traj_log_right.csv')
+            write_activity_log(demo_file, synthetic_activity_log(num_rows, seed=seed))
+            time_, velocity, position = write_trajectory_log(trajectory_file, num_rows, seed=seed)
+            statistics = trajectory.activity_statistics(demo_file, trajectory_file, threshold)
+
+            sequence = pre_eff.read_data(demo_file)
+            runs = pre_eff.segments(sequence[sequence['Activity'] != 'UnknownActivity'], threshold)
+            _, loop_time = timed(reference_segment_stats, runs, time_, velocity, position)
+            samples, _ = trajectory.read_trajectory(trajectory_file)
+
+            def join():
+                start, stop = trajectory.segment_times(runs, time_)
+                return trajectory.segment_stats(samples, *trajectory.align(samples['time'], start, stop))
+
+            _, vectorized_time = timed(join)
+            print(f"{num_rows:>8} {len(statistics):>9} {loop_time:>9.3f} {vectorized_time:>15.3f} "
+                  f"{loop_time / vectorized_time:>7.0f}x")
+
+
+def bench_transitions(sizes=(100000, 1000000), demos=10, seed=0):
+    # the vectorized count against the pair loop and the cost of adding one demo to an existing counter
+    from transitions import TransitionCounter
+
+    print(f"{'rows':>8} {'loop (s)':>9} {'vectorized (s)':>15} {'speedup':>8} {'add one of':>11} {'add (s)':>8}")
+    for num_rows in sizes:
+        # categorical, as read_data returns the column
+        logs = [pd.Categorical(synthetic_activity_log(num_rows, seed=seed + i)['Activity']) for i in range(demos)]
+        _, loop_time = timed(reference_transitions, np.asarray(logs[0]))
+        counter = TransitionCounter()
+        _, vectorized_time = timed(counter.add_sequence, logs[0])
+        for log in logs[1:-1]:
+            counter.add_sequence(log)
+        _, add_time = timed(counter.add_sequence, logs[-1])
+        print(f"{num_rows:>8} {loop_time:>9.3f} {vectorized_time:>15.3f} {loop_time / vectorized_time:>7.0f}x "
+              f"{demos:>11} {add_time:>8.3f}")
+
+
+def bench_live(sizes=(10000, 100000), appends=20, batch=50, threshold=20, seed=0):
+    # a poll after a small batch of rows is appended to both demo files, against ActivityProcessor and the transition
+    # counts run again over the whole files
+    from live import LiveSession
+    from transitions import TransitionCounter
+
+    print(f"{'rows':>8} {'batch':>6} {'full (s)':>9} {'poll (s)':>9} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for num_rows in sizes:
+            logs = {file_name: synthetic_activity_log(num_rows + appends * batch, seed=seed + i)
+                    for i, file_name in enumerate(pre_eff.ActivityProcessor.demo_files)}
+            for file_name, df in logs.items():
+                write_activity_log(os.path.join(tmp_dir, file_name), df.iloc[:num_rows])
+            session = LiveSession(tmp_dir, threshold)
+            session.catch_up()
+
+            poll_time = full_time = 0.0
+            for i in range(appends):
+                for file_name, df in logs.items():
+                    with open(os.path.join(tmp_dir, file_name), 'a') as file:
+                        for row in df.iloc[num_rows + i * batch:num_rows + (i + 1) * batch].itertuples(index=False):
+                            file.write('\t'.join(row) + '\t\n')
+                _, elapsed = timed(session.poll)
+                poll_time += elapsed
+                _, elapsed = timed(lambda: (pre_eff.ActivityProcessor(tmp_dir, threshold).rich_info,
+                                            TransitionCounter.from_paths(tmp_dir).graph()))
+                full_time += elapsed
+            print(f"{num_rows:>8} {batch:>6} {full_time / appends:>9.4f} {poll_time / appends:>9.4f} "
+                  f"{full_time / poll_time:>7.0f}x")
+
+
+def bench_k_widest(sizes=(1000, 10000, 100000), k=5, queries=5, seed=0):
+    # the widest path against the first and a repeated query of the k widest
+    rng = random.Random(seed)
+    print(f"{'nodes':>8} {'widest (s)':>11} {f'{k} widest (s)':>13} {'cached (s)':>11}")
+    for num_nodes in sizes:
+        graph = random_task_graph(num_nodes, seed=seed)
+        pairs = [tuple(rng.sample(range(num_nodes), 2)) for _ in range(queries)]
+        cache = utils.PathCache()
+        widest_time = k_time = cached_time = 0.0
+        for start_node, end_node in pairs:
+            _, elapsed = timed(utils.widest_path, graph, start_node, end_node)
+            widest_time += elapsed
+            _, elapsed = timed(cache.get, graph, start_node, end_node, k)
+            k_time += elapsed
+            _, elapsed = timed(cache.get, graph, start_node, end_node, k - 1)
+            cached_time += elapsed
+        print(f"{num_nodes:>8} {widest_time / queries:>11.4f} {k_time / queries:>13.4f} {cached_time / queries:>11.6f}")
+
+
+def bench_profiling(calls=100000):
+    # per call cost of an instrumented function: disabled, timing only and with tracemalloc peaks
+    @profiling.stage('bench')
+    def stage():
+        pass
+
+    def plain():
+        pass
+
+    def run(function):
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        return (time.perf_counter() - start) / calls * 1e6
+
+    baseline = run(plain)
+    print(f"{'mode':>10} {'per call (us)':>14} {'overhead (us)':>14}")
+    for mode, enable in (('disabled', profiling.disable), ('timing', profiling.enable),
+                         ('memory', lambda: profiling.enable(trace_memory=True))):
+        enable()
+        try:
+            elapsed = run(stage)
+        finally:
+            profiling.disable()
+            profiling.reset()
+        print(f"{mode:>10} {elapsed:>14.3f} {elapsed - baseline:>14.3f}")
+
+
+def bench_csr(sizes=(1000, 10000, 100000), queries=5, seed=0):
+    # conversion, memory per edge, and widest path and refine on the arrays against the networkx versions
+    rng = random.Random(seed)
+    print(f"{'nodes':>8} {'to csr (s)':>11} {'nx B/edge':>10} {'csr B/edge':>11} {'widest nx (s)':>14} "
+          f"{'widest csr (s)':>15} {'refine nx (s)':>14} {'refine csr (s)':>15}")
+    for num_nodes in sizes:
+        tracemalloc.start()
+        graph = random_task_graph(num_nodes, seed=seed)
+        graph_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        arrays, convert_time = timed(CSRGraph.from_networkx, graph)
+
+        nx_time = csr_time = 0.0
+        for _ in range(queries):
+            start_node, end_node = rng.sample(range(num_nodes), 2)
+            _, elapsed = timed(utils.widest_path, graph, start_node, end_node)
+            nx_time += elapsed
+            _, elapsed = timed(utils.widest_path, arrays, start_node, end_node)
+            csr_time += elapsed
+
+        rich_info = synthetic_rich_info(graph.nodes, values_per_attribute=3, seed=seed)
+        _, refine_nx_time = timed(utils.refine_graph, graph, rich_info)
+        _, refine_csr_time = timed(utils.refine_graph, arrays, rich_info)
+
+        num_edges = graph.number_of_edges()
+        print(f"{num_nodes:>8} {convert_time:>11.4f} {graph_bytes / num_edges:>10.0f} "
+              f"{arrays.nbytes / num_edges:>11.1f} {nx_time / queries:>14.4f} {csr_time / queries:>15.4f} "
+              f"{refine_nx_time:>14.4f} {refine_csr_time:>15.4f}")
+
+
+def bench_adjacency_matrix(sizes=(1000, 5000, 100000), dense_limit=5000, seed=0):
+    # sparse export against the per-edge dense fill, and its cost on graphs the dense matrix cannot hold
+    print(f"{'nodes':>8} {'dense (s)':>10} {'dense MB':>9} {'sparse (s)':>11} {'sparse MB':>10} {'float32 MB':>11}")
+    for num_nodes in sizes:
+        graph = random_task_graph(num_nodes, seed=seed)
+        (matrix, _), sparse_time = timed(utils.adjacency_matrix, graph)
+        small, _ = utils.adjacency_matrix(graph, dtype=np.float32)
+        sparse_bytes = matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+        small_bytes = small.data.nbytes + small.indices.nbytes + small.indptr.nbytes
+        dense_time = dense_bytes = np.nan
+        if num_nodes <= dense_limit:
+            dense, dense_time = timed(reference_nx_to_matrix, graph)
+            dense_bytes = dense.nbytes
+        print(f"{num_nodes:>8} {dense_time:>10.4f} {dense_bytes / 2 ** 20:>9.1f} {sparse_time:>11.4f} "
+              f"{sparse_bytes / 2 ** 20:>10.2f} {small_bytes / 2 ** 20:>11.2f}")
+
+
+def bench_monte_carlo(sizes=(1000, 10000, 100000), iterations=3000, patience=2, seed=0):
+    # the old one-walk-at-a-time loop against the batched walks, with and without stopping early
+    print(f"{'nodes':>8} {'loop (s)':>9} {'batched (s)':>12} {f'patience {patience} (s)':>15} {'loop width':>11} "
+          f"{'batched width':>14} {'exact width':>12}")
+    for num_nodes in sizes:
+        graph = random_task_graph(num_nodes, seed=seed)
+        start_node, end_node = 0, num_nodes // 2
+        # the loop is timed on fewer walks and scaled up
+        loop_iterations = max(10, min(iterations, iterations * 100 // num_nodes))
+        (_, loop_width), loop_time = timed(reference_monte_carlo_widest_path, graph, start_node, end_node,
+                                           loop_iterations)
+        (_, width), batched_time = timed(utils.monte_carlo_widest_path, graph, start_node, end_node, iterations,
+                                         seed=seed)
+        _, patience_time = timed(utils.monte_carlo_widest_path, graph, start_node, end_node, iterations, seed=seed,
+                                 patience=patience)
+        _, exact_width = utils.widest_path(graph, start_node, end_node)
+        print(f"{num_nodes:>8} {loop_time * iterations / loop_iterations:>9.3f} {batched_time:>12.3f} "
+              f"{patience_time:>15.3f} {loop_width:>11} {width:>14} {exact_width:>12}")
+
+
+def bench_jobs(sizes=(10000, 100000), k=20, seed=0):
+    # time the Tk thread spends submitting a path query, and how long a superseded query keeps the worker from the
+    # next one
+    rng = random.Random(seed)
+    print(f"{'nodes':>8} {'submit (ms)':>12} {'query (s)':>10} {'superseded (s)':>15}")
+    for num_nodes in sizes:
+        graph = random_task_graph(num_nodes, seed=seed)
+        first, second = [tuple(rng.sample(range(num_nodes), 2)) for _ in range(2)]
+        _, query_time = timed(utils.k_widest_paths, graph, *second, k)
+        loop = EventLoop()
+        runner = JobRunner(loop)
+        _, submit_time = timed(runner.submit, 'paths', utils.k_widest_paths, graph, *first, k)
+        time.sleep(0.2)
+        start = time.perf_counter()
+        runner.submit('paths', utils.k_widest_paths, graph, *second, k)
+        loop.run_while(lambda: runner.busy)
+        elapsed = time.perf_counter() - start
+        runner.shutdown()
+        print(f"{num_nodes:>8} {submit_time * 1000:>12.3f} {query_time:>10.3f} {elapsed:>15.3f}")
+
+
+if __name__ == "__main__":
+    bench_widest_path()
+    bench_extract()
+    bench_read_data()
+    bench_refine()
+    bench_incremental_refine()
+    bench_highlight()
+    bench_hit_test()
+    bench_edge_labels()
+    bench_layout()
+    bench_bag()
+    bench_playback()
+    bench_trajectory()
+    bench_transitions()
+    bench_live()
+    bench_k_widest()
+    bench_profiling()
+    bench_csr()
+    bench_adjacency_matrix()
+    bench_monte_carlo()
+    bench_jobs()
@@ -0,0 +1,158 @@
+import heapq
+import networkx as nx
+import numpy as np
+
+
+def _sparse():
+    # scipy is only needed for the sparse matrix export
+    try:
+        import scipy.sparse
+    except ImportError:
+        raise ImportError("sparse matrices need the scipy package (pip install scipy)") from None
+    return scipy.sparse
+
+
+class CSRGraph:
+    # weighted digraph as compressed sparse rows over interned node ids: the out edges of node i are
+    # targets[indptr[i]:indptr[i + 1]] with the same slice of weights, and every node name is stored once in names.
+    # About 12 bytes per edge against a few hundred for networkx's dict of dicts
+    def __init__(self, names, indptr, targets, weights):
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.targets = np.asarray(targets, dtype=np.int32)
+        self.weights = np.asarray(weights)
+
+    @classmethod
+    def from_edges(cls, names, sources, targets, weights):
+        # edges as arrays of node ids in any order; the edges of a node keep their relative order
+        sources = np.asarray(sources, dtype=np.int64)
+        order = np.argsort(sources, kind='stable')
+        indptr = np.zeros(len(names) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=len(names)), out=indptr[1:])
+        return cls(names, indptr, np.asarray(targets)[order], np.asarray(weights)[order])
+
+    @classmethod
+    def from_networkx(cls, graph, weight='weight'):
+        # nodes in graph order and edges in adjacency order, so to_networkx gives the same graph back. Edges without
+        # a weight are left out, as the path searches skip them
+        names = list(graph)
+        index = {name: i for i, name in enumerate(names)}
+        targets, weights = [], []
+        degrees = np.zeros(len(names) + 1, dtype=np.int64)
+        for i, neighbors in enumerate(graph.adj.values(), 1):
+            for neighbor, data in neighbors.items():
+                if weight in data:
+                    targets.append(index[neighbor])
+                    weights.append(data[weight])
+            degrees[i] = len(targets)
+        return cls(names, degrees, targets, weights)
+
+    def to_networkx(self, weight='weight'):
+        graph = nx.DiGraph()
+        graph.add_nodes_from(self.names)
+        names = self.names
+        graph.add_edges_from((names[u], names[v], {weight: w}) for u, v, w in
+                             zip(self.sources().tolist(), self.targets.tolist(), self.weights.tolist()))
+        return graph
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def number_of_nodes(self):
+        return len(self.names)
+
+    def number_of_edges(self):
+        return len(self.targets)
+
+    @property
+    def nbytes(self):
+        # the arrays only; names are shared with the graph they came from
+        return self.indptr.nbytes + self.targets.nbytes + self.weights.nbytes
+
+    def ids(self, nodes):
+        return np.fromiter((self.index[node] for node in nodes), dtype=np.int64)
+
+    def sources(self):
+        # the source id of every edge, aligned with targets and weights
+        return np.repeat(np.arange(len(self.names), dtype=np.int32), np.diff(self.indptr))
+
+    def degrees(self):
+        return np.diff(self.indptr)
+
+    def neighbors(self, node_id):
+        start, stop = self.indptr[node_id], self.indptr[node_id + 1]
+        return self.targets[start:stop], self.weights[start:stop]
+
+    def edge_subgraph(self, keep):
+        # the same nodes with only the edges where the boolean mask keep is set
+        indptr = np.zeros_like(self.indptr)
+        np.cumsum(np.bincount(self.sources()[keep], minlength=len(self.names)), out=indptr[1:])
+        graph = CSRGraph.__new__(CSRGraph)
+        graph.names, graph.index = self.names, self.index
+        graph.indptr, graph.targets, graph.weights = indptr, self.targets[keep], self.weights[keep]
+        return graph
+
+    def to_sparse(self, format='csr', dtype=None):
+        # n x n weight matrix in node order: 'csr' shares targets and the weights, 'coo' takes the row of every edge
+        # from sources(). dtype (np.float32, np.int32, ...) converts the weights. scipy wants indices and indptr of
+        # one dtype, so the int32 targets are kept by passing indptr as int32, which is copied instead (one entry per
+        # node); only graphs of more than 2**31 edges get their targets copied to int64
+        sparse = _sparse()
+        weights = self.weights if dtype is None else self.weights.astype(dtype, copy=False)
+        shape = (len(self.names), len(self.names))
+        if format == 'csr':
+            if len(self.targets) < np.iinfo(np.int32).max:
+                return sparse.csr_array((weights, self.targets, self.indptr.astype(np.int32)), shape=shape)
+            return sparse.csr_array((weights, self.targets, self.indptr), shape=shape)
+        if format == 'coo':
+            return sparse.coo_array((weights, (self.sources(), self.targets)), shape=shape)
+        raise ValueError(f"Unsupported sparse format {format}")
+
+    def reverse(self):
+        return CSRGraph.from_edges(self.names, self.targets, self.sources(), self.weights)
+
+    def lists(self):
+        # indptr, targets and weights as Python lists, which pure Python searches index much faster than arrays. A
+        # fresh copy on every call, for the length of one search, so the graph itself stays at its arrays
+        return self.indptr.tolist(), self.targets.tolist(), self.weights.tolist()
+
+
+def widest_path(graph, start_node, end_node):
+    # utils.widest_path on the arrays, settling nodes in the same order, with each relaxation a few list lookups
+    # instead of nested dict views. The lists are dropped with the search, converting them is a few percent of it
+    if start_node not in graph.index or end_node not in graph.index:
+        return None, -np.inf
+    start, end = graph.index[start_node], graph.index[end_node]
+    indptr, targets, weights = graph.lists()
+    best_width = [-np.inf] * len(graph.names)
+    best_width[start] = np.inf
+    previous = [-1] * len(graph.names)
+    done = bytearray(len(graph.names))
+    heap = [(-np.inf, 0, start)]
+    counter = 1
+    while heap:
+        neg_width, _, current = heapq.heappop(heap)
+        if done[current]:
+            continue
+        if current == end:
+            path = []
+            while current != -1:
+                path.append(graph.names[current])
+                current = previous[current]
+            return path[::-1], -neg_width
+        done[current] = 1
+        for j in range(indptr[current], indptr[current + 1]):
+            neighbor = targets[j]
+            if done[neighbor]:
+                continue
+            width = min(-neg_width, weights[j])
+            if width > best_width[neighbor]:
+                best_width[neighbor] = width
+                previous[neighbor] = current
+                heapq.heappush(heap, (-width, counter, neighbor))
+                counter += 1
+    return None, -np.inf
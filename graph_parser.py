@@ -0,0 +1,93 @@
+import hashlib
+import os
+import pickle
+import networkx as nx
+import profiling
+from bag_reader import read_graph_bag
+
+
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'rich_graph')
+
+_memory_cache = {}
+
+
+def read_graph(file_path):
+    # task_graph.txt is a dump of nodes[] entries, each holding a name, a neighbors[] list and a matching weights[] list
+    graph = nx.DiGraph()
+    current_node = None
+    neighbors, weights = [], []
+
+    with open(file_path, 'r') as file:
+        for line in file:
+            key, sep, value = line.strip().partition(':')
+            kind = key.partition('[')[0]
+            if kind == 'name':
+                if current_node is not None:
+                    graph.add_edges_from(
+                        (current_node, neighbor, {'weight': weight}) for neighbor, weight in zip(neighbors, weights))
+                current_node = value.strip()
+                neighbors, weights = [], []
+                graph.add_node(current_node)
+            elif current_node is None or not sep:
+                continue
+            elif kind == 'neighbors':
+                neighbors.append(value.strip())
+            elif kind == 'weights':
+                weights.append(int(value))
+
+    if current_node is not None:
+        graph.add_edges_from(
+            (current_node, neighbor, {'weight': weight}) for neighbor, weight in zip(neighbors, weights))
+    return graph
+
+
+def read_cache(cache_file, stamp):
+    # the cached object, or None when it is missing, unreadable or was stored under another stamp
+    if not os.path.exists(cache_file):
+        return None
+    try:
+        with open(cache_file, 'rb') as file:
+            cached_stamp, cached = pickle.load(file)
+    except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+        return None
+    return cached if cached_stamp == stamp else None
+
+
+def write_cache(cache_file, stamp, obj):
+    # written to a temporary file first so concurrent readers never see a partial pickle
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        tmp_file = f'{cache_file}.{os.getpid()}.tmp'
+        with open(tmp_file, 'wb') as file:
+            pickle.dump((stamp, obj), file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        pass
+
+
+def _cache_file(file_path, cache_dir):
+    digest = hashlib.sha1(file_path.encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, f'graph_{digest}.pkl')
+
+
+@profiling.stage('parse_graph')
+def parse_graph(file_path, cache_dir=CACHE_DIR):
+    # task_graph.txt exports or the recorded task_graph.bag; graphs are cached in memory and on disk, keyed by path,
+    # mtime and size of the source file
+    file_path = os.path.abspath(file_path)
+    stat = os.stat(file_path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+
+    cached = _memory_cache.get(file_path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1].copy()
+
+    cache_file = _cache_file(file_path, cache_dir) if cache_dir else None
+    graph = read_cache(cache_file, stamp) if cache_file is not None else None
+    if graph is None:
+        graph = read_graph_bag(file_path) if file_path.endswith('.bag') else read_graph(file_path)
+        if cache_file is not None:
+            write_cache(cache_file, stamp, graph)
+
+    _memory_cache[file_path] = (stamp, graph)
+    return graph.copy()
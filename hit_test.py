@@ -0,0 +1,61 @@
+import numpy as np
+
+
+class HitIndex:
+    # uniform grid over the node positions in data coordinates. A query only looks at the cells overlapping the
+    # tolerance box around the cursor, so hit-testing costs the same for 10 nodes as for 100k
+    def __init__(self, pos):
+        self.pos = pos
+        self.nodes = list(pos)
+        self.coords = np.array([pos[node] for node in self.nodes], dtype=float).reshape(-1, 2)
+        self.cells = {}
+        if not len(self.nodes):
+            self.origin, self.cell_size, self.shape = np.zeros(2), np.ones(2), (1, 1)
+            return
+
+        # about one node per cell on average
+        self.origin = self.coords.min(axis=0)
+        extent = self.coords.max(axis=0) - self.origin
+        side = max(1, int(np.ceil(np.sqrt(len(self.nodes)))))
+        self.cell_size = np.where(extent > 0, extent / side, 1.0)
+        self.shape = (side + 1, side + 1)
+
+        cells = self._cells(self.coords)
+        keys = cells[:, 0] * self.shape[1] + cells[:, 1]
+        order = np.argsort(keys, kind='stable')
+        keys, starts = np.unique(keys[order], return_index=True)
+        for key, members in zip(keys.tolist(), np.split(order, starts[1:])):
+            self.cells[key] = members
+
+    def _cells(self, coords):
+        cells = np.floor((coords - self.origin) / self.cell_size).astype(np.int64)
+        return np.clip(cells, 0, np.array(self.shape) - 1)
+
+    def candidates(self, lower, upper):
+        # indices of the nodes in every cell overlapping the data-space box [lower, upper]
+        (x0, y0), (x1, y1) = self._cells(np.array([lower, upper], dtype=float))
+        found = [self.cells[key] for ix in range(x0, x1 + 1) for key in range(ix * self.shape[1] + y0,
+                                                                           ix * self.shape[1] + y1 + 1)
+                 if key in self.cells]
+        return np.concatenate(found) if found else np.empty(0, dtype=np.intp)
+
+    def nearest(self, x, y, radius):
+        # nearest node within radius of (x, y), everything in data coordinates
+        candidates = self.candidates((x - radius, y - radius), (x + radius, y + radius))
+        if not len(candidates):
+            return None
+        distances = np.hypot(*(self.coords[candidates] - (x, y)).T)
+        best = int(np.argmin(distances))
+        return self.nodes[candidates[best]] if distances[best] <= radius else None
+
+    def node_at(self, ax, x, y, tolerance):
+        # nearest node within tolerance screen pixels of the display point (x, y); the search box is derived from the
+        # current transform, so the tolerance stays the same at every zoom level
+        to_data = ax.transData.inverted()
+        corners = to_data.transform([(x - tolerance, y - tolerance), (x + tolerance, y + tolerance)])
+        candidates = self.candidates(corners.min(axis=0), corners.max(axis=0))
+        if not len(candidates):
+            return None
+        distances = np.hypot(*(ax.transData.transform(self.coords[candidates]) - (x, y)).T)
+        best = int(np.argmin(distances))
+        return self.nodes[candidates[best]] if distances[best] <= tolerance else None
@@ -0,0 +1,135 @@
+import queue
+import sys
+import threading
+
+
+_local = threading.local()
+
+
+class Cancelled(Exception):
+    pass
+
+
+def checkpoint():
+    # called by long computations between their steps: raises Cancelled once the job running them has been
+    # superseded, and does nothing outside a job
+    job = getattr(_local, 'job', None)
+    if job is not None and job.cancelled:
+        raise Cancelled()
+
+
+class Job:
+    def __init__(self, key, description, on_done, on_error):
+        self.key = key
+        self.description = description
+        self.on_done = on_done
+        self.on_error = on_error
+        self.cancelled = False
+
+    def cancel(self):
+        # a job that has not started is skipped by the worker, a running one stops at its next checkpoint
+        self.cancelled = True
+
+
+class JobRunner:
+    # runs long computations on a worker thread so the Tk event loop keeps drawing and handling clicks. Results are
+    # handed back on the Tk thread from root.after callbacks, which poll a queue while jobs are pending. A job has a
+    # key, and submitting a job cancels the pending one of the same key: the result of a superseded query is never
+    # delivered. One worker runs the jobs in order, so the state they share (caches, the refiner) sees one job at a
+    # time. The worker is a daemon thread: a job without checkpoints still running when the window is closed does not
+    # keep the interpreter from exiting, as a ThreadPoolExecutor worker would
+    def __init__(self, root, on_change=None, poll_interval=50):
+        self.root = root
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.jobs = {}
+        self._queue = queue.Queue()
+        self._results = queue.Queue()
+        self._job = None
+        self._worker = threading.Thread(target=self._work, name='jobs', daemon=True)
+        self._worker.start()
+
+    def submit(self, key, function, *args, description='', on_done=None, on_error=None):
+        # on_done(result) or on_error(exception) is called on the Tk thread unless the job is cancelled first
+        self.cancel(key)
+        job = Job(key, description, on_done, on_error)
+        self.jobs[key] = job
+        self._queue.put((job, function, args))
+        self._changed()
+        if self._job is None:
+            self._job = self.root.after(self.poll_interval, self._poll)
+        return job
+
+    def cancel(self, key):
+        job = self.jobs.pop(key, None)
+        if job is not None:
+            job.cancel()
+            self._changed()
+
+    def cancel_all(self):
+        for key in list(self.jobs):
+            self.cancel(key)
+
+    def shutdown(self):
+        # the running job stops at its next checkpoint, the worker once it is done with it
+        self.cancel_all()
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+        self._queue.put(None)
+
+    @property
+    def busy(self):
+        return bool(self.jobs)
+
+    def descriptions(self):
+        return [job.description for job in self.jobs.values() if job.description]
+
+    def _work(self):
+        # worker thread
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            self._run(*item)
+
+    def _run(self, job, function, args):
+        if job.cancelled:
+            return
+        _local.job = job
+        try:
+            self._results.put((job, function(*args), None))
+        except Cancelled:
+            pass
+        except Exception as e:
+            self._results.put((job, None, e))
+        finally:
+            _local.job = None
+
+    def _poll(self):
+        self._job = None
+        while True:
+            try:
+                job, result, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if job.cancelled or self.jobs.get(job.key) is not job:
+                continue
+            del self.jobs[job.key]
+            self._changed()
+            try:
+                if error is None:
+                    if job.on_done is not None:
+                        job.on_done(result)
+                elif job.on_error is not None:
+                    job.on_error(error)
+                else:
+                    raise error
+            except Exception:
+                self.root.report_callback_exception(*sys.exc_info())
+        if self.jobs:
+            self._job = self.root.after(self.poll_interval, self._poll)
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change(self.descriptions())
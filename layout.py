@@ -0,0 +1,173 @@
+import hashlib
+import os
+import networkx as nx
+import numpy as np
+import profiling
+from graph_parser import CACHE_DIR, read_cache, write_cache
+from jobs import checkpoint
+
+
+LAYOUT_VERSION = 1
+
+
+def structural_hash(graph):
+    # nodes, edges and weights in a canonical order, so equal structures share a layout whatever their insertion order
+    digest = hashlib.sha1(b'directed' if graph.is_directed() else b'undirected')
+    for node in sorted(repr(node) for node in graph.nodes):
+        digest.update(node.encode('utf-8') + b'\0')
+    digest.update(b'\1')
+    for edge in sorted(repr((u, v, data.get('weight'))) for u, v, data in graph.edges(data=True)):
+        digest.update(edge.encode('utf-8') + b'\0')
+    return digest.hexdigest()
+
+
+def compute_layout(graph, method='planar'):
+    if method == 'planar':
+        try:
+            return nx.planar_layout(graph)
+        except nx.NetworkXException:
+            # not every task graph is planar
+            method = 'spring'
+    if method == 'circular':
+        return nx.circular_layout(graph)
+    if method == 'spring':
+        return nx.spring_layout(graph, seed=0)
+    raise ValueError(f"Unknown layout method {method}")
+
+
+def affected_nodes(graph, previous_graph):
+    # new nodes and the endpoints of every edge that was added, removed or re-weighted
+    edges = {(u, v, data.get('weight')) for u, v, data in graph.edges(data=True)}
+    previous_edges = {(u, v, data.get('weight')) for u, v, data in previous_graph.edges(data=True)}
+    affected = {node for u, v, _ in edges ^ previous_edges for node in (u, v)}
+    affected.update(node for node in graph if node not in previous_graph)
+    return {node for node in affected if node in graph}
+
+
+def incremental_layout(graph, previous_pos, affected, iterations=50, seed=0):
+    # warm start from previous_pos and run Fruchterman-Reingold on the affected nodes only, every other node stays put
+    # and moving nodes stay inside the area of the previous layout. Forces are only evaluated for the moving nodes, so
+    # a step costs O(moving * n) instead of O(n^2)
+    nodes = list(graph)
+    if not nodes:
+        return {}
+    rng = np.random.default_rng(seed)
+    index = {node: i for i, node in enumerate(nodes)}
+    placed = [node for node in nodes if node in previous_pos]
+    center = np.mean([previous_pos[node] for node in placed], axis=0) if placed else np.zeros(2)
+    coords = np.empty((len(nodes), 2))
+    for node in placed:
+        coords[index[node]] = previous_pos[node]
+
+    # nodes without a position start next to their placed neighbors
+    spread = 0.05 * (np.ptp(coords[[index[node] for node in placed]], axis=0).max() if placed else 1.0) or 0.05
+    for node in nodes:
+        if node not in previous_pos:
+            neighbors = [index[n] for n in nx.all_neighbors(graph, node) if n in previous_pos]
+            anchor = coords[neighbors].mean(axis=0) if neighbors else center
+            coords[index[node]] = anchor + rng.normal(scale=spread, size=2)
+
+    moving = np.array(sorted(index[node] for node in affected | (set(nodes) - set(previous_pos))), dtype=np.intp)
+    if not len(moving):
+        return dict(zip(nodes, coords))
+    if placed:
+        placed_coords = coords[[index[node] for node in placed]]
+        bounds = (placed_coords.min(axis=0), placed_coords.max(axis=0))
+    else:
+        bounds = (np.full(2, -1.0), np.full(2, 1.0))
+    _relax(graph, index, coords, moving, bounds, iterations)
+    return dict(zip(nodes, coords))
+
+
+def _relax(graph, index, coords, moving, bounds, iterations, threshold=1e-4):
+    # the update of nx.spring_layout, with k scaled to the existing domain as it does for fixed nodes
+    n = len(coords)
+    k = max(np.abs(coords).max(), 1e-2) / np.sqrt(n)
+    local = np.full(n, -1, dtype=np.intp)
+    local[moving] = np.arange(len(moving))
+
+    # attraction acts along edges in both directions; weights are transition counts, not distances, so they are not
+    # used here
+    rows, columns = [], []
+    for u, v in graph.edges():
+        for a, b in ((index[u], index[v]), (index[v], index[u])):
+            if local[a] >= 0:
+                rows.append(local[a])
+                columns.append(b)
+    rows, columns = np.array(rows, dtype=np.intp), np.array(columns, dtype=np.intp)
+
+    t = 0.1 * np.ptp(coords, axis=0).max() or 0.1
+    dt = t / (iterations + 1)
+    block = max(1, 2 ** 22 // n)
+    for _ in range(iterations):
+        # a layout for a graph that has been replaced again is dropped between steps
+        checkpoint()
+        displacement = np.zeros((len(moving), 2))
+        for start in range(0, len(moving), block):
+            chunk = moving[start:start + block]
+            delta = coords[chunk, None, :] - coords[None, :, :]
+            distance = np.clip(np.linalg.norm(delta, axis=-1), 0.01, None)
+            displacement[start:start + block] = np.einsum('ijk,ij->ik', delta, k * k / distance ** 2)
+        if len(rows):
+            delta = coords[moving[rows]] - coords[columns]
+            distance = np.clip(np.linalg.norm(delta, axis=-1), 0.01, None)
+            np.add.at(displacement, rows, -delta * (distance / k)[:, None])
+
+        length = np.linalg.norm(displacement, axis=-1)
+        length = np.where(length < 0.01, 0.1, length)
+        delta_pos = displacement * (t / length)[:, None]
+        coords[moving] = np.clip(coords[moving] + delta_pos, *bounds)
+        t -= dt
+        if np.linalg.norm(delta_pos) / n < threshold:
+            break
+
+
+class LayoutStore:
+    # layouts keyed by the structural hash of the graph, kept in memory and in the graph cache directory, so a graph
+    # seen before (at startup, after Recover) gets its old positions back without running the layout again
+    def __init__(self, method='planar', cache_dir=CACHE_DIR):
+        self.method = method
+        self.cache_dir = cache_dir
+        self._layouts = {}
+
+    def _cache_file(self, key):
+        return os.path.join(self.cache_dir, f'layout_{self.method}_{key}.pkl')
+
+    def lookup(self, graph, key=None):
+        key = key or structural_hash(graph)
+        pos = self._layouts.get(key)
+        if pos is None and self.cache_dir:
+            cached = read_cache(self._cache_file(key), (LAYOUT_VERSION, self.method))
+            if cached is not None:
+                pos = dict(zip(*cached))
+                self._layouts[key] = pos
+        return dict(pos) if pos is not None else None
+
+    def store(self, graph, pos, key=None):
+        key = key or structural_hash(graph)
+        self._layouts[key] = dict(pos)
+        if self.cache_dir:
+            nodes = list(pos)
+            coords = np.array([pos[node] for node in nodes], dtype=float).reshape(-1, 2)
+            write_cache(self._cache_file(key), (LAYOUT_VERSION, self.method), (nodes, coords))
+
+    @profiling.stage('layout')
+    def get(self, graph):
+        key = structural_hash(graph)
+        pos = self.lookup(graph, key)
+        if pos is None:
+            pos = compute_layout(graph, self.method)
+            self.store(graph, pos, key)
+        return pos
+
+    @profiling.stage('layout')
+    def update(self, graph, previous_graph, previous_pos, iterations=50):
+        # layout of graph after it replaced previous_graph: a known structure gets its stored layout, anything else is
+        # relaxed from previous_pos, moving only the nodes whose edges changed
+        key = structural_hash(graph)
+        pos = self.lookup(graph, key)
+        if pos is None:
+            checkpoint()
+            pos = incremental_layout(graph, previous_pos, affected_nodes(graph, previous_graph), iterations)
+            self.store(graph, pos, key)
+        return pos
@@ -0,0 +1,275 @@
+import os
+import sys
+import time
+from array import array
+from bisect import bisect_right
+from functools import reduce
+import networkx as nx
+import numpy as np
+import pandas as pd
+import profiling
+from pre_eff import ActivityProcessor, capture, demo_directories, filter_mask, merge_rich_info, run_starts
+from transitions import TransitionCounter, update_graph
+
+
+class LogTail:
+    # the rows appended to a data4testing_*.txt file since the last read, parsed by read_data's rules: rows are numbered
+    # from the @data line on, consecutive duplicates are dropped and Main Camera in hand counts as NONE. Files are
+    # expected to only grow; a file that does not exist yet reads as empty
+    def __init__(self, file_path, max_bytes=1 << 20):
+        self.file_path = file_path
+        self.max_bytes = max_bytes
+        self.offset = 0
+        self.partial = b''
+        self.header = []
+        self.columns = None
+        self.row = -1
+        self.previous = None
+
+    def read(self):
+        # (row, fields) of the complete lines appended since the last call, at most max_bytes of them per call so a
+        # poll from the Tk thread stays short
+        try:
+            with open(self.file_path, 'rb') as file:
+                file.seek(self.offset)
+                data = file.read(self.max_bytes)
+        except FileNotFoundError:
+            return []
+        self.offset += len(data)
+        data = self.partial + data
+        end = data.rfind(b'\n') + 1
+        self.partial = data[end:]
+
+        rows = []
+        for line in data[:end].decode('utf-8', errors='replace').splitlines():
+            if self.columns is None:
+                fields = line.split()
+                if fields and fields[0] == '@attribute':
+                    self.header.append(fields[1])
+                elif fields and fields[0] == '@data':
+                    self.columns = self.header
+                    self.in_hand = self.columns.index('ObjectInHand')
+                    self.activity = self.columns.index('Activity')
+                continue
+            fields = line.strip().split('\t')
+            if fields == ['']:
+                continue
+            self.row += 1
+            if fields[self.in_hand] == 'Main Camera':
+                fields[self.in_hand] = 'NONE'
+            if fields == self.previous:
+                continue
+            self.previous = fields
+            rows.append((self.row, fields))
+        return rows
+
+
+class LiveSequence:
+    # process_file() of one growing demo file, kept up to date from its tail. Runs of the filtered sequence are
+    # committed once nothing appended later can change them, only the runs after the last committed one are extracted
+    # again on every poll
+    def __init__(self, file_path, threshold=20, max_bytes=1 << 20):
+        self.tail = LogTail(file_path, max_bytes)
+        self.threshold = threshold
+        self.seen = set()
+        # rows without UnknownActivity, as process_file extracts from
+        self.rows = array('q')
+        self.activities = []
+        self.states = []
+        self.starts = []
+        self.last_activity = None
+
+        self.pending = 0
+        self.committed = {}
+        self.extracted = {}
+
+    @property
+    def idle_only(self):
+        return self.seen == {'IdleMotion'}
+
+    def poll(self, transitions):
+        # reads the tail; returns the activities whose entry changed and the transition counts that changed
+        new_rows = self.tail.read()
+        if not new_rows:
+            return set(), {}
+        columns = self.tail.columns
+        was_idle_only = self.idle_only
+        activities = []
+        for row, fields in new_rows:
+            activity = fields[self.tail.activity]
+            self.seen.add(activity)
+            if activity == 'UnknownActivity':
+                continue
+            if not self.activities or self.activities[-1] != activity:
+                self.starts.append(len(self.activities))
+            self.rows.append(row)
+            self.activities.append(activity)
+            self.states.append(tuple(fields[:4]))
+            activities.append(activity)
+        self.columns = columns[:4]
+
+        changes = {}
+        if activities:
+            previous = [self.last_activity] if self.last_activity is not None else []
+            changes = transitions.add_sequence(previous + activities)
+            self.last_activity = activities[-1]
+        affected = self._extract()
+        if was_idle_only != self.idle_only:
+            affected |= set(self.committed) | set(self.extracted)
+        return affected, changes
+
+    def _extract(self):
+        # extract() on the rows from the first uncommitted run on. The filter of a row depends on the next row and on
+        # the runs around its own, so the window starts two runs earlier and rows before the last run are final
+        if not self.activities:
+            return set()
+        run = bisect_right(self.starts, self.pending) - 1
+        context = self.starts[max(run - 2, 0)]
+        window = pd.DataFrame({'Activity': self.activities[context:]},
+                              index=np.frombuffer(self.rows, dtype=np.int64)[context:])
+        kept = np.flatnonzero(filter_mask(window, self.threshold)[self.pending - context:]) + self.pending
+        activity = np.asarray(self.activities[self.pending:], dtype=object)[kept - self.pending]
+        starts = kept[run_starts(activity)]
+
+        # run k is final once run k + 1, whose first row is its effect, starts before the last unfiltered run
+        final = int(np.searchsorted(starts[1:], self.starts[-1]))
+        affected = set(self.extracted)
+        for k in range(final):
+            observations = self.committed.setdefault(self.activities[starts[k]], ([], []))
+            observations[0].append(self.states[starts[k]])
+            observations[1].append(self.states[starts[k + 1]])
+            affected.add(self.activities[starts[k]])
+        if final:
+            self.pending = int(starts[final])
+
+        self.extracted = {}
+        for k in range(final, len(starts)):
+            observations = self.extracted.setdefault(self.activities[starts[k]], ([], []))
+            observations[0].append(self.states[starts[k]])
+            if k + 1 < len(starts):
+                observations[1].append(self.states[starts[k + 1]])
+        return affected | set(self.extracted)
+
+    def entry(self, activity):
+        # what process_file returns for activity, or None when the file has no run of it
+        if self.idle_only or (activity not in self.committed and activity not in self.extracted):
+            return None
+        preconditions, effects = [], []
+        for observations in (self.committed.get(activity), self.extracted.get(activity)):
+            if observations is not None:
+                preconditions.extend(observations[0])
+                effects.extend(observations[1])
+        return {'precondition': capture(self.columns, np.array(preconditions, dtype=object)),
+                'effect': capture(self.columns, np.array(effects, dtype=object))}
+
+
+class LiveSession:
+    # rich_info and the transition graph of the demo files of a directory (or a list of them) while they are being
+    # written; every poll only rebuilds the rich_info entries of the activities the appended rows touched
+    def __init__(self, path, threshold=20, max_bytes=1 << 20):
+        self.sequences = [LiveSequence(os.path.join(directory, file_name), threshold, max_bytes)
+                          for directory in demo_directories(path) for file_name in ActivityProcessor.demo_files]
+        self.rich_info = {}
+        self.transitions = TransitionCounter()
+        self.graph = nx.DiGraph()
+
+    @profiling.stage('live_poll')
+    def poll(self):
+        # returns the activities whose rich_info entry changed and the {(u, v): count} of the changed transitions
+        affected, changes = set(), {}
+        for sequence in self.sequences:
+            sequence_affected, sequence_changes = sequence.poll(self.transitions)
+            affected |= sequence_affected
+            changes.update(sequence_changes)
+        for activity in affected:
+            partials = [{activity: entry} for entry in (sequence.entry(activity) for sequence in self.sequences)
+                        if entry is not None]
+            merged = reduce(merge_rich_info, partials, {})
+            if activity in merged:
+                self.rich_info[activity] = merged[activity]
+            else:
+                self.rich_info.pop(activity, None)
+        update_graph(self.graph, changes)
+        return affected, changes
+
+    def catch_up(self):
+        # polls until every file has been read to its current end
+        affected, changes = set(), {}
+        while True:
+            poll_affected, poll_changes = self.poll()
+            if not poll_affected and not poll_changes and all(
+                    sequence.tail.offset >= os.path.getsize(sequence.tail.file_path)
+                    for sequence in self.sequences if os.path.exists(sequence.tail.file_path)):
+                return affected, changes
+            affected |= poll_affected
+            changes.update(poll_changes)
+
+
+class LiveFollower:
+    # polls a LiveSession from root.after callbacks and hands the accumulated changes to on_update at most once per
+    # refresh interval, so a fast writer costs a bounded number of redraws and the Tk thread never waits on the files
+    def __init__(self, root, session, on_update, poll_interval=0.2, refresh_interval=1.0):
+        self.root = root
+        self.session = session
+        self.on_update = on_update
+        self.poll_interval = poll_interval
+        self.refresh_interval = refresh_interval
+        self._affected = set()
+        self._changes = {}
+        self._last_refresh = 0.0
+        self._job = None
+
+    @property
+    def running(self):
+        return self._job is not None
+
+    def start(self):
+        if self._job is None:
+            self._job = self.root.after(0, self._tick)
+
+    def stop(self):
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+
+    def _tick(self):
+        affected, changes = self.session.poll()
+        self._affected |= affected
+        self._changes.update(changes)
+        now = time.monotonic()
+        if (self._affected or self._changes) and now - self._last_refresh >= self.refresh_interval:
+            affected, changes = self._affected, self._changes
+            self._affected, self._changes = set(), {}
+            self._last_refresh = now
+            self.on_update(affected, changes)
+        self._job = self.root.after(int(self.poll_interval * 1000), self._tick)
+
+
+def replay(source, destination, rate=200.0):
+    # appends the rows of the recorded demo files of source to the ones in destination at rate rows per second, both
+    # hands in step, standing in for the VR stream
+    recordings = []
+    for file_name in ActivityProcessor.demo_files:
+        with open(os.path.join(source, file_name), 'r') as file:
+            lines = file.readlines()
+        data = next(i for i, line in enumerate(lines) if line.split()[:1] == ['@data']) + 1
+        output = open(os.path.join(destination, file_name), 'w')
+        output.writelines(lines[:data])
+        recordings.append((lines[data:], output))
+    try:
+        for i in range(max(len(lines) for lines, _ in recordings)):
+            for lines, output in recordings:
+                if i < len(lines):
+                    output.write(lines[i])
+                    output.flush()
+            time.sleep(1 / rate)
+    finally:
+        for _, output in recordings:
+            output.close()
+
+
+if __name__ == "__main__":
+    # python live.py <recorded demo directory> <directory to write> [rows per second]
+    source, destination = sys.argv[1:3]
+    os.makedirs(destination, exist_ok=True)
+    replay(source, destination, float(sys.argv[3]) if len(sys.argv) > 3 else 200.0)
@@ -1,183 +1,204 @@
+import argparse
 import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import networkx as nx
-import my_networkx as my_nx
-import time
 from pre_eff import ActivityProcessor
 import utils
+from renderer import GraphRenderer
+from animation import BuildScheduler
+from graph_parser import parse_graph
+from csr import CSRGraph
+from rich_index import Refiner
+from layout import LayoutStore
+from live import LiveFollower, LiveSession
+from jobs import JobRunner
+import profiling
 from tkinter import filedialog
 
 
-node_color = '#4f5d75'
-highlight_color = '#ffc857'
-edge_color = '#bfc0c0'
-start_color = '#db3a34'
-end_color = '#177e89'
-
-
-def parse_graph(file_path):
-    graph = nx.DiGraph()
-    with open(file_path, 'r') as file:
-        current_node = None
-        neighbors = []
-        weights = []
-
-        for line in file:
-            if 'name:' in line:
-                if current_node and neighbors:
-                    for neighbor, weight in zip(neighbors, weights):
-                        graph.add_edge(current_node, neighbor, weight=weight)
-                current_node = line.split(':')[1].strip()
-                neighbors = []
-                weights = []
-            elif 'neighbors[' in line and current_node:
-                if ':' in line:
-                    neighbor = line.split(':')[1].strip()
-                    neighbors.append(neighbor)
-            elif 'weights[' in line and current_node:
-                if ':' in line:
-                    weight = int(line.split(':')[1].strip())
-                    weights.append(weight)
-
-        if current_node and neighbors:
-            for neighbor, weight in zip(neighbors, weights):
-                graph.add_edge(current_node, neighbor, weight=weight)
-
-    return graph
-
-
 def build_graph(graph, delay=0.5):
-    dynamic_graph = nx.DiGraph()
-    for node in graph.nodes:
-        if node not in dynamic_graph:
-            dynamic_graph.add_node(node)
-            draw_graph(dynamic_graph, highlight=[node], update=True)
-            time.sleep(delay)
-
-        for neighbor in graph.neighbors(node):
-            if neighbor not in dynamic_graph:
-                dynamic_graph.add_edge(
-                    node, neighbor, weight=graph[node][neighbor]['weight'])
-                dynamic_graph.add_node(neighbor)
-                draw_graph(dynamic_graph, highlight=[
-                    (node, neighbor), neighbor], update=True)
-                time.sleep(delay)
-            elif (node, neighbor) not in dynamic_graph.edges:
-                dynamic_graph.add_edge(
-                    node, neighbor, weight=graph[node][neighbor]['weight'])
-                draw_graph(dynamic_graph, highlight=[
-                    (node, neighbor), neighbor], update=True)
-                time.sleep(delay)
-    draw_graph(dynamic_graph, update=True)
-    messagebox.showinfo("Info", "Graph construction complete.")
+    global scheduler
+    scheduler = BuildScheduler(root, renderer, graph, delay=delay,
+                               on_done=lambda: messagebox.showinfo("Info", "Graph construction complete."))
+    scheduler.start()
 
 
-
-def on_click(event):
-    global start_node, end_node
-    if event.xdata is None or event.ydata is None:
-        return
-    for node, node_pos in pos.items():
-        distance = ((event.xdata - node_pos[0]) ** 2 + (event.ydata - node_pos[1]) ** 2) ** 0.5
-        if distance < 0.1:
-            if start_node is None:
-                start_node = node
-                draw_graph(G, highlight=[start_node])
-                canvas.draw()
-                messagebox.showinfo("Info", f"Start node set to {node}")
-            elif end_node is None and node != start_node:
-                end_node = node
-                draw_graph(G, highlight=[start_node, end_node])
-                canvas.draw()
-                messagebox.showinfo("Info", f"End node set to {node}")
-                widest_path, widest_min_width = utils.monte_carlo_widest_path(G, start_node, end_node)
-                if widest_path:
-                    draw_path(G, widest_path, ax, pos)
-                    canvas.draw()
-                    print("Widest Path:", widest_path, "with widest minimum width:", widest_min_width)
-                    start_node, end_node = None, None
-            return
-    messagebox.showinfo("Info", "No node was clicked.")
+def skip_build():
+    if scheduler is not None:
+        scheduler.skip()
 
 
 def draw_graph(graph, highlight=None, update=False):
-    ax.clear()
-    node_size = 600
-    nx.draw_networkx_nodes(graph, pos, node_size=node_size, node_color=node_color, ax=ax)
-    nx.draw_networkx_labels(graph, pos, ax=ax)
-
-    edge_weights = nx.get_edge_attributes(graph, 'weight')
-    curved_edges = [edge for edge in graph.edges() if reversed(edge) in graph.edges() and edge in edge_weights]
-    straight_edges = list(set(graph.edges()) - set(curved_edges))
-
-    nx.draw_networkx_edges(graph, pos, ax=ax, edgelist=straight_edges, edge_color=edge_color, width=2, arrowstyle='-|>',
-                           arrowsize=15)
-    arc_rad = 0.1
-    nx.draw_networkx_edges(graph, pos, ax=ax, edgelist=curved_edges, connectionstyle=f'arc3, rad = {arc_rad}',
-                           edge_color=edge_color, width=2, arrowstyle='-|>', arrowsize=15)
-
-    if highlight:
-        for item in highlight:
-            if isinstance(item, tuple):
-                if item in curved_edges or (item[1], item[0]) in curved_edges:
-                    nx.draw_networkx_edges(graph, pos, edgelist=[item], edge_color=highlight_color, width=3,
-                                           arrowstyle='-|>', arrowsize=20, ax=ax,
-                                           connectionstyle=f'arc3, rad = {arc_rad}')
-                else:
-                    nx.draw_networkx_edges(graph, pos, edgelist=[item], edge_color=highlight_color, width=3,
-                                           arrowstyle='-|>', arrowsize=20, ax=ax)
-            else:
-                nx.draw_networkx_nodes(graph, pos, nodelist=[item], node_size=node_size, node_color=highlight_color,
-                                       ax=ax)
-
-    curved_edge_labels = {edge: edge_weights.get(edge) for edge in curved_edges}
-    straight_edge_labels = {edge: edge_weights.get(edge) for edge in straight_edges}
-    my_nx.my_draw_networkx_edge_labels(graph, pos, ax=ax, edge_labels=curved_edge_labels, font_size=12, rotate=False,
-                                       rad=arc_rad)
-    nx.draw_networkx_edge_labels(graph, pos, ax=ax, edge_labels=straight_edge_labels, font_size=12, rotate=False)
-
-    if start_node is not None:
-        nx.draw_networkx_nodes(graph, pos, nodelist=[start_node], node_size=node_size, node_color=start_color, ax=ax)
-    if end_node is not None:
-        nx.draw_networkx_nodes(graph, pos, nodelist=[end_node], node_size=node_size, node_color=end_color, ax=ax)
-
-    canvas.draw()
+    if renderer.changed(graph):
+        renderer.set_graph(graph)
+    highlight = highlight or []
+    renderer.highlight(nodes=[item for item in highlight if not isinstance(item, tuple)],
+                       edges=[item for item in highlight if isinstance(item, tuple)],
+                       start=start_node, end=end_node)
     if update:
         root.update()
 
 
-def draw_path(G, path, ax, pos):
+def draw_path(path):
     edges = [(path[i], path[i + 1]) for i in range(len(path) - 1)]
-    arc_rad = 0.1
+    renderer.highlight(edges=edges, start=path[0], end=path[-1])
 
-    for edge in edges:
-        if (edge[1], edge[0]) in G.edges():
-            nx.draw_networkx_edges(G, pos, edgelist=[edge], edge_color=highlight_color, width=3,
-                                   ax=ax, connectionstyle=f'arc3, rad = {arc_rad}')
-        else:
-            nx.draw_networkx_edges(G, pos, edgelist=[edge], edge_color=highlight_color, width=3, ax=ax)
+
+def on_click(event):
+    global start_node, end_node
+    if event.xdata is None or event.ydata is None:
+        return
+    node = renderer.node_at(event.x, event.y)
+    if node is None:
+        messagebox.showinfo("Info", "No node was clicked.")
+        return
+    if start_node is None:
+        # a new query makes the one still running pointless
+        jobs.cancel('paths')
+        start_node = node
+        draw_graph(G, highlight=[start_node])
+        messagebox.showinfo("Info", f"Start node set to {node}")
+    elif end_node is None and node != start_node:
+        end_node = node
+        draw_graph(G, highlight=[start_node, end_node])
+        # the search runs while the message is read; the next click starts a new query
+        jobs.submit('paths', path_cache.get, arrays, start_node, end_node, num_paths, description="Searching paths",
+                    on_done=show_paths)
+        start_node, end_node = None, None
+        messagebox.showinfo("Info", f"End node set to {node}")
+
+
+def show_paths(paths):
+    if not paths:
+        print("No path found.")
+        return
+    widest_path, widest_min_width = paths[0]
+    draw_path(widest_path)
+    print("Widest Path:", widest_path, "with widest minimum width:", widest_min_width)
+    for rank, (path, width) in enumerate(paths[1:], 2):
+        print(f"Alternative {rank}:", path, "with widest minimum width:", width)
+
+
+def on_motion(event):
+    if event.inaxes is not ax:
+        renderer.hover(None)
+        return
+    renderer.hover(renderer.node_at(event.x, event.y))
 
 
 def clear_highlight():
     global start_node, end_node
+    jobs.cancel('paths')
     start_node, end_node = None, None
     draw_graph(G)
-    canvas.draw()
 
 
-def refine_button():
-    global G
-    G = utils.refine_graph(G, rich_info)
+def replace_graph(make_graph, *args, description="Updating graph", on_done=None):
+    # make_graph(*args) and the layout of its result run on the worker, a newer replacement cancels this one. The
+    # layout follows the new structure, only nodes whose edges changed are moved
+    previous_graph, previous_pos = G, pos
+
+    def job():
+        graph = make_graph(*args)
+        return graph, layouts.update(graph, previous_graph, previous_pos), CSRGraph.from_networkx(graph)
+
+    def done(result):
+        set_graph(*result)
+        if on_done is not None:
+            on_done()
+    jobs.submit('graph', job, description=description, on_done=done)
+
+
+def set_graph(graph, graph_pos, graph_arrays):
+    # a path search still pending was submitted on the graph being replaced, its paths would not match the new one.
+    # Path searches run on the CSR arrays of G, converted once per graph on the worker
+    global G, pos, arrays
+    jobs.cancel('paths')
+    pos = graph_pos
+    arrays = graph_arrays
+    renderer.set_pos(pos)
+    G = graph
     draw_graph(G)
 
 
+def base_graph():
+    # the transition graph being followed in live mode, the exported task graph otherwise
+    return follower.session.graph.copy() if follower is not None else parse_graph(task_graph)
+
+
+def refine_button():
+    global refined
+    refined = True
+    replace_graph(refiner.refine, G, description="Refining")
+
+
 def recover():
-    global G
-    G = parse_graph(task_graph)
-    draw_graph(G)
+    global refined
+    refined = False
+    # base_graph reads the live session, which only the Tk thread may touch
+    replace_graph(lambda graph: graph, base_graph())
+
+
+def live_graph(graph, entries, refine):
+    # worker side of a live update; the refiner is only used from the worker, which runs one job at a time, and keeps
+    # its own copy of the rich info, the session's dict being changed by the follower on the Tk thread
+    refiner.apply(entries)
+    return refiner.refine(graph) if refine else graph
+
+
+def on_live_update(affected, changes):
+    # called by the follower at most once per refresh interval; only the edges of the affected activities are
+    # checked again by the refiner. Activities stay stale until an update that includes them is shown, as a newer
+    # update cancels an older one that may not have reached the refiner
+    stale_activities.update(affected)
+    affected = set(stale_activities)
+    # the entries are replaced, never changed in place, by the session, so the values can be shared with the worker
+    entries = {activity: follower.session.rich_info.get(activity) for activity in affected}
+    replace_graph(live_graph, base_graph(), entries, refined,
+                  on_done=lambda: stale_activities.difference_update(affected))
+
+
+def on_jobs_change(descriptions):
+    # the progress bar runs while any job is pending
+    if descriptions:
+        status.configure(text=", ".join(descriptions) + "...")
+        progress.start(10)
+    else:
+        status.configure(text="")
+        progress.stop()
+
+
+def start_session(session):
+    # worker side of the first Follow: what the files already hold is read before the refiner takes the session's
+    # rich info, so no edge is refined against the empty rich info of a new session
+    session.catch_up()
+    refiner.set_rich_info(dict(session.rich_info))
+    return session
+
+
+def session_started(session):
+    global follower
+    follower = LiveFollower(root, session, on_live_update)
+    follower.start()
+    follow.configure(text="Pause")
+    # the session is caught up, so its first polls change nothing; its graph is shown right away
+    replace_graph(live_graph, base_graph(), {}, refined)
+
+
+def follow_button():
+    # tails the demo files of follow_path, the graph and rich info follow what is appended to them
+    if follower is None:
+        if 'follow' not in jobs.jobs:
+            jobs.submit('follow', start_session, LiveSession(follow_path), description="Reading demo files",
+                        on_done=session_started)
+    elif follower.running:
+        follower.stop()
+        follow.configure(text="Follow")
+    else:
+        follower.start()
+        follow.configure(text="Pause")
 
 
 def save_graph():
@@ -185,16 +206,49 @@ def save_graph():
                                             filetypes=[("PNG files", "*.png"), ("All Files", "*.*")])
     if filepath:
         try:
-            fig.savefig(filepath, dpi=300)
+            renderer.save(filepath, dpi=300)
             messagebox.showinfo("Save Graph", f"Graph saved successfully at\n{filepath}")
         except Exception as e:
             messagebox.showerror("Save Error", f"Failed to save graph.\n{e}")
 
 
+def refresh_stats():
+    # redrawn on a timer rather than after every stage, so the panel adds nothing to the stages it shows
+    stats_label.configure(text=profiling.format_stats())
+    root.after(stats_interval, refresh_stats)
+
+
+def trace_memory():
+    # tracemalloc slows every allocation down, so peaks are only recorded while asked for
+    profiling.enable(trace_memory=memory_var.get())
+
+
+def reset_stats():
+    profiling.reset()
+    stats_label.configure(text=profiling.format_stats())
+
+
+def dump_stats():
+    filepath = filedialog.asksaveasfilename(defaultextension='.json',
+                                            filetypes=[("JSON files", "*.json"), ("All Files", "*.*")])
+    if filepath:
+        try:
+            profiling.dump(filepath)
+        except OSError as e:
+            messagebox.showerror("Dump Error", f"Failed to dump stats.\n{e}")
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show the task graph and query its widest paths.")
+    parser.add_argument('--follow', metavar='DIRECTORY', default='data/13_demos',
+                        help="demo directory whose files Follow tails (default: %(default)s)")
+    args = parser.parse_args()
+    # stage timings are shown in the stats panel; startup is timed too
+    profiling.enable()
     task_graph = 'data/13_demos/task_graph.txt'
     # modify_file(file_path)
     info_path = 'data/13_demos'
+    follow_path = args.follow
     root = tk.Tk()
     root.wm_title("Visualization")
     fig, ax = plt.subplots(figsize=(10, 7), dpi=100)
@@ -202,12 +256,24 @@ if __name__ == "__main__":
     canvas = FigureCanvasTkAgg(fig, master=root)
     processor = ActivityProcessor(info_path)
     rich_info = processor.rich_info
+    refiner = Refiner(rich_info)
     G = parse_graph(task_graph)
-    pos = nx.planar_layout(G)
-    # pos = nx.spring_layout(G, k=3, iterations=20, seed=0)
+    arrays = CSRGraph.from_networkx(G)
+    layouts = LayoutStore('planar')
+    pos = layouts.get(G)
+    # layouts = LayoutStore('spring')
+    renderer = GraphRenderer(ax, pos)
 
     start_node = None
     end_node = None
+    scheduler = None
+    follower = None
+    refined = False
+    # the K widest paths of a query are printed, the cache empties itself when G (and so arrays) is replaced
+    num_paths = 5
+    path_cache = utils.PathCache()
+    # activities changed by live updates whose refine verdicts are not on screen yet
+    stale_activities = set()
 
     style = ttk.Style()
     style.configure('TButton', font=('Helvetica', 12))
@@ -221,18 +287,44 @@ if __name__ == "__main__":
     clear = ttk.Button(button_frame, text="Clear", command=clear_highlight)
     clear.pack(padx=10, pady=10)
 
+    skip = ttk.Button(button_frame, text="Skip", command=skip_build)
+    skip.pack(padx=10, pady=10)
+
     refine = ttk.Button(button_frame, text="Refine", command=refine_button)
     refine.pack(padx=10, pady=10)
 
     recover = ttk.Button(button_frame, text="Recover", command=recover)
     recover.pack(padx=10, pady=10)
 
+    follow = ttk.Button(button_frame, text="Follow", command=follow_button)
+    follow.pack(padx=10, pady=10)
+
     save_button = ttk.Button(button_frame, text="Save", command=save_graph)
     save_button.pack(padx=10, pady=10)
 
+    # path searches, refining and layouts run on a worker thread, the bar moves while one is pending
+    progress = ttk.Progressbar(button_frame, mode='indeterminate', length=120)
+    progress.pack(padx=10, pady=(10, 0))
+    status = tk.Label(button_frame, text="", font=('Helvetica', 10))
+    status.pack(padx=10)
+    jobs = JobRunner(root, on_change=on_jobs_change)
+
+    stats_frame = ttk.LabelFrame(outer_frame, text="Stats")
+    stats_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=10)
+    stats_label = tk.Label(stats_frame, font=('Courier', 9), justify=tk.LEFT, anchor=tk.W)
+    stats_label.pack(fill=tk.X)
+    memory_var = tk.BooleanVar(value=False)
+    ttk.Checkbutton(stats_frame, text="Trace memory", variable=memory_var, command=trace_memory).pack(anchor=tk.W)
+    ttk.Button(stats_frame, text="Reset", command=reset_stats).pack(side=tk.LEFT, padx=5, pady=5)
+    ttk.Button(stats_frame, text="Dump", command=dump_stats).pack(side=tk.LEFT, padx=5, pady=5)
+    stats_interval = 500
+    refresh_stats()
+
     canvas_widget = canvas.get_tk_widget()
     canvas_widget.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
     canvas.mpl_connect("button_press_event", on_click)
+    canvas.mpl_connect("motion_notify_event", on_motion)
 
     root.after(1000, lambda: build_graph(G))
     tk.mainloop()
+    jobs.shutdown()
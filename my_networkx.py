@@ -90,7 +90,6 @@ def my_draw_networkx_edge_labels(
     draw_networkx_labels
     """
     import matplotlib.pyplot as plt
-    import numpy as np
 
     if ax is None:
         ax = plt.gca()
@@ -98,45 +97,17 @@ def my_draw_networkx_edge_labels(
         labels = {(u, v): d for u, v, d in G.edges(data=True)}
     else:
         labels = edge_labels
-    text_items = {}
-    for (n1, n2), label in labels.items():
-        (x1, y1) = pos[n1]
-        (x2, y2) = pos[n2]
-        (x, y) = (
-            x1 * label_pos + x2 * (1.0 - label_pos),
-            y1 * label_pos + y2 * (1.0 - label_pos),
-        )
-        pos_1 = ax.transData.transform(np.array(pos[n1]))
-        pos_2 = ax.transData.transform(np.array(pos[n2]))
-        linear_mid = 0.5*pos_1 + 0.5*pos_2
-        d_pos = pos_2 - pos_1
-        rotation_matrix = np.array([(0,1), (-1,0)])
-        ctrl_1 = linear_mid + rad*rotation_matrix@d_pos
-        ctrl_mid_1 = 0.5*pos_1 + 0.5*ctrl_1
-        ctrl_mid_2 = 0.5*pos_2 + 0.5*ctrl_1
-        bezier_mid = 0.5*ctrl_mid_1 + 0.5*ctrl_mid_2
-        (x, y) = ax.transData.inverted().transform(bezier_mid)
-
-        if rotate:
-            # in degrees
-            angle = np.arctan2(y2 - y1, x2 - x1) / (2.0 * np.pi) * 360
-            # make label orientation "right-side-up"
-            if angle > 90:
-                angle -= 180
-            if angle < -90:
-                angle += 180
-            # transform data coordinate angle to screen coordinate angle
-            xy = np.array((x, y))
-            trans_angle = ax.transData.transform_angles(
-                np.array((angle,)), xy.reshape((1, 2))
-            )[0]
-        else:
-            trans_angle = 0.0
-        # use default box of white with white border
-        if bbox is None:
-            # bbox = dict(boxstyle="round", ec=(1.0, 1.0, 1.0), fc=(1.0, 1.0, 1.0))
-            bbox = dict(boxstyle="round,pad=0.1", ec=(1.0, 1.0, 1.0, 1), fc=(1.0, 1.0, 1.0, 1))
+    edges = list(labels)
+    xy, angles = _curved_label_layout(ax, pos, edges, rotate, rad)
+
+    # use default box of white with white border
+    if bbox is None:
+        # bbox = dict(boxstyle="round", ec=(1.0, 1.0, 1.0), fc=(1.0, 1.0, 1.0))
+        bbox = dict(boxstyle="round,pad=0.1", ec=(1.0, 1.0, 1.0, 1), fc=(1.0, 1.0, 1.0, 1))
 
+    text_items = {}
+    for (n1, n2), (x, y), trans_angle in zip(edges, xy.tolist(), angles.tolist()):
+        label = labels[(n1, n2)]
         if not isinstance(label, str):
             label = str(label)  # this makes "1" and 1 labeled the same
 
@@ -168,4 +139,72 @@ def my_draw_networkx_edge_labels(
         labelleft=False,
     )
 
-    return text_items
\ No newline at end of file
+    return text_items
+
+
+def my_update_networkx_edge_labels(text_items, pos, ax=None, rotate=True, rad=0):
+    """Move existing edge labels to the curved-edge midpoints of a new layout.
+
+    Parameters
+    ----------
+    text_items : dictionary
+        Text artists keyed by edge, as returned by my_draw_networkx_edge_labels.
+
+    pos : dictionary
+        A dictionary with nodes as keys and positions as values.
+
+    ax : Matplotlib Axes object, optional
+        The axes the labels were drawn on.
+
+    rotate : bool (default=True)
+        Rotate edge labels to lie parallel to edges
+
+    rad : float (default=0)
+        Curvature of the edges, as passed to my_draw_networkx_edge_labels.
+
+    Returns
+    -------
+    dict
+        The same `dict` of labels keyed by edge
+    """
+    import matplotlib.pyplot as plt
+
+    if ax is None:
+        ax = plt.gca()
+    edges = list(text_items)
+    xy, angles = _curved_label_layout(ax, pos, edges, rotate, rad)
+    for edge, position, trans_angle in zip(edges, xy.tolist(), angles.tolist()):
+        text_items[edge].set_position(position)
+        text_items[edge].set_rotation(trans_angle)
+    return text_items
+
+
+def _curved_label_layout(ax, pos, edges, rotate, rad):
+    # label positions (data coordinates) and rotations of all edges at once: one forward transform for every endpoint,
+    # the Bezier midpoints in numpy and one inverse transform back
+    import numpy as np
+
+    if not edges:
+        return np.empty((0, 2)), np.empty(0)
+    data = np.array([(pos[n1], pos[n2]) for n1, n2 in edges], dtype=float).reshape(-1, 2, 2)
+    display = ax.transData.transform(data.reshape(-1, 2)).reshape(-1, 2, 2)
+    pos_1, pos_2 = display[:, 0], display[:, 1]
+    linear_mid = 0.5 * pos_1 + 0.5 * pos_2
+    d_pos = pos_2 - pos_1
+    # rotation_matrix = [(0, 1), (-1, 0)] applied to every d_pos
+    ctrl_1 = linear_mid + rad * np.column_stack((d_pos[:, 1], -d_pos[:, 0]))
+    ctrl_mid_1 = 0.5 * pos_1 + 0.5 * ctrl_1
+    ctrl_mid_2 = 0.5 * pos_2 + 0.5 * ctrl_1
+    bezier_mid = 0.5 * ctrl_mid_1 + 0.5 * ctrl_mid_2
+    xy = ax.transData.inverted().transform(bezier_mid)
+
+    if not rotate:
+        return xy, np.zeros(len(edges))
+    # in degrees
+    d_data = data[:, 1] - data[:, 0]
+    angles = np.arctan2(d_data[:, 1], d_data[:, 0]) / (2.0 * np.pi) * 360
+    # make label orientation "right-side-up"
+    angles = np.where(angles > 90, angles - 180, angles)
+    angles = np.where(angles < -90, angles + 180, angles)
+    # transform data coordinate angle to screen coordinate angle
+    return xy, ax.transData.transform_angles(angles, xy)
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+from array import array
+import numpy as np
+from graph_parser import CACHE_DIR
+
+
+FIELDS = {'position': 3, 'orientation': 4, 'velocity': 3}
+CACHE_VERSION = 1
+
+_whitespace = re.compile(r'[\s,]*')
+
+
+def iter_steps(file_path, chunk_size=1 << 16):
+    # yields the entries of the "log" array one at a time, so only the timestep being decoded is ever held as Python
+    # objects; the keys around the array go to the returned header dict through StopIteration.value
+    decoder = json.JSONDecoder()
+    header = {}
+    with open(file_path, 'r', encoding='utf-8') as file:
+        buffer = ''
+        while True:
+            match = re.search(r'"log"\s*:\s*\[', buffer)
+            if match:
+                break
+            chunk = file.read(chunk_size)
+            if not chunk:
+                raise ValueError(f"{file_path} has no log array")
+            buffer += chunk
+        _read_header(buffer[:match.start()], header)
+        position = match.end()
+
+        while True:
+            position = _whitespace.match(buffer, position).end()
+            if position < len(buffer) and buffer[position] == ']':
+                _read_header(buffer[position + 1:] + file.read(), header)
+                return header
+            try:
+                step, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                chunk = file.read(chunk_size)
+                if not chunk:
+                    raise
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+            yield step
+            position = end
+
+
+def _read_header(text, header):
+    # "key": number pairs outside of the log array, such as playbackTimestepMilliseconds
+    for key, value in re.findall(r'"(\w+)"\s*:\s*(-?[\d.eE+-]+)', text):
+        header[key] = float(value)
+
+
+def read_playback(file_path, every=1):
+    # one pass over the file into per-object arrays: time (n,), position (n, 3), orientation (n, 4), velocity (n, 3).
+    # every=k keeps every k-th timestep
+    buffers = {}
+    events = []
+    steps = iter_steps(file_path)
+    index = 0
+    while True:
+        try:
+            step = next(steps)
+        except StopIteration as stop:
+            header = stop.value or {}
+            break
+        keep = index % every == 0
+        index += 1
+        time = step.get('time', 0.0)
+        for state in step.get('logStep', ()):
+            name = state['name']
+            for event in state.get('events') or ():
+                events.append((time, name, event.get('name', ''), event.get('property', '')))
+            if not keep:
+                continue
+            buffer = buffers.get(name)
+            if buffer is None:
+                buffer = buffers[name] = {'time': array('d'), **{field: array('d') for field in FIELDS}}
+            buffer['time'].append(time)
+            for field, width in FIELDS.items():
+                values = state.get(field)
+                buffer[field].extend(values if values is not None and len(values) == width else [np.nan] * width)
+
+    objects = {}
+    for name, buffer in buffers.items():
+        arrays = {'time': np.frombuffer(buffer['time'], dtype=np.float64)}
+        for field, width in FIELDS.items():
+            arrays[field] = np.frombuffer(buffer[field], dtype=np.float64).reshape(-1, width)
+        objects[name] = arrays
+    return {'timestep': header.get('playbackTimestepMilliseconds'), 'objects': objects, 'events': events}
+
+
+def _cache_dir(file_path, cache_dir, every):
+    digest = hashlib.sha1(f'{file_path}|{every}'.encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, f'playback_{digest}')
+
+
+def save_playback(playback, directory, stamp):
+    # every field of every object concatenated into one .npy file, with the object slices in meta.json, so a load is
+    # a handful of memory maps
+    tmp_dir = f'{directory}.{os.getpid()}.tmp'
+    os.makedirs(tmp_dir, exist_ok=True)
+    slices = {}
+    start = 0
+    for name, arrays in playback['objects'].items():
+        slices[name] = [start, start + len(arrays['time'])]
+        start += len(arrays['time'])
+    for field in ('time', *FIELDS):
+        width = FIELDS.get(field)
+        parts = [arrays[field] for arrays in playback['objects'].values()]
+        data = np.concatenate(parts) if parts else np.empty((0, width) if width else 0)
+        np.save(os.path.join(tmp_dir, f'{field}.npy'), data)
+    meta = {'version': CACHE_VERSION, 'stamp': list(stamp), 'timestep': playback['timestep'], 'slices': slices,
+            'events': playback['events']}
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as file:
+        json.dump(meta, file)
+    if os.path.exists(directory):
+        shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp_dir, directory)
+
+
+def open_playback(directory, stamp=None):
+    # the cached playback with every array memory-mapped read-only, or None when missing or stale
+    try:
+        with open(os.path.join(directory, 'meta.json')) as file:
+            meta = json.load(file)
+        if meta.get('version') != CACHE_VERSION or (stamp is not None and meta['stamp'] != list(stamp)):
+            return None
+        data = {field: np.load(os.path.join(directory, f'{field}.npy'), mmap_mode='r') for field in ('time', *FIELDS)}
+    except (OSError, ValueError, KeyError):
+        return None
+    objects = {name: {field: values[start:stop] for field, values in data.items()}
+               for name, (start, stop) in meta['slices'].items()}
+    return {'timestep': meta['timestep'], 'objects': objects, 'events': [tuple(event) for event in meta['events']]}
+
+
+def load_playback(file_path, every=1, cache_dir=CACHE_DIR):
+    # read_playback, cached on disk keyed by path, mtime, size and decimation
+    file_path = os.path.abspath(file_path)
+    stat = os.stat(file_path)
+    stamp = (stat.st_mtime_ns, stat.st_size, every)
+    if not cache_dir:
+        return read_playback(file_path, every)
+    directory = _cache_dir(file_path, cache_dir, every)
+    playback = open_playback(directory, stamp)
+    if playback is None:
+        playback = read_playback(file_path, every)
+        try:
+            save_playback(playback, directory, stamp)
+        except OSError:
+            return playback
+        playback = open_playback(directory, stamp) or playback
+    return playback
+
+
+if __name__ == "__main__":
+    for path in sys.argv[1:] or sorted(os.path.join('data/playback', name) for name in os.listdir('data/playback')):
+        playback = load_playback(path)
+        print(path, f"timestep {playback['timestep']} ms")
+        for name, arrays in playback['objects'].items():
+            times = arrays['time']
+            print(f"  {name:<24} {len(times):>6} samples, t = {times[0]:.0f}..{times[-1]:.0f} ms")
+        for event in playback['events']:
+            print('  event', *event)
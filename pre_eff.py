@@ -1,5 +1,12 @@
 import os
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+from itertools import repeat
+import numpy as np
 import pandas as pd
+import profiling
 import pprint
 
 
@@ -31,134 +38,200 @@ def simplify_dict(dict1, dict2):
     return {k: flatten_and_unique(v) for k, v in combined_dict.items()}
 
 
+def run_starts(values):
+    values = np.asarray(values)
+    if len(values) == 0:
+        return np.zeros(0, dtype=np.intp)
+    return np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+
+
 def filter_data(df, threshold):
-    remove_indices = []
-    last_index = None
-    for index, row in df.iterrows():
-        if last_index is not None and index - last_index < threshold:
-            remove_indices.append(last_index)
-        last_index = index
-
-    activity_idx = []
-    last_activity = None
-
-    for index, row in df.iterrows():
-        current_activity = row['Activity']
-        if current_activity != last_activity:
-            activity_idx.append(index)
-            last_activity = current_activity
-
-    for i in range(1, len(activity_idx) - 1):
-        current_index = activity_idx[i]
-        previous_index = activity_idx[i - 1]
-        next_index = activity_idx[i + 1]
-        if df.at[current_index, 'Activity'] == 'IdleMotion':
-            if df.at[previous_index, 'Activity'] == df.at[next_index, 'Activity']:
-                remove_indices.extend(df.loc[current_index:next_index].index)
-
-    mask = ~df.index.isin(remove_indices)
-    df = df[mask]
-    return df.reset_index(drop=True)
+    return df[filter_mask(df, threshold)].reset_index(drop=True)
+
+
+def filter_mask(df, threshold):
+    # rows followed too closely by the next change are short-lived states
+    row_index = df.index.to_numpy()
+    remove = np.zeros(len(df), dtype=bool)
+    remove[:-1] = np.diff(row_index) < threshold
+
+    # an IdleMotion run between two runs of the same activity is dropped with the first row after it
+    activity = df['Activity'].to_numpy()
+    starts = run_starts(activity)
+    if len(starts) > 2:
+        previous, current, following = starts[:-2], starts[1:-1], starts[2:]
+        sandwich = (activity[current] == 'IdleMotion') & (activity[previous] == activity[following])
+        delta = np.zeros(len(df) + 1, dtype=np.intp)
+        np.add.at(delta, current[sandwich], 1)
+        np.add.at(delta, following[sandwich] + 1, -1)
+        remove |= np.cumsum(delta[:-1]) > 0
+    return ~remove
+
+
+def capture(columns, rows):
+    # a single observation keeps plain values, repeated observations collect the distinct values per column
+    if len(rows) == 0:
+        return {}
+    if len(rows) == 1:
+        return dict(zip(columns, rows[0].tolist()))
+    return {column: list(dict.fromkeys(rows[:, i].tolist())) for i, column in enumerate(columns)}
 
 
 def extract(df, threshold):
     df_filter = filter_data(df, threshold)
-    df_filter.reset_index(drop=True)
+    activity = df_filter['Activity'].to_numpy()
+    starts = run_starts(activity)
+    if len(starts) == 0:
+        return {}
+
+    # the precondition of a run is its first row, the effect is the first row of the run after it
+    columns = list(df_filter.columns[0:4])
+    states = df_filter.iloc[:, 0:4].to_numpy()
+    preconditions = states[starts]
+    effects = states[starts[1:]]
+    run_activity = activity[starts]
+
     buffer = {}
-    last_activity = None
-    start_index = 0
-
-    for index, activity in enumerate(df_filter['Activity']):
-        if activity != last_activity:
-            if last_activity is not None:
-                current_activity_df = df_filter.iloc[start_index:index]
-                precondition = current_activity_df.iloc[0][0:4].to_dict()
-                next_activity_start = index if index < len(df_filter) else None
-
-                if last_activity in buffer:
-                    buffer[last_activity]['precondition'] = simplify_dict(buffer[last_activity]['precondition'],
-                                                                          precondition)
-                    if next_activity_start is not None:
-                        next_activity_df = df_filter.iloc[next_activity_start:next_activity_start + 1]
-                        effect = next_activity_df.iloc[0][0:4].to_dict()
-                        buffer[last_activity]['effect'] = simplify_dict(buffer[last_activity]['effect'], effect)
-                else:
-                    next_activity_df = df_filter.iloc[next_activity_start:next_activity_start + 1]
-                    effect = next_activity_df.iloc[0][0:4].to_dict()
-
-                    buffer[last_activity] = {
-                        'precondition': precondition,
-                        'effect': effect
-                    }
-            start_index = index
-            last_activity = activity
-
-    if last_activity is not None:
-        activity_df = df_filter.iloc[start_index:]
-        precondition = activity_df.iloc[0][0:4].to_dict()
-
-        if last_activity in buffer:
-            buffer[last_activity]['precondition'] = simplify_dict(buffer[last_activity]['precondition'], precondition)
-        else:
-            buffer[last_activity] = {
-                'precondition': precondition,
-                'effect': {}
-            }
+    for name in dict.fromkeys(run_activity.tolist()):
+        runs = np.flatnonzero(run_activity == name)
+        buffer[name] = {
+            'precondition': capture(columns, preconditions[runs]),
+            'effect': capture(columns, effects[runs[runs < len(effects)]])
+        }
     return buffer
 
 
+def segments(df, threshold):
+    # the runs extract() works on as arrays of activity, start row and stop row, rows being line positions in the demo
+    # file; a run lasts until the next one starts, the last one until the end of the sequence
+    kept = df[filter_mask(df, threshold)]
+    activity = kept['Activity'].to_numpy()
+    starts = run_starts(activity)
+    rows = kept.index.to_numpy()
+    stop = np.r_[rows[starts[1:]], df.index[-1] + 1] if len(starts) else np.zeros(0, dtype=rows.dtype)
+    return {'activity': activity[starts], 'start': rows[starts], 'stop': stop}
+
+
+def read_header(file):
+    columns = []
+    for line in file:
+        fields = line.split()
+        if not fields:
+            continue
+        if fields[0] == '@attribute':
+            columns.append(fields[1])
+        elif fields[0] == '@data':
+            return columns
+    raise ValueError(f"No @data section in {file.name}")
+
+
 def read_data(file_path):
+    # one pass over the file: consecutive duplicate rows are dropped while reading and every column is int-coded,
+    # so only the state changes and the per-column vocabularies are held in memory
     with open(file_path, 'r') as file:
-        line = file.readlines()
-    start_index = line.index('@data\n') + 1
-    data_lines = line[start_index:]
-    df = pd.DataFrame([line.strip().split('\t') for line in data_lines if line.strip() != ''],
-                      columns=['Hand', 'ObjectActedOn', 'ObjectInHand', 'HandState', 'Activity'])
-    df.loc[df['ObjectInHand'] == 'Main Camera', 'ObjectInHand'] = 'NONE'
-    return df
+        columns = read_header(file)
+        in_hand = columns.index('ObjectInHand')
+        vocabularies = [{} for _ in columns]
+        codes = [array('i') for _ in columns]
+        rows = array('q')
+        previous = None
+        row = -1
+        for line in file:
+            fields = line.strip().split('\t')
+            if fields == ['']:
+                continue
+            row += 1
+            if fields[in_hand] == 'Main Camera':
+                fields[in_hand] = 'NONE'
+            if fields == previous:
+                continue
+            previous = fields
+            rows.append(row)
+            for vocabulary, column_codes, value in zip(vocabularies, codes, fields):
+                column_codes.append(vocabulary.setdefault(value, len(vocabulary)))
+
+    # rows keep their position in the file, filter_data measures gaps between them
+    data = {column: pd.Categorical.from_codes(np.array(column_codes, dtype=np.int32), categories=list(vocabulary))
+            for column, vocabulary, column_codes in zip(columns, vocabularies, codes)}
+    return pd.DataFrame(data, index=np.array(rows, dtype=np.int64))
+
+
+def idle_only(df):
+    # categories are exactly the values seen in the file
+    return set(df['Activity'].cat.categories) == {'IdleMotion'}
 
 
 def only_idlemotion(file_path):
-    filtered_df = read_data(file_path)
-    return set(filtered_df['Activity']) == {'IdleMotion'}
+    return idle_only(read_data(file_path))
+
+
+def process_sequence(file_path, threshold):
+    sequence = read_data(file_path)
+    sequence = sequence[sequence['Activity'] != 'UnknownActivity']
+    return extract(sequence, threshold)
+
+
+def process_file(file_path, threshold):
+    # partial rich info of one demo file, combined with merge_rich_info
+    sequence = read_data(file_path)
+    if idle_only(sequence):
+        return {}
+    sequence = sequence[sequence['Activity'] != 'UnknownActivity']
+    return extract(sequence, threshold)
+
+
+def merge_rich_info(buffer, other):
+    # associative, so partial results can be reduced in any grouping
+    result = dict(buffer)
+    for activity, info in other.items():
+        if activity not in result:
+            result[activity] = info
+        else:
+            result[activity] = {
+                'precondition': simplify_dict(result[activity]['precondition'], info['precondition']),
+                'effect': simplify_dict(result[activity]['effect'], info['effect'])
+            }
+    return result
+
+
+def demo_directories(path):
+    # a demo directory or a list of them, as a list
+    return [path] if isinstance(path, (str, os.PathLike)) else list(path)
 
 
 class ActivityProcessor:
-    def __init__(self, path, threshold=20):
+    demo_files = ['data4testing_R.txt', 'data4testing_L.txt']
+
+    def __init__(self, path, threshold=20, workers=None):
+        # path is a single demo directory or a list of them
         self.path = path
         self.threshold = threshold
+        self.workers = workers
         self.rich_info = self.merge()
 
+    @property
+    def file_paths(self):
+        return [os.path.join(path, file_name) for path in demo_directories(self.path) for file_name in self.demo_files]
+
     def process_sequence(self, file_path):
-        filtered_df = read_data(file_path)
-        sequence = filtered_df.loc[(filtered_df.shift() != filtered_df).any(axis=1)]
-        sequence = sequence[sequence['Activity'] != 'UnknownActivity']
-        sequence = extract(sequence, self.threshold)
-        return sequence
+        return process_sequence(file_path, self.threshold)
 
+    @profiling.stage('ActivityProcessor')
     def merge(self):
-        buffer = {}
-        for file_name in ['data4testing_R.txt', 'data4testing_L.txt']:
-            file_path = os.path.join(self.path, file_name)
-            if not only_idlemotion(file_path):
-                dicts = self.process_sequence(file_path)
-                for activity, info in dicts.items():
-                    if activity not in buffer:
-                        buffer[activity] = info
-                    else:
-                        existing_precondition = buffer[activity]['precondition']
-                        existing_effect = buffer[activity]['effect']
-                        updated_precondition = simplify_dict(existing_precondition, info['precondition'])
-                        updated_effect = simplify_dict(existing_effect, info['effect'])
-                        buffer[activity] = {
-                            'precondition': updated_precondition,
-                            'effect': updated_effect
-                        }
-        return buffer
+        file_paths = self.file_paths
+        workers = self.workers
+        if workers is None:
+            workers = 1 if len(file_paths) <= len(self.demo_files) else os.cpu_count()
+        if workers == 1:
+            partials = [process_file(file_path, self.threshold) for file_path in file_paths]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                partials = list(executor.map(process_file, file_paths, repeat(self.threshold)))
+        return reduce(merge_rich_info, partials, {})
 
 
 if __name__ == "__main__":
-    path = 'data/13_demos'
+    path = sys.argv[1:] or 'data/13_demos'
     threshold = 15
     processor = ActivityProcessor(path, threshold)
     rich_info = processor.rich_info
@@ -0,0 +1,164 @@
+import functools
+import json
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+
+# wall time, call count and tracemalloc peak per pipeline stage. Off by default: a disabled stage costs one flag test,
+# and memory is only traced when enabled with trace_memory=True, as tracemalloc slows every allocation down
+enabled = False
+memory = False
+_started_tracing = False
+_stats = {}
+_lock = threading.Lock()
+_local = threading.local()
+# open traced stages per thread, and how often a thread opened one while another thread had one open
+_open = {}
+_overlaps = 0
+
+
+def enable(trace_memory=False):
+    # may be called again to switch memory tracing on or off; tracing started by someone else is left running
+    global enabled, memory, _started_tracing
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _started_tracing = True
+    elif not trace_memory and _started_tracing:
+        tracemalloc.stop()
+        _started_tracing = False
+    memory = trace_memory
+    enabled = True
+
+
+def disable():
+    global enabled
+    enable(False)
+    enabled = False
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+def stats():
+    # {stage: {'calls', 'total', 'mean', 'max', 'last', 'peak'}} with times in seconds and peaks in bytes above the
+    # traced memory at the start of the stage (None when memory was never traced)
+    with _lock:
+        return {name: dict(record, mean=record['total'] / record['calls']) for name, record in _stats.items()}
+
+
+def dump(file_path):
+    with open(file_path, 'w') as file:
+        json.dump({'created': datetime.now().isoformat(timespec='seconds'), 'stages': stats()}, file, indent=2)
+
+
+def _record(name, elapsed, peak):
+    with _lock:
+        record = _stats.get(name)
+        if record is None:
+            record = _stats[name] = {'calls': 0, 'total': 0.0, 'max': 0.0, 'last': 0.0, 'peak': None}
+        record['calls'] += 1
+        record['total'] += elapsed
+        record['max'] = max(record['max'], elapsed)
+        record['last'] = elapsed
+        if peak is not None:
+            record['peak'] = max(record['peak'] or 0, peak)
+
+
+class stage:
+    # `with stage('layout'):` or `@stage('parse_graph')`. Nested stages each get their own peak: tracemalloc has one
+    # peak per process, so entering a stage folds the peak so far into the enclosing stage before resetting it. For
+    # the same reason a peak is only recorded for stages that ran while no other thread had a stage open (a redraw on
+    # the Tk thread during a job on the worker): such calls are timed, but leave the stage's peak as it was
+    def __init__(self, name):
+        self.name = name
+        self._start = None
+
+    def __enter__(self):
+        if not enabled:
+            return self
+        self._traced = memory and tracemalloc.is_tracing()
+        if self._traced:
+            global _overlaps
+            stack = _local.__dict__.setdefault('stack', [])
+            thread = threading.get_ident()
+            with _lock:
+                self._shared = any(count for other, count in _open.items() if other != thread)
+                if self._shared:
+                    _overlaps += 1
+                _open[thread] = _open.get(thread, 0) + 1
+                self._overlaps = _overlaps
+                current, peak = tracemalloc.get_traced_memory()
+                if not self._shared:
+                    if stack:
+                        stack[-1]._peak = max(stack[-1]._peak, peak)
+                    tracemalloc.reset_peak()
+            self._base = self._peak = current
+            stack.append(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._start is None:
+            return False
+        elapsed = time.perf_counter() - self._start
+        self._start = None
+        peak = None
+        if self._traced:
+            stack = _local.stack
+            stack.pop()
+            thread = threading.get_ident()
+            with _lock:
+                _open[thread] -= 1
+                if not _open[thread]:
+                    del _open[thread]
+                # no peak when tracing was switched off inside the stage, or another thread shared the peak
+                if tracemalloc.is_tracing() and not self._shared and self._overlaps == _overlaps:
+                    self._peak = max(self._peak, tracemalloc.get_traced_memory()[1])
+                    if stack:
+                        stack[-1]._peak = max(stack[-1]._peak, self._peak)
+                    peak = self._peak - self._base
+        _record(self.name, elapsed, peak)
+        return False
+
+    def __call__(self, function):
+        name = self.name
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return function(*args, **kwargs)
+            with stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+
+
+def timed(function, *args, **kwargs):
+    # one call and its wall time, for the benchmarks
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def peak_memory(function, *args, **kwargs):
+    # one call under tracemalloc (which slows it down) and the peak of its Python allocations
+    tracemalloc.start()
+    try:
+        result = function(*args, **kwargs)
+        return result, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def format_stats(records=None):
+    # one line per stage, slowest first, for the stats panel and the console
+    records = stats() if records is None else records
+    lines = [f"{'stage':<18} {'calls':>5} {'total s':>8} {'mean ms':>8} {'peak MB':>8}"]
+    for name, record in sorted(records.items(), key=lambda item: -item[1]['total']):
+        peak = f"{record['peak'] / 2 ** 20:>8.1f}" if record['peak'] is not None else f"{'-':>8}"
+        mean = record['mean'] * 1000
+        lines.append(f"{name[:18]:<18} {record['calls']:>5} {record['total']:>8.3f} {mean:>8.1f} {peak}")
+    return '\n'.join(lines)
@@ -0,0 +1,242 @@
+import heapq
+import os
+import random
+import time
+import networkx as nx
+import numpy as np
+import pandas as pd
+import pre_eff
+import utils
+
+
+# the implementations the optimizations replaced, timed against them by benchmark.py and compared with them by the
+# tests, and helpers to compare their results
+
+
+def reference_read_data(file_path):
+    # readlines-based reader that pre_eff.read_data replaced, followed by the old de-duplication
+    with open(file_path, 'r') as file:
+        line = file.readlines()
+    start_index = line.index('@data\n') + 1
+    data_lines = line[start_index:]
+    df = pd.DataFrame([line.strip().split('\t') for line in data_lines if line.strip() != ''],
+                      columns=['Hand', 'ObjectActedOn', 'ObjectInHand', 'HandState', 'Activity'])
+    df.loc[df['ObjectInHand'] == 'Main Camera', 'ObjectInHand'] = 'NONE'
+    return df.loc[(df.shift() != df).any(axis=1)]
+
+
+def reference_filter_data(df, threshold):
+    # row-by-row implementation that pre_eff.filter_data replaced
+    remove_indices = []
+    last_index = None
+    for index, row in df.iterrows():
+        if last_index is not None and index - last_index < threshold:
+            remove_indices.append(last_index)
+        last_index = index
+
+    activity_idx = []
+    last_activity = None
+    for index, row in df.iterrows():
+        current_activity = row['Activity']
+        if current_activity != last_activity:
+            activity_idx.append(index)
+            last_activity = current_activity
+
+    for i in range(1, len(activity_idx) - 1):
+        current_index = activity_idx[i]
+        previous_index = activity_idx[i - 1]
+        next_index = activity_idx[i + 1]
+        if df.at[current_index, 'Activity'] == 'IdleMotion':
+            if df.at[previous_index, 'Activity'] == df.at[next_index, 'Activity']:
+                remove_indices.extend(df.loc[current_index:next_index].index)
+
+    mask = ~df.index.isin(remove_indices)
+    df = df[mask]
+    return df.reset_index(drop=True)
+
+
+def reference_extract(df, threshold):
+    # run-by-run implementation that pre_eff.extract replaced
+    df_filter = reference_filter_data(df, threshold)
+    buffer = {}
+    last_activity = None
+    start_index = 0
+
+    for index, activity in enumerate(df_filter['Activity']):
+        if activity != last_activity:
+            if last_activity is not None:
+                precondition = df_filter.iloc[start_index][0:4].to_dict()
+                effect = df_filter.iloc[index][0:4].to_dict()
+                if last_activity in buffer:
+                    buffer[last_activity]['precondition'] = pre_eff.simplify_dict(
+                        buffer[last_activity]['precondition'], precondition)
+                    buffer[last_activity]['effect'] = pre_eff.simplify_dict(buffer[last_activity]['effect'], effect)
+                else:
+                    buffer[last_activity] = {'precondition': precondition, 'effect': effect}
+            start_index = index
+            last_activity = activity
+
+    if last_activity is not None:
+        precondition = df_filter.iloc[start_index][0:4].to_dict()
+        if last_activity in buffer:
+            buffer[last_activity]['precondition'] = pre_eff.simplify_dict(
+                buffer[last_activity]['precondition'], precondition)
+        else:
+            buffer[last_activity] = {'precondition': precondition, 'effect': {}}
+    return buffer
+
+
+def sequence(df):
+    # the same preparation ActivityProcessor.process_sequence applies before extract
+    df = df.copy()
+    df.loc[df['ObjectInHand'] == 'Main Camera', 'ObjectInHand'] = 'NONE'
+    df = df.loc[(df.shift() != df).any(axis=1)]
+    return df[df['Activity'] != 'UnknownActivity']
+
+
+def reference_refine_graph(graph, rich_info):
+    # per-edge utils.match loop that the RichIndex check replaced
+    refined_graph = nx.DiGraph()
+    refined_graph.add_nodes_from(graph.nodes)
+    for u, v, data in graph.edges(data=True):
+        if u in rich_info and v in rich_info and 'effect' in rich_info[u] and 'precondition' in rich_info[v]:
+            if utils.match(rich_info[v]['precondition'], rich_info[u]['effect']):
+                refined_graph.add_edge(u, v, weight=data['weight'])
+    return refined_graph
+
+
+def reference_hit_test(pos, x, y, radius=0.1):
+    # the old on_click loop
+    for node, node_pos in pos.items():
+        if ((x - node_pos[0]) ** 2 + (y - node_pos[1]) ** 2) ** 0.5 < radius:
+            return node
+    return None
+
+
+def reference_curved_label_layout(ax, pos, edges, rad):
+    # the per-label transforms of the old my_draw_networkx_edge_labels loop
+    xy = []
+    for n1, n2 in edges:
+        pos_1 = ax.transData.transform(np.array(pos[n1]))
+        pos_2 = ax.transData.transform(np.array(pos[n2]))
+        linear_mid = 0.5 * pos_1 + 0.5 * pos_2
+        d_pos = pos_2 - pos_1
+        ctrl_1 = linear_mid + rad * np.array([(0, 1), (-1, 0)]) @ d_pos
+        bezier_mid = 0.5 * (0.5 * pos_1 + 0.5 * ctrl_1) + 0.5 * (0.5 * pos_2 + 0.5 * ctrl_1)
+        xy.append(ax.transData.inverted().transform(bezier_mid))
+    return np.array(xy).reshape(-1, 2)
+
+
+def reference_segment_stats(runs, time, velocity, position):
+    # a loop over the samples of every segment, samples indexed by demo row
+    rows = []
+    for start, stop in zip(runs['start'], runs['stop']):
+        stop = min(stop, len(time))
+        if stop - start < 2:
+            rows.append((np.nan, np.nan, np.nan))
+            continue
+        length = sum(np.linalg.norm(position[i + 1] - position[i]) for i in range(start, stop - 1))
+        peak = max(np.linalg.norm(velocity[i]) for i in range(start, stop))
+        rows.append((time[stop - 1] - time[start], length, peak))
+    return np.array(rows).reshape(-1, 3)
+
+
+def reference_transitions(activities):
+    # the pair loop the weights would be counted with by hand
+    counts = {}
+    previous = None
+    for activity in activities:
+        if activity == 'UnknownActivity' or activity == previous:
+            continue
+        if previous is not None:
+            counts[(previous, activity)] = counts.get((previous, activity), 0) + 1
+        previous = activity
+    return counts
+
+
+def reference_nx_to_matrix(graph):
+    # per-edge fill with a node index rebuilt on every call, which the CSR export replaced
+    node_to_index = {node: index for index, node in enumerate(graph.nodes())}
+    matrix = np.zeros((len(node_to_index), len(node_to_index)))
+    for source, target, data in graph.edges(data=True):
+        matrix[node_to_index[source]][node_to_index[target]] = data['weight']
+    return matrix
+
+
+def reference_monte_carlo_widest_path(graph, start_node, end_node, iterations=3000, randomness_factor=0.2):
+    # one walk at a time over graph views with the global random module, which the batched sampler replaced
+    best_path = None
+    best_min_width = -np.inf
+    for _ in range(iterations):
+        path = [start_node]
+        visited = {start_node}
+        current_node = start_node
+        min_width = np.inf
+        while current_node != end_node:
+            next_nodes = [n for n, d in graph[current_node].items() if 'weight' in d and n not in visited]
+            if len(next_nodes) == 0:
+                break
+            if random.random() < randomness_factor:
+                chosen_node = random.choice(next_nodes)
+            else:
+                chosen_node = next_nodes[np.argmax([graph[current_node][n]['weight'] for n in next_nodes])]
+            min_width = min(min_width, graph[current_node][chosen_node]['weight'])
+            current_node = chosen_node
+            path.append(current_node)
+            visited.add(current_node)
+        if current_node == end_node and min_width > best_min_width:
+            best_path = path
+            best_min_width = min_width
+    return best_path, best_min_width
+
+
+def reference_merge(directories, threshold):
+    # the one-buffer loop ActivityProcessor.merge ran over the demo files before partial results were reduced
+    buffer = {}
+    for directory in directories:
+        for file_name in pre_eff.ActivityProcessor.demo_files:
+            file_path = os.path.join(directory, file_name)
+            if pre_eff.only_idlemotion(file_path):
+                continue
+            for activity, info in pre_eff.process_sequence(file_path, threshold).items():
+                if activity not in buffer:
+                    buffer[activity] = info
+                else:
+                    buffer[activity] = {
+                        'precondition': pre_eff.simplify_dict(buffer[activity]['precondition'], info['precondition']),
+                        'effect': pre_eff.simplify_dict(buffer[activity]['effect'], info['effect'])
+                    }
+    return buffer
+
+
+def comparable(rich_info):
+    # merged values come out of sets, so their order is arbitrary
+    return {activity: {kind: {key: frozenset(value) if isinstance(value, list) else value
+                              for key, value in entry.items()}
+                       for kind, entry in info.items()}
+            for activity, info in rich_info.items()}
+
+
+class EventLoop:
+    # the root.after part of Tk, so JobRunner can be run and timed without a display
+    def __init__(self):
+        self.timers = []
+        self.count = 0
+
+    def after(self, ms, callback):
+        self.count += 1
+        heapq.heappush(self.timers, (time.monotonic() + ms / 1000, self.count, callback))
+        return self.count
+
+    def after_cancel(self, timer):
+        self.timers = [entry for entry in self.timers if entry[1] != timer]
+        heapq.heapify(self.timers)
+
+    def report_callback_exception(self, *exc_info):
+        raise exc_info[1]
+
+    def run_while(self, condition):
+        while self.timers and condition():
+            due, _, callback = heapq.heappop(self.timers)
+            time.sleep(max(0.0, due - time.monotonic()))
+            callback()
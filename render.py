@@ -0,0 +1,107 @@
+import argparse
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from pre_eff import ActivityProcessor
+import utils
+from graph_parser import parse_graph
+from renderer import GraphRenderer
+from layout import LayoutStore
+
+
+def output_name(directory):
+    # data/task_graph/2023-11-27-15-09-22 -> task_graph_2023-11-27-15-09-22
+    parts = os.path.normpath(directory).split(os.sep)
+    return '_'.join(part for part in parts[-2:] if part not in ('', '.', '..'))
+
+
+def render_directory(directory, out_dir='renders', formats=('png',), refine=False, method='planar', threshold=20,
+                     dpi=300, verbose=False):
+    # renders the task graph of one demo directory, plus its refined graph with the same layout
+    # the exported task_graph.txt, or the recorded bag for sessions that were never exported
+    graph_file = os.path.join(directory, 'task_graph.txt')
+    if not os.path.exists(graph_file):
+        graph_file = os.path.join(directory, 'task_graph.bag')
+    graph = parse_graph(graph_file)
+    graphs = {'original': graph}
+    if refine:
+        rich_info = ActivityProcessor(directory, threshold, workers=1).rich_info
+        if verbose:
+            # refine_graph logs every removed edge at debug level, only worth reading for a single directory; set up
+            # here as the directory may be rendered in a worker process
+            logging.basicConfig(format='%(message)s')
+            utils.logger.setLevel(logging.DEBUG)
+        graphs['refined'] = utils.refine_graph(graph, rich_info)
+
+    pos = LayoutStore(method).get(graph)
+    fig, ax = plt.subplots(figsize=(10, 7), dpi=100)
+    fig.subplots_adjust(left=0.05, right=0.95, top=0.95, bottom=0.05)
+    renderer = GraphRenderer(ax, pos)
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    try:
+        for kind, current in graphs.items():
+            renderer.set_graph(current)
+            for extension in formats:
+                file_path = os.path.join(out_dir, f'{output_name(directory)}_{kind}.{extension}')
+                renderer.save(file_path, dpi=dpi)
+                written.append(file_path)
+    finally:
+        plt.close(fig)
+    return written
+
+
+def render_all(directories, workers=None, **kwargs):
+    # one directory per process; returns {directory: written files or the exception it raised}
+    render = partial(_render_safely, **kwargs)
+    if workers is None:
+        workers = min(len(directories), os.cpu_count() or 1)
+    if workers <= 1:
+        results = [render(directory) for directory in directories]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(render, directories))
+    return dict(zip(directories, results))
+
+
+def _render_safely(directory, **kwargs):
+    try:
+        return render_directory(directory, **kwargs)
+    except Exception as e:
+        return e
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render task graphs to image files without a display.")
+    parser.add_argument('directories', nargs='+', help="demo directories holding task_graph.txt and data4testing_*.txt")
+    parser.add_argument('-o', '--out', default='renders', help="output directory (default: renders)")
+    parser.add_argument('-f', '--format', nargs='+', choices=('png', 'svg'), default=['png'], dest='formats')
+    parser.add_argument('--refine', action='store_true', help="also render the graph refined with the rich info")
+    parser.add_argument('--layout', choices=('planar', 'spring'), default='planar')
+    parser.add_argument('--threshold', type=int, default=20)
+    parser.add_argument('--dpi', type=int, default=300)
+    parser.add_argument('-j', '--workers', type=int, default=None)
+    parser.add_argument('-v', '--verbose', action='store_true', help="log the edges removed by refine")
+    args = parser.parse_args(argv)
+
+    results = render_all(args.directories, workers=args.workers, out_dir=args.out, formats=args.formats,
+                         refine=args.refine, method=args.layout, threshold=args.threshold, dpi=args.dpi,
+                         verbose=args.verbose)
+    failed = 0
+    for directory, result in results.items():
+        if isinstance(result, Exception):
+            failed += 1
+            print(f"{directory}: failed, {result}", file=sys.stderr)
+        else:
+            for file_path in result:
+                print(file_path)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+from matplotlib.colors import to_rgba
+from matplotlib.patches import FancyArrowPatch
+import networkx as nx
+import numpy as np
+import my_networkx as my_nx
+import profiling
+from hit_test import HitIndex
+
+
+node_color = '#4f5d75'
+highlight_color = '#ffc857'
+edge_color = '#bfc0c0'
+start_color = '#db3a34'
+end_color = '#177e89'
+
+
+class GraphRenderer:
+    # node, edge and label artists are created once per graph and kept keyed by node/edge. Highlights are animated
+    # artists blitted over a cached background, so selecting nodes or paths never redraws the whole scene.
+    def __init__(self, ax, pos, node_size=600, arc_rad=0.1, font_size=12):
+        self.ax = ax
+        self.canvas = ax.figure.canvas
+        self.pos = pos
+        self.hit_index = HitIndex(pos)
+        self.node_size = node_size
+        self.arc_rad = arc_rad
+        self.font_size = font_size
+        self.graph = None
+        self._shape = None
+        self.node_artist = None
+        self.node_labels = {}
+        self.edge_artists = {}
+        self.edge_labels = {}
+        self.curved_labels = {}
+        self.curved_edges = set()
+        self._highlight_artists = {}
+        self._overlay = None
+        self._hover = None
+        self.hovered = None
+        self._stamp = None
+        self._node_index = {}
+        self._node_colors = None
+        self._overlay_nodes = []
+        self._overlay_edges = []
+        self._background = None
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+        self.canvas.mpl_connect('resize_event', self._on_resize)
+
+    def set_pos(self, pos):
+        # the hit-test index follows the layout, the next changed() check asks for a redraw
+        self.pos = pos
+        self.hit_index = HitIndex(pos)
+        self._shape = None
+
+    def node_at(self, x, y, tolerance=None):
+        # node under the display point (x, y), by default within the drawn node radius
+        if tolerance is None:
+            tolerance = self.node_size ** 0.5 / 2 * self.ax.figure.dpi / 72
+        node = self.hit_index.node_at(self.ax, x, y, tolerance)
+        return node if self.graph is not None and node in self.graph else None
+
+    def hover(self, node):
+        # ring around the node under the cursor, blitted only when it moves to another node
+        if node == self.hovered or self._hover is None:
+            return
+        self.hovered = node
+        self._hover.set_offsets(np.array([self.pos[node]] if node is not None else []).reshape(-1, 2))
+        self.blit()
+
+    def changed(self, graph):
+        return graph is not self.graph or self._shape != (graph.number_of_nodes(), graph.number_of_edges())
+
+    @profiling.stage('set_graph')
+    def set_graph(self, graph, visible=True):
+        # with visible=False every artist starts hidden and is shown later through reveal()
+        ax = self.ax
+        ax.clear()
+        self.graph = graph
+        self._shape = (graph.number_of_nodes(), graph.number_of_edges())
+        self._highlight_artists = {}
+        self._overlay_nodes, self._overlay_edges = [], []
+        self.hovered = None
+
+        self.node_artist = nx.draw_networkx_nodes(graph, self.pos, node_size=self.node_size, node_color=node_color,
+                                                  ax=ax)
+        self.node_labels = nx.draw_networkx_labels(graph, self.pos, ax=ax)
+
+        edge_weights = nx.get_edge_attributes(graph, 'weight')
+        curved_edges = [edge for edge in graph.edges() if graph.has_edge(edge[1], edge[0]) and edge in edge_weights]
+        self.curved_edges = set(curved_edges)
+        straight_edges = [edge for edge in graph.edges() if edge not in self.curved_edges]
+
+        self.edge_artists = {}
+        if straight_edges:
+            artists = nx.draw_networkx_edges(graph, self.pos, ax=ax, edgelist=straight_edges, edge_color=edge_color,
+                                             width=2, arrowstyle='-|>', arrowsize=15)
+            self.edge_artists.update(zip(straight_edges, artists))
+        if curved_edges:
+            artists = nx.draw_networkx_edges(graph, self.pos, ax=ax, edgelist=curved_edges,
+                                             connectionstyle=f'arc3, rad = {self.arc_rad}', edge_color=edge_color,
+                                             width=2, arrowstyle='-|>', arrowsize=15)
+            self.edge_artists.update(zip(curved_edges, artists))
+
+        curved_edge_labels = {edge: edge_weights.get(edge) for edge in curved_edges}
+        straight_edge_labels = {edge: edge_weights.get(edge) for edge in straight_edges}
+        self.curved_labels = my_nx.my_draw_networkx_edge_labels(graph, self.pos, ax=ax,
+                                                                edge_labels=curved_edge_labels,
+                                                                font_size=self.font_size, rotate=False,
+                                                                rad=self.arc_rad)
+        self.edge_labels = dict(self.curved_labels)
+        self.edge_labels.update(nx.draw_networkx_edge_labels(graph, self.pos, ax=ax, edge_labels=straight_edge_labels,
+                                                             font_size=self.font_size, rotate=False))
+
+        self._overlay = ax.scatter(np.empty(0), np.empty(0), s=self.node_size, marker='o', animated=True, zorder=2)
+        self._hover = ax.scatter(np.empty(0), np.empty(0), s=self.node_size * 1.6, marker='o', facecolors='none',
+                                 edgecolors=highlight_color, linewidths=2, animated=True, zorder=2)
+        self._stamp = ax.scatter(np.empty(0), np.empty(0), s=self.node_size, marker='o', c=node_color, animated=True,
+                                 zorder=2)
+        self._node_index = {node: i for i, node in enumerate(graph)}
+        self._node_colors = np.tile(to_rgba(node_color), (len(graph), 1))
+        if not visible:
+            self._node_colors[:, 3] = 0
+            for artists in (self.node_labels, self.edge_artists, self.edge_labels):
+                for artist in artists.values():
+                    artist.set_visible(False)
+        if self.node_artist is not None:
+            self.node_artist.set_facecolor(self._node_colors)
+        with profiling.stage('canvas.draw'):
+            self.canvas.draw()
+
+    def reveal(self, nodes=(), edges=()):
+        # shows hidden artists by drawing only them onto the cached background; call highlight() or blit() after
+        nodes = [node for node in nodes if node in self._node_index]
+        edges = [edge for edge in edges if edge in self.edge_artists]
+        for artist in self._reveal_artists(nodes, edges):
+            artist.set_visible(True)
+        if nodes:
+            self._node_colors[[self._node_index[node] for node in nodes], 3] = 1
+            self.node_artist.set_facecolor(self._node_colors)
+            self._stamp.set_offsets(np.array([self.pos[node] for node in nodes]).reshape(-1, 2))
+
+        if self._background is None:
+            return
+        self.canvas.restore_region(self._background)
+        for artist in self._reveal_artists(nodes, edges):
+            self.ax.draw_artist(artist)
+        self._background = self.canvas.copy_from_bbox(self.ax.figure.bbox)
+
+    def reveal_all(self):
+        for artists in (self.node_labels, self.edge_artists, self.edge_labels):
+            for artist in artists.values():
+                artist.set_visible(True)
+        if self.node_artist is not None:
+            self._node_colors[:, 3] = 1
+            self.node_artist.set_facecolor(self._node_colors)
+        self._set_highlight()
+        self.canvas.draw_idle()
+
+    def _reveal_artists(self, nodes, edges):
+        artists = [self.edge_artists[edge] for edge in edges]
+        if nodes:
+            artists.append(self._stamp)
+        artists.extend(self.edge_labels[edge] for edge in edges if edge in self.edge_labels)
+        artists.extend(self.node_labels[node] for node in nodes)
+        return artists
+
+    @profiling.stage('highlight')
+    def highlight(self, nodes=(), edges=(), start=None, end=None):
+        self._set_highlight(nodes, edges, start, end)
+        self.blit()
+
+    def _set_highlight(self, nodes=(), edges=(), start=None, end=None):
+        # start and end keep their own colors on top of the highlighted nodes
+        colors = {node: highlight_color for node in nodes if node in self.node_labels}
+        if start in self.node_labels:
+            colors[start] = start_color
+        if end in self.node_labels:
+            colors[end] = end_color
+        self._overlay_nodes = list(colors)
+        self._overlay.set_offsets(np.array([self.pos[node] for node in colors]).reshape(-1, 2))
+        self._overlay.set_facecolor(list(colors.values()))
+        self._overlay_edges = [edge for edge in edges if edge in self.edge_artists]
+        for edge in self._overlay_edges:
+            self._highlight_artist(edge)
+
+    def clear_highlight(self):
+        self.highlight()
+
+    def _highlight_artist(self, edge):
+        # a thicker twin of the edge's artist, built directly so the axes are not re-autoscaled
+        artist = self._highlight_artists.get(edge)
+        if artist is None:
+            base = self.edge_artists[edge]
+            artist = FancyArrowPatch(self.pos[edge[0]], self.pos[edge[1]], arrowstyle='-|>',
+                                     connectionstyle=base.get_connectionstyle(), mutation_scale=20, linewidth=3,
+                                     color=highlight_color, shrinkA=base.shrinkA, shrinkB=base.shrinkB,
+                                     zorder=base.get_zorder(), animated=True)
+            self.ax.add_artist(artist)
+            self._highlight_artists[edge] = artist
+        return artist
+
+    def _overlay_artists(self):
+        artists = []
+        for edge in self._overlay_edges:
+            artists.append(self._highlight_artists[edge])
+            if edge in self.edge_labels:
+                artists.append(self.edge_labels[edge])
+        if self._overlay is not None:
+            artists.append(self._overlay)
+            artists.append(self._hover)
+        artists.extend(self.node_labels[node] for node in self._overlay_nodes)
+        return artists
+
+    def _draw_overlay(self):
+        for artist in self._overlay_artists():
+            self.ax.draw_artist(artist)
+
+    def _on_resize(self, event):
+        # curved label midpoints are placed in display space, move them along with the window
+        if self.curved_labels:
+            my_nx.my_update_networkx_edge_labels(self.curved_labels, self.pos, ax=self.ax, rotate=False,
+                                                 rad=self.arc_rad)
+
+    def _on_draw(self, event):
+        # every full draw, including resizes, refreshes the cached background
+        if self.graph is None or not hasattr(event.canvas, 'copy_from_bbox'):
+            return
+        self._background = event.canvas.copy_from_bbox(self.ax.figure.bbox)
+        self._draw_overlay()
+
+    def blit(self):
+        if self._background is None:
+            with profiling.stage('canvas.draw'):
+                self.canvas.draw()
+            return
+        self.canvas.restore_region(self._background)
+        self._draw_overlay()
+        self.canvas.blit(self.ax.figure.bbox)
+
+    def save(self, file_path, **kwargs):
+        # animated artists are skipped by savefig, draw the highlights as regular artists for the export
+        artists = [artist for artist in self._overlay_artists() if artist.get_animated() and artist is not self._hover]
+        for artist in artists:
+            artist.set_animated(False)
+        try:
+            self.ax.figure.savefig(file_path, **kwargs)
+        finally:
+            for artist in artists:
+                artist.set_animated(True)
+            self.canvas.draw_idle()
@@ -0,0 +1,156 @@
+import logging
+import networkx as nx
+import numpy as np
+import profiling
+from jobs import checkpoint
+
+
+logger = logging.getLogger(__name__)
+# stale edges Refiner.refine checks between two cancellation checkpoints
+CHUNK = 65536
+
+
+def as_list(value):
+    return value if isinstance(value, list) else [value]
+
+
+class RichIndex:
+    # every (attribute, value) pair such as ObjectInHand=3DPrintedCube_green owns one bit inside the words of its
+    # attribute, so a precondition/effect check becomes a few integer ANDs per attribute
+    def __init__(self, rich_info):
+        self.nodes = list(rich_info)
+        self.node_index = {node: i for i, node in enumerate(self.nodes)}
+        self.attributes = sorted({key for info in rich_info.values()
+                                  for kind in ('precondition', 'effect') for key in info.get(kind, {})})
+        attribute_index = {attribute: i for i, attribute in enumerate(self.attributes)}
+        self.bits = {attribute: {} for attribute in self.attributes}
+
+        # collect (node, attribute, bit) triples first, the words are filled in one vectorized pass below
+        triples = {'precondition': ([], [], []), 'effect': ([], [], [])}
+        self.has_precondition = np.zeros(len(self.nodes), dtype=bool)
+        self.has_effect = np.zeros(len(self.nodes), dtype=bool)
+        required = ([], [])
+        for i, node in enumerate(self.nodes):
+            info = rich_info[node]
+            self.has_precondition[i] = 'precondition' in info
+            self.has_effect[i] = 'effect' in info
+            for key in info.get('precondition', {}):
+                required[0].append(i)
+                required[1].append(attribute_index[key])
+            for kind, (rows, attributes, bits) in triples.items():
+                for key, values in info.get(kind, {}).items():
+                    value_bits = self.bits[key]
+                    for value in as_list(values):
+                        rows.append(i)
+                        attributes.append(attribute_index[key])
+                        bits.append(value_bits.setdefault(value, len(value_bits)))
+
+        words = [max(1, -(-len(self.bits[attribute]) // 64)) for attribute in self.attributes]
+        self.word_offsets = np.concatenate(([0], np.cumsum(words))).astype(np.intp)
+        shape = (len(self.nodes), int(self.word_offsets[-1]))
+        self.required = np.zeros((len(self.nodes), len(self.attributes)), dtype=bool)
+        self.required[required] = True
+        self.precondition = self._masks(shape, *triples['precondition'])
+        self.effect = self._masks(shape, *triples['effect'])
+
+    def _masks(self, shape, rows, attributes, bits):
+        masks = np.zeros(shape, dtype=np.uint64)
+        bits = np.asarray(bits, dtype=np.uint64)
+        columns = self.word_offsets[np.asarray(attributes, dtype=np.intp)] + (bits // np.uint64(64)).astype(np.intp)
+        values = np.left_shift(np.uint64(1), bits % np.uint64(64))
+        np.bitwise_or.at(masks, (np.asarray(rows, dtype=np.intp), columns), values)
+        return masks
+
+    def ids(self, nodes):
+        return np.fromiter((self.node_index.get(node, -1) for node in nodes), dtype=np.intp)
+
+    def compatible(self, u, v):
+        return bool(self.compatible_edges([u], [v])[0])
+
+    def compatible_edges(self, sources, targets):
+        # the effect of every source must satisfy, per attribute, the precondition of its target
+        return self.compatible_ids(self.ids(sources), self.ids(targets))
+
+    def compatible_ids(self, u, v):
+        # compatible_edges on ids of this index, -1 for nodes without rich info
+        known = (u >= 0) & (v >= 0)
+        if not len(self.nodes):
+            return known
+        u, v = np.where(known, u, 0), np.where(known, v, 0)
+        result = known & self.has_effect[u] & self.has_precondition[v]
+        if self.attributes:
+            hits = (self.effect[u] & self.precondition[v]) != 0
+            attribute_hits = np.logical_or.reduceat(hits, self.word_offsets[:-1], axis=1)
+            result &= np.all(attribute_hits | ~self.required[v], axis=1)
+        return result
+
+
+class Refiner:
+    # remembers the verdict of every (u, v) edge, so refining again only checks new edges and the edges of nodes whose
+    # rich info changed. Verdicts of edges that left the graph are dropped, the cache never outgrows the graph
+    def __init__(self, rich_info):
+        self.rich_info = rich_info
+        self.verdicts = {}
+        self._changed = set()
+
+    def set_rich_info(self, rich_info):
+        self.rich_info = rich_info
+        self.verdicts.clear()
+        self._changed.clear()
+
+    def update(self, nodes):
+        # call after changing the rich_info entries of these nodes in place
+        self._changed.update(nodes)
+
+    def apply(self, entries):
+        # {node: entry} into the refiner's own rich_info, an entry of None removing the node's rich info
+        for node, entry in entries.items():
+            if entry is None:
+                self.rich_info.pop(node, None)
+            else:
+                self.rich_info[node] = entry
+        self.update(entries)
+
+    def _forget(self, graph):
+        # the verdicts of the edges of changed nodes, found through their adjacency so the cost follows their degree.
+        # Edges of a changed node that are not in graph are dropped below as edges that left the graph
+        verdicts = self.verdicts
+        predecessors = graph.pred if graph.is_directed() else graph.adj
+        for node in self._changed:
+            if node in graph:
+                for v in graph.adj[node]:
+                    verdicts.pop((node, v), None)
+                for u in predecessors[node]:
+                    verdicts.pop((u, node), None)
+        self._changed.clear()
+
+    @profiling.stage('Refiner.refine')
+    def refine(self, graph):
+        self._forget(graph)
+        verdicts = self.verdicts
+        edges = list(graph.edges(data=True))
+        stale = [(u, v) for u, v, _ in edges if (u, v) not in verdicts]
+
+        if stale:
+            # removals are logged at debug level: refining runs on every live refresh, printing would flood stdout
+            debug = logger.isEnabledFor(logging.DEBUG)
+            nodes = {node for edge in stale for node in edge if node in self.rich_info}
+            index = RichIndex({node: self.rich_info[node] for node in nodes})
+            # checked in chunks so a superseded refine stops early; the verdicts set so far stay valid
+            for start in range(0, len(stale), CHUNK):
+                checkpoint()
+                chunk = stale[start:start + CHUNK]
+                for (u, v), verdict in zip(chunk, index.compatible_edges([u for u, _ in chunk], [v for _, v in chunk])):
+                    verdicts[(u, v)] = bool(verdict)
+                    if debug and not verdict:
+                        logger.debug("Removing edge (%s, %s): effect of %s does not satisfy precondition of %s.",
+                                     u, v, u, v)
+        if len(verdicts) > len(edges):
+            # every edge of graph has a verdict, so the others belong to edges that are gone
+            self.verdicts = verdicts = {(u, v): verdicts[(u, v)] for u, v, _ in edges}
+
+        checkpoint()
+        refined_graph = nx.DiGraph()
+        refined_graph.add_nodes_from(graph.nodes)
+        refined_graph.add_edges_from((u, v, {'weight': data['weight']}) for u, v, data in edges if verdicts[(u, v)])
+        return refined_graph
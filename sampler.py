@@ -0,0 +1,140 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import profiling
+from jobs import checkpoint
+from csr import CSRGraph
+
+
+def _visit(visited, walks, nodes):
+    visited[walks, nodes >> 6] |= np.left_shift(np.uint64(1), (nodes & 63).astype(np.uint64))
+
+
+def sample_walks(indptr, targets, weights, start, end, num_walks, randomness_factor, rng):
+    # num_walks random walks from start over the CSR arrays, advanced together one step per iteration. A walk moves to
+    # a random unvisited neighbor with probability randomness_factor and to the first widest unvisited one otherwise,
+    # as monte_carlo_widest_path always did; the visited nodes of every walk are a row of bits. A walk ends at a dead
+    # end, at end, or once it is no wider than the best walk that already arrived, as it could not beat it. Returns
+    # the best width and the node ids of its walk, (-inf, None) when no walk arrived
+    if start == end:
+        return np.inf, [start]
+    num_nodes = len(indptr) - 1
+    visited = np.zeros((num_walks, (num_nodes + 63) // 64), dtype=np.uint64)
+    walks = np.arange(num_walks)
+    current = np.full(num_walks, start, dtype=np.int64)
+    width = np.full(num_walks, np.inf)
+    _visit(visited, walks, current)
+    # (walks, their nodes) of every step, walks staying sorted, to rebuild the best walk
+    history = [(walks, current)]
+    best_width, best_walk = -np.inf, None
+    while len(walks):
+        # every out edge of every live walk, grouped by walk
+        first = indptr[current]
+        degrees = indptr[current + 1] - first
+        owner = np.repeat(np.arange(len(walks)), degrees)
+        edges = np.arange(len(owner)) + np.repeat(first - (np.cumsum(degrees) - degrees), degrees)
+        neighbors = targets[edges].astype(np.int64)
+        free = (visited[walks[owner], neighbors >> 6] >> (neighbors & 63).astype(np.uint64)) & np.uint64(1) == 0
+        counts = np.bincount(owner[free], minlength=len(walks))
+
+        # the pick-th free neighbor of an exploring walk, the first widest free one of the others
+        explore = rng.random(len(walks)) < randomness_factor
+        pick = (rng.random(len(walks)) * counts).astype(np.int64)
+        rank = np.cumsum(free) - 1 - np.repeat(np.cumsum(counts) - counts, degrees)
+        edge_weights = np.where(free, weights[edges], -np.inf)
+        widest = np.full(len(walks), -np.inf)
+        np.maximum.at(widest, owner, edge_weights)
+        chosen = free & np.where(explore[owner], rank == pick[owner], edge_weights == widest[owner])
+        positions = np.flatnonzero(chosen)
+        moving, firsts = np.unique(owner[positions], return_index=True)
+        chosen_edges = edges[positions[firsts]]
+
+        walks = walks[moving]
+        current = targets[chosen_edges].astype(np.int64)
+        width = np.minimum(width[moving], weights[chosen_edges])
+        _visit(visited, walks, current)
+        history.append((walks, current))
+
+        arrived = current == end
+        if arrived.any():
+            i = np.flatnonzero(arrived)[np.argmax(width[arrived])]
+            if width[i] > best_width:
+                best_width, best_walk = width[i], walks[i]
+        keep = ~arrived & (width > best_width)
+        walks, current, width = walks[keep], current[keep], width[keep]
+
+    if best_walk is None:
+        return -np.inf, None
+    path = []
+    for step_walks, step_nodes in history:
+        i = np.searchsorted(step_walks, best_walk)
+        if i == len(step_walks) or step_walks[i] != best_walk:
+            break
+        path.append(int(step_nodes[i]))
+    return best_width, path
+
+
+_arrays = None
+
+
+def _init_worker(indptr, targets, weights):
+    # the graph is sent once per worker process rather than with every batch
+    global _arrays
+    _arrays = indptr, targets, weights
+
+
+def _run_batch(start, end, num_walks, randomness_factor, seed):
+    return sample_walks(*_arrays, start, end, num_walks, randomness_factor, np.random.default_rng(seed))
+
+
+@profiling.stage('monte_carlo')
+def monte_carlo_widest_path(graph, start_node, end_node, iterations=3000, randomness_factor=0.2, seed=None,
+                            batch_size=500, patience=None, workers=1):
+    # iterations random walks in batches of batch_size, stopping once patience batches in a row have not found a wider
+    # path. Batch i always draws from the i-th child of seed, and batches are taken in order, so a seed gives the same
+    # path whatever the number of workers. workers=None uses every CPU
+    arrays = graph if isinstance(graph, CSRGraph) else CSRGraph.from_networkx(graph)
+    if start_node not in arrays or end_node not in arrays or iterations < 1:
+        return None, -np.inf
+    start, end = arrays.index[start_node], arrays.index[end_node]
+    sizes = [min(batch_size, iterations - i) for i in range(0, iterations, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    workers = workers or os.cpu_count()
+
+    def results():
+        if workers == 1:
+            for size, batch_seed in zip(sizes, seeds):
+                yield sample_walks(arrays.indptr, arrays.targets, arrays.weights, start, end, size, randomness_factor,
+                                   np.random.default_rng(batch_seed))
+            return
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(arrays.indptr, arrays.targets, arrays.weights)) as executor:
+            futures = [executor.submit(_run_batch, start, end, size, randomness_factor, batch_seed)
+                       for size, batch_seed in zip(sizes, seeds)]
+            try:
+                for future in futures:
+                    yield future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    best_width, best_path = -np.inf, None
+    stale = 0
+    batches = results()
+    try:
+        for width, path in batches:
+            checkpoint()
+            if width > best_width:
+                best_width, best_path = width, path
+                stale = 0
+            else:
+                stale += 1
+                if patience is not None and stale >= patience:
+                    break
+    finally:
+        batches.close()
+    if best_path is None:
+        return None, -np.inf
+    if np.isfinite(best_width):
+        best_width = arrays.weights.dtype.type(best_width).item()
+    return [arrays.names[node] for node in best_path], best_width
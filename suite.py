@@ -0,0 +1,183 @@
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import networkx as nx
+import numpy as np
+import utils
+from graph_parser import parse_graph
+from pre_eff import ActivityProcessor
+from profiling import peak_memory, timed
+from renderer import GraphRenderer
+from csr import CSRGraph
+from synthetic import write_demo_directory
+
+
+SIZES = (10, 1000, 100000)
+# largest size each stage is run at by default: the monte carlo walks of a batch carry a visited bit per node each,
+# and drawing pays matplotlib per node and edge label
+LIMITS = {'monte_carlo_widest_path': 100000, 'draw_graph': 1000}
+
+
+def stage_parse_graph(context):
+    context['graph'] = parse_graph(os.path.join(context['directory'], 'task_graph.txt'), cache_dir=None)
+
+
+def stage_activity_processor(context):
+    context['rich_info'] = ActivityProcessor(context['directory'], workers=1).rich_info
+
+
+def stage_csr_graph(context):
+    # converted once, the stages after it run on the arrays
+    context['arrays'] = CSRGraph.from_networkx(context['graph'])
+
+
+def stage_refine_graph(context):
+    utils.refine_graph(context['arrays'], context['rich_info'])
+
+
+def stage_monte_carlo_widest_path(context):
+    nodes = context['arrays'].names
+    utils.monte_carlo_widest_path(context['arrays'], nodes[0], nodes[len(nodes) // 2], seed=context['seed'])
+
+
+def stage_adjacency_matrix(context):
+    utils.adjacency_matrix(context['arrays'])
+
+
+def stage_draw_graph(context):
+    # the headless path of render.py on a layout computed beforehand, so only drawing and encoding are measured
+    fig, ax = plt.subplots(figsize=(10, 7), dpi=100)
+    try:
+        renderer = GraphRenderer(ax, context['pos'])
+        renderer.set_graph(context['graph'])
+        renderer.save(io.BytesIO(), format='png', dpi=100)
+    finally:
+        plt.close(fig)
+
+
+STAGES = {
+    'parse_graph': stage_parse_graph,
+    'ActivityProcessor': stage_activity_processor,
+    'CSRGraph': stage_csr_graph,
+    'refine_graph': stage_refine_graph,
+    'monte_carlo_widest_path': stage_monte_carlo_widest_path,
+    'adjacency_matrix': stage_adjacency_matrix,
+    'draw_graph': stage_draw_graph,
+}
+
+
+def measure(stage, context, memory=True):
+    # wall time of one run and, in a second run, the peak of Python allocations
+    seconds = timed(stage, context)[1]
+    peak = peak_memory(stage, context)[1] if memory else None
+    return seconds, peak
+
+
+def run_suite(sizes=SIZES, stages=tuple(STAGES), limits=LIMITS, memory=True, seed=0, verbose=True):
+    # every stage on a synthetic demo directory of each size, with size nodes in the task graph and size rows in
+    # each demo file. Later stages use the graph, rich info and arrays of the first three, so those always run
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            write_demo_directory(directory, size, size, seed)
+            context = {'directory': directory, 'seed': seed}
+            for name, stage in STAGES.items():
+                if name not in stages or size > limits.get(name, size):
+                    if name in ('parse_graph', 'ActivityProcessor', 'CSRGraph'):
+                        stage(context)
+                    results.append({'stage': name, 'size': size, 'skipped': True})
+                    continue
+                if name == 'draw_graph':
+                    context['pos'] = nx.circular_layout(context['graph'])
+                try:
+                    seconds, peak = measure(stage, context, memory)
+                except ImportError as e:
+                    # an optional dependency of the stage is missing
+                    results.append({'stage': name, 'size': size, 'skipped': True})
+                    if verbose:
+                        print(f"{format_result(results[-1])} ({e})", flush=True)
+                    continue
+                results.append({'stage': name, 'size': size, 'seconds': seconds, 'peak_bytes': peak})
+                if verbose:
+                    print(format_result(results[-1]), flush=True)
+    return results
+
+
+def format_result(result, baseline=None):
+    if result.get('skipped'):
+        return f"{result['stage']:>24} {result['size']:>8} {'skipped':>10}"
+    peak = f"{result['peak_bytes'] / 2 ** 20:>10.1f}" if result.get('peak_bytes') is not None else f"{'-':>10}"
+    line = f"{result['stage']:>24} {result['size']:>8} {result['seconds']:>10.4f} {peak}"
+    if baseline is not None and not baseline.get('skipped'):
+        line += f" {result['seconds'] / baseline['seconds']:>8.2f}x"
+        if result.get('peak_bytes') and baseline.get('peak_bytes'):
+            line += f" {result['peak_bytes'] / baseline['peak_bytes']:>8.2f}x"
+    return line
+
+
+def scipy_version():
+    try:
+        import scipy
+    except ImportError:
+        return None
+    return scipy.__version__
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {'created': datetime.now().isoformat(timespec='seconds'), 'commit': commit,
+            'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count(),
+            'numpy': np.__version__, 'networkx': nx.__version__, 'matplotlib': matplotlib.__version__,
+            'scipy': scipy_version()}
+
+
+def compare(results, baseline_results):
+    # results next to the run they are compared with, as time and peak memory ratios
+    baseline = {(result['stage'], result['size']): result for result in baseline_results}
+    print(f"{'stage':>24} {'size':>8} {'time (s)':>10} {'peak (MB)':>10} {'time':>9} {'memory':>9}")
+    for result in results:
+        print(format_result(result, baseline.get((result['stage'], result['size']))))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the pipeline on synthetic task graphs and demo logs.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES),
+                        help="task graph nodes and demo rows per run (default: %(default)s)")
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), default=list(STAGES))
+    parser.add_argument('--no-limits', action='store_true', help="run every stage at every size")
+    parser.add_argument('--no-memory', action='store_true', help="skip the second, traced run of every stage")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--out', default='benchmarks', help="directory of the JSON results (default: benchmarks)")
+    parser.add_argument('--compare', metavar='JSON', help="results of an earlier run to compare with")
+    args = parser.parse_args(argv)
+
+    print(f"{'stage':>24} {'size':>8} {'time (s)':>10} {'peak (MB)':>10}")
+    results = run_suite(args.sizes, args.stages, {} if args.no_limits else LIMITS, not args.no_memory, args.seed)
+    run = {'environment': environment(), 'sizes': args.sizes, 'seed': args.seed, 'results': results}
+    os.makedirs(args.out, exist_ok=True)
+    file_path = os.path.join(args.out, f"suite_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(file_path, 'w') as file:
+        json.dump(run, file, indent=2)
+    print(file_path)
+
+    if args.compare:
+        with open(args.compare) as file:
+            compare(results, json.load(file)['results'])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
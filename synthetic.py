@@ -0,0 +1,156 @@
+import os
+import random
+import sys
+import networkx as nx
+import numpy as np
+import pandas as pd
+from pre_eff import ActivityProcessor, run_starts
+
+
+def task_graph_edges(num_nodes, out_degree=3, max_weight=50, seed=0):
+    # ring backbone so every pair of nodes is connected, plus random shortcuts, as (sources, targets, weights) arrays
+    # grouped by source; self loops and repeated shortcuts are dropped
+    rng = np.random.default_rng(seed)
+    sources = np.repeat(np.arange(num_nodes, dtype=np.int64), out_degree)
+    targets = rng.integers(0, num_nodes, size=len(sources), dtype=np.int64)
+    targets[::out_degree] = (np.arange(num_nodes) + 1) % max(num_nodes, 1)
+    weights = rng.integers(1, max_weight + 1, size=len(sources), dtype=np.int64)
+    _, first = np.unique(sources * num_nodes + targets, return_index=True)
+    keep = np.sort(first)
+    keep = keep[sources[keep] != targets[keep]]
+    return sources[keep], targets[keep], weights[keep]
+
+
+def random_task_graph(num_nodes, out_degree=3, max_weight=50, seed=0):
+    graph = nx.DiGraph()
+    graph.add_nodes_from(range(num_nodes))
+    graph.add_weighted_edges_from(zip(*(array.tolist() for array in task_graph_edges(num_nodes, out_degree,
+                                                                                     max_weight, seed))))
+    return graph
+
+
+def synthetic_rich_info(nodes, values_per_attribute=8, seed=0):
+    rng = random.Random(seed)
+    attributes = ['Hand', 'ObjectActedOn', 'ObjectInHand', 'HandState']
+
+    def entry():
+        # mix of single observations (plain values) and merged observations (lists), as ActivityProcessor produces
+        if rng.random() < 0.5:
+            return {key: f'{key}_{rng.randrange(values_per_attribute)}' for key in attributes}
+        return {key: [f'{key}_{rng.randrange(values_per_attribute)}' for _ in range(rng.randint(1, 3))]
+                for key in rng.sample(attributes, rng.randint(1, len(attributes)))}
+
+    return {node: {'precondition': entry(), 'effect': entry()} for node in nodes}
+
+
+def synthetic_activity_log(num_rows, seed=0):
+    # runs of random length over a small state vocabulary, shaped like the @data section of data4testing_*.txt
+    rng = np.random.default_rng(seed)
+    vocab = {
+        'Hand': ['NotMove', 'Move', 'ToolUse'],
+        'ObjectActedOn': ['NONE', '3DPrintedCube_green', '3DPrintedCube_blue'],
+        'ObjectInHand': ['NONE', 'VR_Controller_R', 'Main Camera'],
+        'HandState': ['Open', 'Close'],
+        'Activity': ['IdleMotion', 'Reach', 'Take', 'PutSomethingSomewhere', 'UnknownActivity',
+                     'GranularActivity_7959886098509256903'],
+    }
+    run_lengths = rng.integers(1, 60, size=num_rows // 10 + 1)
+    run_lengths = run_lengths[np.cumsum(run_lengths) <= num_rows]
+    columns = {}
+    for column, values in vocab.items():
+        codes = rng.integers(0, len(values), size=len(run_lengths))
+        columns[column] = np.asarray(values, dtype=object)[np.repeat(codes, run_lengths)]
+    # states also flicker inside a run
+    flicker = rng.random(len(columns['Hand'])) < 0.05
+    columns['Hand'][flicker] = 'Move'
+    return pd.DataFrame(columns)
+
+
+def write_activity_log(file_path, df):
+    with open(file_path, 'w') as file:
+        file.write('@relation\tVRData\n')
+        for column in df.columns:
+            file.write(f'@attribute\t{column}\t{{}}\n')
+        file.write('\n\n@data\n')
+        for row in df.itertuples(index=False):
+            file.write('\t'.join(row) + '\t\n')
+
+
+def write_trajectory_log(file_path, num_rows, seed=0):
+    # a traj_log_*.csv sample for every demo row, 10 ms apart
+    rng = np.random.default_rng(seed)
+    time = np.arange(num_rows) * 10.0
+    velocity = rng.normal(size=(num_rows, 3))
+    position = np.cumsum(velocity * 0.01, axis=0)
+    with open(file_path, 'w') as file:
+        file.write('time,effector_name,velocity_x,velocity_y,velocity_z, motion, toolUse, position_x,position_y,'
+                   'position_z,objActOn_name,position_x,position_y,position_z,objInHand_name,position_x,position_y,'
+                   'position_z,activity_classification\n')
+        for i in range(num_rows):
+            values = [f'{time[i]}', 'RightHand', *map(str, velocity[i]), 'Move', 'False', *map(str, position[i]),
+                      'NONE', '0', '0', '0', 'NONE', '0', '0', '0', 'Reach']
+            file.write(','.join(values) + '\n')
+    return time, velocity, position
+
+
+def activity_name(node):
+    return f'Activity_{node}'
+
+
+def _write_nodes(file, nodes):
+    # nodes yields (name, neighbor names, weights) in the layout of the exported task_graph.txt
+    file.write('nodes[]\n')
+    for i, (name, neighbors, weights) in enumerate(nodes):
+        lines = [f'  nodes[{i}]: \n', f'    name: {name}\n', '    neighbors[]\n']
+        lines.extend(f'      neighbors[{j}]: {neighbor}\n' for j, neighbor in enumerate(neighbors))
+        lines.append('    weights[]\n')
+        lines.extend(f'      weights[{j}]: {weight}\n' for j, weight in enumerate(weights))
+        file.write(''.join(lines))
+
+
+def write_task_graph(file_path, graph):
+    # any weighted DiGraph as task_graph.txt; parse_graph reads it back with the node names as strings
+    with open(file_path, 'w') as file:
+        _write_nodes(file, ((node, list(neighbors), [data['weight'] for data in neighbors.values()])
+                            for node, neighbors in graph.adj.items()))
+
+
+def random_walk(indptr, targets, length, rng):
+    # node ids of a walk over the CSR arrays, jumping to a random node where there is no way on
+    num_nodes = len(indptr) - 1
+    walk = np.empty(length, dtype=np.int64)
+    node = rng.integers(num_nodes) if num_nodes else 0
+    for i in range(length):
+        walk[i] = node
+        start, stop = indptr[node], indptr[node + 1]
+        node = targets[rng.integers(start, stop)] if stop > start else rng.integers(num_nodes)
+    return walk
+
+
+def write_demo_directory(directory, num_nodes, num_rows, seed=0):
+    # task_graph.txt with num_nodes activities and both demo files with num_rows rows each, whose activity runs walk
+    # the graph, so every transition in the logs is an edge of the task graph. Written from arrays, without building
+    # a graph, so a million nodes stay cheap
+    os.makedirs(directory, exist_ok=True)
+    sources, targets, weights = task_graph_edges(num_nodes, seed=seed)
+    indptr = np.searchsorted(sources, np.arange(num_nodes + 1))
+    with open(os.path.join(directory, 'task_graph.txt'), 'w') as file:
+        _write_nodes(file, ((activity_name(node), [activity_name(target) for target in targets[start:stop].tolist()],
+                             weights[start:stop].tolist())
+                            for node, (start, stop) in enumerate(zip(indptr[:-1].tolist(), indptr[1:].tolist()))))
+
+    rng = np.random.default_rng(seed)
+    for i, file_name in enumerate(ActivityProcessor.demo_files):
+        df = synthetic_activity_log(num_rows, seed=seed + i + 1)
+        starts = run_starts(df['Activity'].to_numpy())
+        walk = random_walk(indptr, targets, len(starts), rng)
+        names = np.array([activity_name(node) for node in walk.tolist()], dtype=object)
+        df['Activity'] = np.repeat(names, np.diff(np.r_[starts, len(df)]))
+        write_activity_log(os.path.join(directory, file_name), df)
+    return directory
+
+
+if __name__ == "__main__":
+    # python synthetic.py <directory> <nodes> <rows> [seed]
+    directory, num_nodes, num_rows = sys.argv[1], int(sys.argv[2]), int(sys.argv[3])
+    write_demo_directory(directory, num_nodes, num_rows, int(sys.argv[4]) if len(sys.argv) > 4 else 0)
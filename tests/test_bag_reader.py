@@ -0,0 +1,25 @@
+import os
+from bag_reader import BagReader, read_graph_bag
+from graph_parser import read_graph
+
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+
+def test_graph_matches_export():
+    # every recorded task_graph.bag next to its task_graph.txt export
+    for directory in ('13_demos', 'task_graph/multiple_demos', 'task_graph/2023-11-27-15-09-22',
+                      'task_graph/2023-11-27-15-16-50'):
+        directory = os.path.join(DATA, directory)
+        graph = read_graph_bag(os.path.join(directory, 'task_graph.bag'))
+        expected = read_graph(os.path.join(directory, 'task_graph.txt'))
+        assert list(graph.nodes) == list(expected.nodes)
+        assert list(graph.edges(data=True)) == list(expected.edges(data=True))
+
+
+def test_messages_follow_index():
+    with BagReader(os.path.join(DATA, 'bagfiles', '2023-11-27-15-18-29.bag')) as bag:
+        counts = {topic: sum(1 for _ in bag.messages(topic)) for topic in bag.topics}
+        assert counts == {topic: bag.message_count(topic) for topic in bag.topics}
+        times = [time for _, _, time in bag.raw_messages('/unity_data')]
+        assert times == sorted(times) and len(times) == counts['/unity_data']
@@ -0,0 +1,47 @@
+import random
+import numpy as np
+import utils
+from csr import CSRGraph
+from reference import reference_nx_to_matrix, reference_refine_graph
+from synthetic import random_task_graph, synthetic_rich_info
+
+
+def test_csr():
+    rng = random.Random(0)
+    graph = random_task_graph(1000, seed=0)
+    arrays = CSRGraph.from_networkx(graph)
+    round_trip = arrays.to_networkx()
+    assert list(round_trip.nodes) == list(graph.nodes)
+    assert list(round_trip.edges(data=True)) == list(graph.edges(data=True))
+    for _ in range(5):
+        start_node, end_node = rng.sample(range(1000), 2)
+        assert utils.widest_path(arrays, start_node, end_node) == utils.widest_path(graph, start_node, end_node)
+
+    rich_info = synthetic_rich_info(graph.nodes, values_per_attribute=3, seed=0)
+    refined = utils.refine_graph(graph, rich_info)
+    assert set(refined.edges) == set(reference_refine_graph(graph, rich_info).edges)
+    assert list(utils.refine_graph(arrays, rich_info).to_networkx().edges(data=True)) == list(refined.edges(data=True))
+    assert np.array_equal(utils.nx_to_matrix(arrays), reference_nx_to_matrix(graph))
+
+
+def test_k_widest_paths_on_csr():
+    rng = random.Random(0)
+    graph = random_task_graph(1000, seed=0)
+    arrays = CSRGraph.from_networkx(graph)
+    cache = utils.PathCache()
+    for _ in range(5):
+        start_node, end_node = rng.sample(range(1000), 2)
+        expected = utils.k_widest_paths(graph, start_node, end_node, 5)
+        assert utils.k_widest_paths(arrays, start_node, end_node, 5) == expected
+        assert cache.get(arrays, start_node, end_node, 5) == expected
+        assert cache.get(arrays, start_node, end_node, 3) == expected[:3]
+    assert cache.hits == 5 and cache.misses == 5
+
+
+def test_adjacency_matrix():
+    graph = random_task_graph(1000, seed=0)
+    matrix, nodes = utils.adjacency_matrix(graph)
+    assert nodes == list(graph.nodes)
+    assert (matrix != utils.adjacency_matrix(graph, format='coo')[0].tocsr()).nnz == 0
+    assert utils.adjacency_matrix(graph, dtype=np.float32)[0].dtype == np.float32
+    assert np.array_equal(matrix.toarray(), reference_nx_to_matrix(graph))
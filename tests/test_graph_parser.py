@@ -0,0 +1,85 @@
+import os
+import shutil
+import graph_parser
+from graph_parser import parse_graph, read_graph
+
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+
+def counting_reader(monkeypatch):
+    # read_graph calls, to tell parses from cache hits
+    calls = []
+
+    def reader(file_path):
+        calls.append(file_path)
+        return read_graph(file_path)
+    monkeypatch.setattr(graph_parser, 'read_graph', reader)
+    monkeypatch.setattr(graph_parser, '_memory_cache', {})
+    return calls
+
+
+def same_graph(graph, expected):
+    return list(graph.nodes) == list(expected.nodes) and list(graph.edges(data=True)) == list(expected.edges(data=True))
+
+
+def test_cache_hits(tmp_path, monkeypatch):
+    file_path = str(tmp_path / 'task_graph.txt')
+    shutil.copy(os.path.join(DATA, '13_demos', 'task_graph.txt'), file_path)
+    cache_dir = str(tmp_path / 'cache')
+    calls = counting_reader(monkeypatch)
+    expected = read_graph(file_path)
+
+    assert same_graph(parse_graph(file_path, cache_dir), expected)
+    graph = parse_graph(file_path, cache_dir)
+    assert same_graph(graph, expected) and len(calls) == 1
+    # callers get a copy, changing it leaves the cached graph as it was
+    graph.remove_node(next(iter(graph)))
+    assert same_graph(parse_graph(file_path, cache_dir), expected)
+
+    # a new process only has the disk cache
+    monkeypatch.setattr(graph_parser, '_memory_cache', {})
+    assert same_graph(parse_graph(file_path, cache_dir), expected) and len(calls) == 1
+
+
+def test_changed_file_is_parsed_again(tmp_path, monkeypatch):
+    file_path = str(tmp_path / 'task_graph.txt')
+    shutil.copy(os.path.join(DATA, '13_demos', 'task_graph.txt'), file_path)
+    cache_dir = str(tmp_path / 'cache')
+    calls = counting_reader(monkeypatch)
+    parse_graph(file_path, cache_dir)
+
+    stat = os.stat(file_path)
+    os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    parse_graph(file_path, cache_dir)
+    assert len(calls) == 2
+
+    # rewritten with another first weight
+    with open(file_path) as file:
+        text = file.read()
+    start = text.index('weights[0]:')
+    end = text.index('\n', start)
+    weight = int(text[start:end].partition(':')[2])
+    with open(file_path, 'w') as file:
+        file.write(text[:start] + f'weights[0]: {weight % 9 + 1}' + text[end:])
+    graph = parse_graph(file_path, cache_dir)
+    assert len(calls) == 3
+    assert same_graph(graph, read_graph(file_path))
+    assert not same_graph(graph, read_graph(os.path.join(DATA, '13_demos', 'task_graph.txt')))
+
+
+def test_corrupt_cache_falls_back_to_parsing(tmp_path, monkeypatch):
+    file_path = str(tmp_path / 'task_graph.txt')
+    shutil.copy(os.path.join(DATA, '13_demos', 'task_graph.txt'), file_path)
+    cache_dir = str(tmp_path / 'cache')
+    calls = counting_reader(monkeypatch)
+    expected = parse_graph(file_path, cache_dir)
+
+    cache_file = graph_parser._cache_file(os.path.abspath(file_path), cache_dir)
+    with open(cache_file, 'wb') as file:
+        file.write(b'not a pickle')
+    monkeypatch.setattr(graph_parser, '_memory_cache', {})
+    assert same_graph(parse_graph(file_path, cache_dir), expected) and len(calls) == 2
+    # and the cache was written again
+    monkeypatch.setattr(graph_parser, '_memory_cache', {})
+    assert same_graph(parse_graph(file_path, cache_dir), expected) and len(calls) == 2
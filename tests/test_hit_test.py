@@ -0,0 +1,18 @@
+import numpy as np
+from hit_test import HitIndex
+from reference import reference_hit_test
+
+
+def test_nearest():
+    rng = np.random.default_rng(0)
+    for num_nodes in (100, 10000):
+        pos = dict(enumerate(rng.random((num_nodes, 2))))
+        index = HitIndex(pos)
+        radius = 0.3 / num_nodes ** 0.5
+        for x, y in rng.random((200, 2)):
+            # nearest within radius, brute force
+            distances = np.hypot(index.coords[:, 0] - x, index.coords[:, 1] - y)
+            expected = int(np.argmin(distances)) if distances.min() <= radius else None
+            assert index.nearest(x, y, radius) == expected
+            # the old loop took the first node in range rather than the nearest, but found one in the same cases
+            assert (reference_hit_test(pos, x, y, radius) is None) == (expected is None)
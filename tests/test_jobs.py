@@ -0,0 +1,36 @@
+import random
+import threading
+import utils
+from jobs import JobRunner, checkpoint
+from reference import EventLoop
+from synthetic import random_task_graph
+
+
+def test_jobs_deliver_the_last_query():
+    rng = random.Random(0)
+    graph = random_task_graph(10000, seed=0)
+    first, second = [tuple(rng.sample(range(10000), 2)) for _ in range(2)]
+    loop = EventLoop()
+    runner = JobRunner(loop)
+    delivered = []
+    runner.submit('paths', utils.k_widest_paths, graph, *first, 20, on_done=delivered.append)
+    runner.submit('paths', utils.k_widest_paths, graph, *second, 20, on_done=delivered.append)
+    loop.run_while(lambda: runner.busy)
+    runner.shutdown()
+    assert delivered == [utils.k_widest_paths(graph, *second, 20)]
+
+
+def test_shutdown_stops_the_running_job():
+    runner = JobRunner(EventLoop())
+    started = threading.Event()
+
+    def job():
+        started.set()
+        while True:
+            checkpoint()
+
+    runner.submit('job', job)
+    started.wait()
+    runner.shutdown()
+    runner._worker.join(timeout=5)
+    assert not runner._worker.is_alive()
@@ -0,0 +1,27 @@
+import random
+import networkx as nx
+import numpy as np
+from layout import LayoutStore, affected_nodes, incremental_layout
+from synthetic import random_task_graph
+
+
+def test_incremental_layout_keeps_unaffected_nodes():
+    rng = random.Random(0)
+    graph = random_task_graph(400, out_degree=2, seed=0)
+    pos = nx.circular_layout(graph)
+    refined = graph.copy()
+    refined.remove_edges_from(rng.sample(list(graph.edges), 20))
+    affected = affected_nodes(refined, graph)
+    new_pos = incremental_layout(refined, pos, affected)
+    assert all((new_pos[node] == pos[node]).all() for node in refined if node not in affected)
+
+
+def test_store_finds_equal_structures(tmp_path):
+    graph = random_task_graph(100, out_degree=2, seed=0)
+    pos = LayoutStore('circular', cache_dir=str(tmp_path)).get(graph)
+    # the same structure inserted in another order, in a new process
+    shuffled = nx.DiGraph()
+    shuffled.add_nodes_from(reversed(list(graph.nodes)))
+    shuffled.add_edges_from(reversed(list(graph.edges(data=True))))
+    cached = LayoutStore('circular', cache_dir=str(tmp_path)).lookup(shuffled)
+    assert cached is not None and all(np.array_equal(cached[node], pos[node]) for node in graph)
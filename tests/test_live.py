@@ -0,0 +1,24 @@
+import pre_eff
+from live import LiveSession
+from reference import comparable
+from synthetic import synthetic_activity_log, write_activity_log
+from transitions import TransitionCounter
+
+
+def test_live_session(tmp_path):
+    # rows appended in batches give the rich info and graph of processing the whole files
+    logs = {file_name: synthetic_activity_log(3000, seed=i)
+            for i, file_name in enumerate(pre_eff.ActivityProcessor.demo_files)}
+    for file_name, df in logs.items():
+        write_activity_log(str(tmp_path / file_name), df.iloc[:2000])
+    session = LiveSession(str(tmp_path), 20)
+    session.catch_up()
+    for i in range(5):
+        for file_name, df in logs.items():
+            with open(tmp_path / file_name, 'a') as file:
+                for row in df.iloc[2000 + i * 200:2000 + (i + 1) * 200].itertuples(index=False):
+                    file.write('\t'.join(row) + '\t\n')
+        session.poll()
+    expected = pre_eff.ActivityProcessor(str(tmp_path), 20).rich_info
+    assert comparable(session.rich_info) == comparable(expected)
+    assert dict(session.graph.edges) == dict(TransitionCounter.from_paths(str(tmp_path)).graph().edges)
@@ -0,0 +1,26 @@
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import networkx as nx
+import numpy as np
+import my_networkx as my_nx
+from reference import reference_curved_label_layout
+from synthetic import random_task_graph
+
+
+def test_curved_label_layout():
+    graph = random_task_graph(200, out_degree=3, seed=0)
+    pos = nx.random_layout(graph, seed=0)
+    edges = list(graph.edges)
+    fig, ax = plt.subplots(figsize=(10, 7), dpi=100)
+    try:
+        xy, _ = my_nx._curved_label_layout(ax, pos, edges, False, 0.1)
+        assert np.allclose(xy, reference_curved_label_layout(ax, pos, edges, 0.1))
+        labels = {edge: graph.edges[edge]['weight'] for edge in edges}
+        text_items = my_nx.my_draw_networkx_edge_labels(graph, pos, edge_labels=labels, ax=ax, rotate=False, rad=0.1)
+        moved = nx.random_layout(graph, seed=1)
+        my_nx.my_update_networkx_edge_labels(text_items, moved, ax=ax, rotate=False, rad=0.1)
+        assert np.allclose([text_items[edge].get_position() for edge in edges],
+                           reference_curved_label_layout(ax, moved, edges, 0.1))
+    finally:
+        plt.close(fig)
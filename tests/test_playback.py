@@ -0,0 +1,71 @@
+import json
+import os
+import numpy as np
+import playback
+
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+FILES = [os.path.join(DATA, 'playback', name) for name in sorted(os.listdir(os.path.join(DATA, 'playback')))]
+
+
+def load_json(file_path, every=1):
+    # the per-object arrays of read_playback, built from the whole document
+    with open(file_path) as file:
+        document = json.load(file)
+    objects, events = {}, []
+    for index, step in enumerate(document['log']):
+        for state in step['logStep']:
+            for event in state.get('events') or ():
+                events.append((step['time'], state['name'], event.get('name', ''), event.get('property', '')))
+            if index % every:
+                continue
+            arrays = objects.setdefault(state['name'], {'time': [], **{field: [] for field in playback.FIELDS}})
+            arrays['time'].append(step['time'])
+            for field, width in playback.FIELDS.items():
+                values = state.get(field)
+                arrays[field].append(values if values is not None and len(values) == width else [np.nan] * width)
+    return document['playbackTimestepMilliseconds'], objects, events
+
+
+def same_playback(result, expected):
+    timestep, objects, events = expected
+    assert result['timestep'] == timestep
+    assert result['events'] == events
+    assert list(result['objects']) == list(objects)
+    for name, arrays in objects.items():
+        for field, values in arrays.items():
+            assert np.array_equal(result['objects'][name][field], np.array(values), equal_nan=True), (name, field)
+    return True
+
+
+def test_read_playback():
+    for file_path in FILES:
+        assert same_playback(playback.read_playback(file_path), load_json(file_path))
+    assert same_playback(playback.read_playback(FILES[0], every=3), load_json(FILES[0], every=3))
+
+
+def test_cache_round_trip(tmp_path, monkeypatch):
+    file_path = str(tmp_path / os.path.basename(FILES[0]))
+    with open(FILES[0], 'rb') as source, open(file_path, 'wb') as target:
+        target.write(source.read())
+    expected = load_json(file_path)
+    cache_dir = str(tmp_path / 'cache')
+    read_playback = playback.read_playback
+    calls = []
+
+    def counting_read(*args):
+        calls.append(args)
+        return read_playback(*args)
+    monkeypatch.setattr(playback, 'read_playback', counting_read)
+
+    assert same_playback(playback.load_playback(file_path, cache_dir=cache_dir), expected)
+    # the second load maps the saved arrays instead of parsing
+    cached = playback.load_playback(file_path, cache_dir=cache_dir)
+    assert same_playback(cached, expected) and len(calls) == 1
+    assert all(isinstance(arrays[field].base, np.memmap)
+               for arrays in cached['objects'].values() for field in ('time', *playback.FIELDS))
+
+    # a changed file is parsed again
+    stat = os.stat(file_path)
+    os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert same_playback(playback.load_playback(file_path, cache_dir=cache_dir), expected) and len(calls) == 2
@@ -0,0 +1,37 @@
+import os
+import pre_eff
+from reference import comparable, reference_extract, reference_merge, reference_read_data, sequence
+from synthetic import synthetic_activity_log, write_activity_log
+
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+DEMOS = [os.path.join(DATA, directory) for directory in ('13_demos', 'task_graph/multiple_demos',
+                                                          'task_graph/2023-11-27-15-09-22',
+                                                          'task_graph/2023-11-27-15-16-50')]
+
+
+def test_extract():
+    df = sequence(synthetic_activity_log(2000, seed=0))
+    assert comparable(pre_eff.extract(df, 20)) == comparable(reference_extract(df, 20))
+
+
+def test_read_data(tmp_path):
+    file_path = str(tmp_path / 'data4testing_R.txt')
+    write_activity_log(file_path, synthetic_activity_log(5000, seed=0))
+    result, expected = pre_eff.read_data(file_path), reference_read_data(file_path)
+    assert (result.astype(object).to_numpy() == expected.to_numpy()).all()
+    assert (result.index == expected.index).all()
+    # and the recorded demos
+    for directory in DEMOS:
+        for file_name in pre_eff.ActivityProcessor.demo_files:
+            file_path = os.path.join(directory, file_name)
+            result, expected = pre_eff.read_data(file_path), reference_read_data(file_path)
+            assert (result.astype(object).to_numpy() == expected.to_numpy()).all()
+
+
+def test_merge_workers():
+    # one partial result per demo file, reduced in the same order in and out of the process pool
+    expected = comparable(reference_merge(DEMOS, 20))
+    assert comparable(pre_eff.ActivityProcessor(DEMOS, workers=1).rich_info) == expected
+    assert comparable(pre_eff.ActivityProcessor(DEMOS, workers=2).rich_info) == expected
+    assert comparable(pre_eff.ActivityProcessor(DEMOS[0]).rich_info) == comparable(reference_merge(DEMOS[:1], 20))
@@ -0,0 +1,85 @@
+import threading
+import pytest
+import profiling
+
+
+@pytest.fixture
+def stages():
+    # profiling keeps its records in the module, each test starts from none and leaves it disabled
+    profiling.reset()
+    yield profiling
+    profiling.disable()
+    profiling.reset()
+
+
+def test_stage_as_decorator_and_context_manager(stages):
+    @stages.stage('decorated')
+    def add(a, b):
+        return a + b
+
+    stages.enable()
+    assert add(1, 2) == 3
+    assert add(3, 4) == 7
+    with stages.stage('block'):
+        pass
+    records = stages.stats()
+    assert records['decorated']['calls'] == 2 and records['block']['calls'] == 1
+    assert records['decorated']['mean'] == records['decorated']['total'] / 2
+    # memory is not traced unless asked for
+    assert records['block']['peak'] is None
+
+
+def test_disabled_stages_record_nothing(stages):
+    with stages.stage('block'):
+        pass
+    assert stages.stats() == {}
+
+
+def test_nested_stages_get_their_own_peaks(stages):
+    stages.enable(trace_memory=True)
+    with stages.stage('outer'):
+        with stages.stage('inner'):
+            data = bytearray(4 << 20)
+        del data
+        with stages.stage('after'):
+            pass
+    records = stages.stats()
+    assert records['inner']['peak'] >= 4 << 20
+    # the peak of the inner stage counts for the enclosing one, but not for a stage opened after it
+    assert records['outer']['peak'] >= records['inner']['peak']
+    assert records['after']['peak'] < 1 << 20
+
+
+def test_overlapping_threads_record_no_peak(stages):
+    stages.enable(trace_memory=True)
+    opened, release = threading.Event(), threading.Event()
+
+    def worker():
+        with stages.stage('worker'):
+            opened.set()
+            release.wait()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    opened.wait()
+    with stages.stage('shared'):
+        pass
+    release.set()
+    thread.join()
+    with stages.stage('alone'):
+        pass
+    records = stages.stats()
+    # both stages that overlapped are timed, neither gets a peak another thread may have raised
+    assert records['shared']['calls'] == records['worker']['calls'] == 1
+    assert records['shared']['peak'] is None and records['worker']['peak'] is None
+    assert records['alone']['peak'] is not None
+
+
+def test_format_stats():
+    records = {'fast': {'calls': 4, 'total': 0.004, 'mean': 0.001, 'peak': None},
+               'slow': {'calls': 1, 'total': 2.0, 'mean': 2.0, 'peak': 3 * 2 ** 20}}
+    lines = profiling.format_stats(records).splitlines()
+    assert lines[0].split() == ['stage', 'calls', 'total', 's', 'mean', 'ms', 'peak', 'MB']
+    # slowest first
+    assert lines[1].split() == ['slow', '1', '2.000', '2000.0', '3.0']
+    assert lines[2].split() == ['fast', '4', '0.004', '1.0', '-']
@@ -0,0 +1,27 @@
+import os
+import subprocess
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_render_png(tmp_path):
+    # the graph and layout caches go to the temporary home
+    env = dict(os.environ, HOME=str(tmp_path), MPLBACKEND='Agg')
+    out_dir = tmp_path / 'renders'
+    result = subprocess.run([sys.executable, 'render.py', 'data/13_demos', '--refine', '-o', str(out_dir), '-j', '1',
+                             '--dpi', '50'], cwd=ROOT, env=env, capture_output=True, text=True, timeout=300)
+    assert result.returncode == 0, result.stderr
+    for kind in ('original', 'refined'):
+        file_path = out_dir / f'data_13_demos_{kind}.png'
+        assert file_path.exists() and file_path.stat().st_size > 0
+        assert str(file_path) in result.stdout
+
+
+def test_render_reports_failures(tmp_path):
+    env = dict(os.environ, HOME=str(tmp_path), MPLBACKEND='Agg')
+    result = subprocess.run([sys.executable, 'render.py', str(tmp_path / 'missing'), '-o', str(tmp_path), '-j', '1'],
+                            cwd=ROOT, env=env, capture_output=True, text=True, timeout=300)
+    assert result.returncode == 1
+    assert 'failed' in result.stderr
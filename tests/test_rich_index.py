@@ -0,0 +1,75 @@
+import logging
+import random
+from itertools import compress
+import rich_index
+import utils
+from reference import reference_refine_graph
+from rich_index import RichIndex, Refiner
+from synthetic import random_task_graph, synthetic_rich_info
+
+
+def test_refine():
+    graph = random_task_graph(1000, seed=0)
+    rich_info = synthetic_rich_info(graph.nodes, values_per_attribute=3, seed=0)
+    expected = set(reference_refine_graph(graph, rich_info).edges)
+    edges = list(graph.edges())
+    compatible = RichIndex(rich_info).compatible_edges([u for u, _ in edges], [v for _, v in edges])
+    assert set(compress(edges, compatible)) == expected
+    assert set(utils.refine_graph(graph, rich_info).edges) == expected
+
+
+def test_refine_logs_removed_edges(caplog, capsys):
+    graph = random_task_graph(100, seed=0)
+    rich_info = synthetic_rich_info(graph.nodes, values_per_attribute=3, seed=0)
+    with caplog.at_level(logging.DEBUG, logger='utils'):
+        refined = utils.refine_graph(graph, rich_info)
+    assert capsys.readouterr().out == ''
+    assert len(caplog.records) == graph.number_of_edges() - refined.number_of_edges()
+
+
+def test_incremental_refine():
+    rng = random.Random(0)
+    graph = random_task_graph(1000, seed=0)
+    rich_info = synthetic_rich_info(graph.nodes, values_per_attribute=3, seed=0)
+    refiner = Refiner(rich_info)
+    refiner.refine(graph)
+    changed = rng.sample(list(graph.nodes), 20)
+    rich_info.update(synthetic_rich_info(changed, values_per_attribute=3, seed=1))
+    refiner.update(changed)
+    for _ in range(200):
+        graph.add_edge(rng.randrange(1000), rng.randrange(1000), weight=rng.randint(1, 50))
+    assert set(refiner.refine(graph).edges) == set(utils.refine_graph(graph, rich_info).edges)
+
+
+def test_refine_checks_only_changed_edges(monkeypatch):
+    graph = random_task_graph(1000, seed=0)
+    rich_info = synthetic_rich_info(graph.nodes, values_per_attribute=3, seed=0)
+    refiner = Refiner(rich_info)
+    refiner.refine(graph)
+    checked = []
+
+    class CountingIndex(RichIndex):
+        def compatible_edges(self, sources, targets):
+            checked.append(len(sources))
+            return super().compatible_edges(sources, targets)
+    monkeypatch.setattr(rich_index, 'RichIndex', CountingIndex)
+
+    refiner.refine(graph)
+    assert checked == []
+    node = next(iter(graph))
+    refiner.apply({node: None})
+    refined = refiner.refine(graph)
+    assert checked == [graph.in_degree(node) + graph.out_degree(node) - graph.has_edge(node, node)]
+    assert set(refined.edges) == set(utils.refine_graph(graph, rich_info).edges)
+
+
+def test_refine_drops_verdicts_of_removed_edges():
+    rng = random.Random(0)
+    graph = random_task_graph(1000, seed=0)
+    refiner = Refiner(synthetic_rich_info(graph.nodes, values_per_attribute=3, seed=0))
+    refiner.refine(graph)
+    for _ in range(10):
+        graph.remove_edges_from(rng.sample(list(graph.edges), 50))
+        graph.add_edges_from((rng.randrange(1000), rng.randrange(1000), {'weight': 1}) for _ in range(20))
+        refiner.refine(graph)
+        assert set(refiner.verdicts) == set(graph.edges)
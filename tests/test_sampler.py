@@ -0,0 +1,27 @@
+import random
+import utils
+from reference import reference_monte_carlo_widest_path
+from synthetic import random_task_graph
+
+
+def test_monte_carlo():
+    # greedy walks (no randomness) must match the old loop exactly; random walks must give valid paths that never
+    # beat the exact widest path
+    rng = random.Random(0)
+    for _ in range(300):
+        graph = random_task_graph(rng.randint(2, 40), out_degree=rng.randint(1, 4), max_weight=6,
+                                  seed=rng.randrange(2 ** 31))
+        start_node, end_node = rng.sample(list(graph), 2)
+        expected = reference_monte_carlo_widest_path(graph, start_node, end_node, iterations=1, randomness_factor=0)
+        assert utils.monte_carlo_widest_path(graph, start_node, end_node, 50, randomness_factor=0) == expected
+        path, width = utils.monte_carlo_widest_path(graph, start_node, end_node, 200, 0.5, seed=rng.randrange(100))
+        if path is not None:
+            assert path[0] == start_node and path[-1] == end_node and len(set(path)) == len(path)
+            assert min(graph[u][v]['weight'] for u, v in zip(path, path[1:])) == width
+            assert width <= utils.widest_path(graph, start_node, end_node)[1]
+
+
+def test_monte_carlo_workers_give_the_same_path():
+    graph = random_task_graph(300, seed=0)
+    assert (utils.monte_carlo_widest_path(graph, 0, 150, seed=0, workers=1)
+            == utils.monte_carlo_widest_path(graph, 0, 150, seed=0, workers=2))
@@ -0,0 +1,16 @@
+import numpy as np
+import pre_eff
+import trajectory
+from reference import reference_segment_stats
+from synthetic import synthetic_activity_log, write_activity_log, write_trajectory_log
+
+
+def test_segment_stats(tmp_path):
+    demo_file, trajectory_file = str(tmp_path / 'data4testing_R.txt'), str(tmp_path / 'traj_log_right.csv')
+    write_activity_log(demo_file, synthetic_activity_log(5000, seed=0))
+    time, velocity, position = write_trajectory_log(trajectory_file, 5000, seed=0)
+    statistics = trajectory.activity_statistics(demo_file, trajectory_file, 20)
+    demo = pre_eff.read_data(demo_file)
+    runs = pre_eff.segments(demo[demo['Activity'] != 'UnknownActivity'], 20)
+    assert np.allclose(statistics[['duration', 'path_length', 'peak_speed']].to_numpy(),
+                       reference_segment_stats(runs, time, velocity, position), equal_nan=True)
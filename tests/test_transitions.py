@@ -0,0 +1,33 @@
+import os
+import numpy as np
+import pandas as pd
+from graph_parser import read_graph
+from reference import reference_transitions
+from synthetic import synthetic_activity_log
+from transitions import TransitionCounter
+
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+DEMOS = [os.path.join(DATA, directory) for directory in ('13_demos', 'task_graph/multiple_demos',
+                                                          'task_graph/2023-11-27-15-09-22',
+                                                          'task_graph/2023-11-27-15-16-50')]
+
+
+def test_transitions_match_task_graphs():
+    # the weights of the exported task graphs are the transition counts of their demo logs
+    for directory in DEMOS:
+        expected = read_graph(os.path.join(directory, 'task_graph.txt'))
+        assert dict(TransitionCounter.from_paths(directory).graph().edges) == dict(expected.edges), directory
+
+
+def test_transition_counts():
+    # categorical, as read_data returns the column
+    logs = [pd.Categorical(synthetic_activity_log(10000, seed=i)['Activity']) for i in range(3)]
+    counter = TransitionCounter()
+    counter.add_sequence(logs[0])
+    assert counter.counts == reference_transitions(np.asarray(logs[0]))
+    counter.add_sequence(logs[1])
+    before = dict(counter.counts)
+    counter.add_sequence(logs[2])
+    counter.add_sequence(logs[2], sign=-1)
+    assert counter.counts == before
@@ -0,0 +1,54 @@
+import random
+import networkx as nx
+import utils
+from synthetic import random_task_graph
+
+
+def test_widest_path_is_exact():
+    # against every simple path of small graphs
+    rng = random.Random(0)
+    for _ in range(200):
+        graph = random_task_graph(rng.randint(2, 9), out_degree=3, max_weight=6, seed=rng.randrange(2 ** 31))
+        start_node, end_node = rng.sample(list(graph), 2)
+        path, width = utils.widest_path(graph, start_node, end_node)
+        widths = [min(graph[u][v]['weight'] for u, v in zip(p, p[1:]))
+                  for p in nx.all_simple_paths(graph, start_node, end_node)]
+        if not widths:
+            assert path is None
+            continue
+        assert width == max(widths)
+        assert path[0] == start_node and path[-1] == end_node
+        assert min(graph[u][v]['weight'] for u, v in zip(path, path[1:])) == width
+
+
+def test_widest_path_beats_monte_carlo():
+    rng = random.Random(0)
+    graph = random_task_graph(200, seed=0)
+    for _ in range(5):
+        start_node, end_node = rng.sample(range(200), 2)
+        _, mc_width = utils.monte_carlo_widest_path(graph, start_node, end_node, iterations=100, seed=0)
+        assert utils.widest_path(graph, start_node, end_node)[1] >= mc_width
+
+
+def test_k_widest_paths():
+    # Yen's ranking against every simple path of small graphs
+    rng = random.Random(0)
+    for _ in range(200):
+        graph = random_task_graph(rng.randint(3, 9), out_degree=3, max_weight=6, seed=rng.randrange(2 ** 31))
+        start_node, end_node = rng.sample(list(graph), 2)
+
+        def rank(path):
+            return -min(graph[u][v]['weight'] for u, v in zip(path, path[1:])), len(path)
+
+        expected = sorted(map(rank, nx.all_simple_paths(graph, start_node, end_node)))[:5]
+        assert [(-width, len(path)) for path, width in utils.k_widest_paths(graph, start_node, end_node, 5)] == expected
+
+
+def test_path_cache_starts_with_widest_path():
+    rng = random.Random(0)
+    graph = random_task_graph(1000, seed=0)
+    cache = utils.PathCache()
+    for _ in range(5):
+        start_node, end_node = rng.sample(range(1000), 2)
+        paths = cache.get(graph, start_node, end_node, 5)
+        assert not paths or paths[0][1] == utils.widest_path(graph, start_node, end_node)[1]
@@ -0,0 +1,169 @@
+import csv
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pre_eff
+
+
+# traj_log_left.csv / traj_log_right.csv repeat position_x..z for the effector, the object acted on and the object in
+# hand, so columns are named by position instead of by header
+TRAJECTORY_DTYPE = np.dtype([
+    ('time', 'f8'), ('effector', 'O'), ('velocity', 'f8', (3,)), ('motion', 'O'), ('tool_use', 'O'),
+    ('position', 'f8', (3,)), ('acted_on', 'O'), ('acted_on_position', 'f8', (3,)), ('in_hand', 'O'),
+    ('in_hand_position', 'f8', (3,)), ('activity', 'O'),
+])
+VR_DTYPE = np.dtype([('time', 'f8'), ('object', 'O'), ('position', 'f8', (3,))])
+
+# demo file of each hand and the trajectory recorded alongside it
+SIDES = {'data4testing_R.txt': 'traj_log_right.csv', 'data4testing_L.txt': 'traj_log_left.csv'}
+
+
+def _flat_columns(dtype):
+    # one (field, component) per csv column, in file order
+    columns = []
+    for name in dtype.names:
+        shape = dtype.fields[name][0].shape
+        columns.extend([(name, i) for i in range(shape[0])] if shape else [(name, None)])
+    return columns
+
+
+def read_trajectory(file_path):
+    # effector trajectory as a structured array sorted by time; the original sample order (the row in the matching
+    # demo file) is kept in the returned order array
+    columns = _flat_columns(TRAJECTORY_DTYPE)
+    df = pd.read_csv(file_path, header=None, skiprows=1, names=range(len(columns)), usecols=range(len(columns)),
+                     skipinitialspace=True)
+    trajectory = np.empty(len(df), dtype=TRAJECTORY_DTYPE)
+    for i, (name, component) in enumerate(columns):
+        values = df[i]
+        if TRAJECTORY_DTYPE.fields[name][0].base.kind == 'f':
+            values = pd.to_numeric(values, errors='coerce')
+        if component is None:
+            trajectory[name] = values.to_numpy()
+        else:
+            trajectory[name][:, component] = values.to_numpy()
+    order = np.argsort(trajectory['time'], kind='stable')
+    return trajectory[order], order
+
+
+def read_vr_log(file_path):
+    # traj_logVR.csv rows are a time followed by any number of object_name, x, y, z groups; returned in long form, one
+    # row per object and time, sorted by time
+    times, objects, positions = [], [], []
+    with open(file_path, newline='') as file:
+        reader = csv.reader(file, skipinitialspace=True)
+        next(reader, None)
+        for row in reader:
+            if not row or not row[0]:
+                continue
+            time = float(row[0])
+            for start in range(1, len(row) - 3, 4):
+                if row[start]:
+                    times.append(time)
+                    objects.append(row[start])
+                    positions.append([float(value) for value in row[start + 1:start + 4]])
+    log = np.empty(len(times), dtype=VR_DTYPE)
+    log['time'] = times
+    log['object'] = objects
+    log['position'] = np.array(positions, dtype=float).reshape(-1, 3)
+    return log[np.argsort(log['time'], kind='stable')]
+
+
+def segment_times(segments, row_times):
+    # start and stop time of every segment, given the time of every row of the demo file. The last recorded segment
+    # runs to the end of the trajectory, segments starting past it get nan
+    row_times = np.r_[np.asarray(row_times, dtype=float), np.nan]
+    recorded = len(row_times) - 1
+    start = row_times[np.minimum(segments['start'], recorded)]
+    stop = np.where(segments['stop'] < recorded, row_times[np.minimum(segments['stop'], recorded)], np.inf)
+    return start, np.where(np.isnan(start), np.nan, stop)
+
+
+def align(times, start, stop):
+    # [lo, hi) sample range of every segment in the sorted times array
+    lo = np.searchsorted(times, start, side='left')
+    hi = np.searchsorted(times, stop, side='left')
+    missing = np.isnan(start) | np.isnan(stop)
+    lo[missing] = hi[missing] = 0
+    return lo, np.maximum(lo, hi)
+
+
+def segment_stats(trajectory, lo, hi):
+    # duration, path length and peak speed of every [lo, hi) slice, from prefix sums and reduceat instead of a loop
+    # over samples. Segments holding one sample or less have nan statistics
+    times = trajectory['time']
+    count = hi - lo
+    valid = count > 1
+    last = np.maximum(hi - 1, lo)
+
+    steps = np.linalg.norm(np.diff(trajectory['position'], axis=0), axis=1) if len(trajectory) > 1 else np.zeros(0)
+    travelled = np.r_[0.0, np.cumsum(np.nan_to_num(steps))]
+    speed = np.linalg.norm(trajectory['velocity'], axis=1) if len(trajectory) else np.zeros(0)
+
+    stats = {'samples': count, 'duration': np.full(len(lo), np.nan), 'path_length': np.full(len(lo), np.nan),
+             'peak_speed': np.full(len(lo), np.nan)}
+    if valid.any():
+        stats['duration'][valid] = times[last[valid]] - times[lo[valid]]
+        stats['path_length'][valid] = travelled[last[valid]] - travelled[lo[valid]]
+        # reduceat over interleaved (lo, hi) bounds gives the max of each slice at the even positions; a trailing
+        # sentinel keeps hi == len(speed) a valid index
+        bounds = np.column_stack((lo[valid], hi[valid])).ravel()
+        peaks = np.maximum.reduceat(np.r_[speed, -np.inf], bounds)[::2]
+        stats['peak_speed'][valid] = peaks
+    return stats
+
+
+def activity_statistics(demo_file, trajectory_file, threshold=20):
+    # per segment statistics of one hand, segments as extract() sees them and trajectory samples taken to be recorded
+    # in lockstep with the rows of the demo file
+    sequence = pre_eff.read_data(demo_file)
+    sequence = sequence[sequence['Activity'] != 'UnknownActivity']
+    runs = pre_eff.segments(sequence, threshold)
+    trajectory, order = read_trajectory(trajectory_file)
+    row_times = np.empty(len(order))
+    row_times[order] = trajectory['time']
+    start, stop = segment_times(runs, row_times)
+    lo, hi = align(trajectory['time'], start, stop)
+    stats = segment_stats(trajectory, lo, hi)
+    return pd.DataFrame({'activity': runs['activity'], 'start': start, 'stop': stop, **stats})
+
+
+def demo_statistics(path, threshold=20):
+    # activity_statistics of both hands of one demo directory, or of a list of them; each row also names the activity
+    # that followed the segment, so edges can be annotated too
+    frames = []
+    for directory in pre_eff.demo_directories(path):
+        for demo_file, trajectory_file in SIDES.items():
+            demo_path, trajectory_path = os.path.join(directory, demo_file), os.path.join(directory, trajectory_file)
+            if not (os.path.exists(demo_path) and os.path.exists(trajectory_path)):
+                continue
+            frame = activity_statistics(demo_path, trajectory_path, threshold)
+            frame['next'] = frame['activity'].shift(-1)
+            frames.append(frame)
+    columns = ['activity', 'next', 'start', 'stop', 'samples', 'duration', 'path_length', 'peak_speed']
+    return pd.concat(frames, ignore_index=True)[columns] if frames else pd.DataFrame(columns=columns)
+
+
+def annotate_graph(graph, statistics):
+    # mean duration and path length and the highest peak speed per activity on the nodes, and the same for the source
+    # segments of every observed transition on the edges
+    aggregation = {'duration': 'mean', 'path_length': 'mean', 'peak_speed': 'max', 'samples': 'sum'}
+    measured = statistics.dropna(subset=['duration'])
+    for activity, row in measured.groupby('activity').agg(aggregation).iterrows():
+        if activity in graph:
+            graph.nodes[activity].update(row.to_dict(), samples=int(row['samples']))
+    transitions = measured.dropna(subset=['next'])
+    for (u, v), row in transitions.groupby(['activity', 'next']).agg(aggregation).iterrows():
+        if graph.has_edge(u, v):
+            graph.edges[u, v].update(row.to_dict(), samples=int(row['samples']))
+    return graph
+
+
+if __name__ == "__main__":
+    path = sys.argv[1:] or 'data/13_demos'
+    statistics = demo_statistics(path)
+    if statistics['duration'].isna().all():
+        print("No trajectory samples recorded for", path)
+    else:
+        print(statistics.groupby('activity')[['duration', 'path_length', 'peak_speed']].mean())
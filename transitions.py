@@ -0,0 +1,113 @@
+import os
+import sys
+import networkx as nx
+import numpy as np
+import pandas as pd
+from pre_eff import ActivityProcessor, demo_directories, read_data, run_starts
+
+
+class TransitionCounter:
+    # activity -> activity transition counts over the run sequences of the demo files, the weights task_graph.txt is
+    # exported with. Counts are kept as state, so adding (or removing) one demo costs O(demo length)
+    def __init__(self):
+        self.activities = {}
+        self.names = []
+        self.counts = {}
+
+    @classmethod
+    def from_paths(cls, path):
+        # every demo file of a directory or a list of them, as ActivityProcessor reads them
+        counter = cls()
+        for directory in demo_directories(path):
+            for file_name in ActivityProcessor.demo_files:
+                file_path = os.path.join(directory, file_name)
+                if os.path.exists(file_path):
+                    counter.add_file(file_path)
+        return counter
+
+    def _ids(self, names):
+        ids = np.empty(len(names), dtype=np.int64)
+        for i, name in enumerate(names):
+            activity_id = self.activities.get(name)
+            if activity_id is None:
+                activity_id = self.activities[name] = len(self.names)
+                self.names.append(name)
+            ids[i] = activity_id
+        return ids
+
+    def add_sequence(self, activities, sign=1):
+        # counts the transitions between consecutive runs of activities; sign=-1 takes a demo back out. Returns
+        # {(u, v): new count} of the transitions it touched, a count of 0 meaning the transition is gone
+        # work on integer codes: the categorical codes read_data already has, or a hash factorization
+        if isinstance(activities, pd.Series):
+            activities = activities.array
+        if isinstance(activities, pd.Categorical):
+            codes, uniques = activities.codes, activities.categories
+        else:
+            codes, uniques = pd.factorize(np.asarray(activities, dtype=object))
+        uniques = list(uniques)
+        if 'UnknownActivity' in uniques:
+            codes = codes[codes != uniques.index('UnknownActivity')]
+        codes = codes[run_starts(codes)]
+        if len(codes) < 2:
+            return {}
+        sequence = self._ids(uniques)[codes]
+
+        # every adjacent pair as one int64 key, counted at once in order of first occurrence
+        stride = np.int64(len(self.names))
+        pairs = sequence[:-1] * stride + sequence[1:]
+        keys, first, counts = np.unique(pairs, return_index=True, return_counts=True)
+        order = np.argsort(first, kind='stable')
+
+        changes = {}
+        for key, count in zip(keys[order].tolist(), counts[order].tolist()):
+            u, v = divmod(key, int(stride))
+            edge = (self.names[u], self.names[v])
+            total = self.counts.get(edge, 0) + sign * count
+            if total > 0:
+                self.counts[edge] = total
+            else:
+                self.counts.pop(edge, None)
+                total = 0
+            changes[edge] = total
+        return changes
+
+    def add_file(self, file_path, sign=1):
+        return self.add_sequence(read_data(file_path)['Activity'], sign)
+
+    def remove_file(self, file_path):
+        return self.add_file(file_path, sign=-1)
+
+    def graph(self):
+        # a DiGraph shaped like parse_graph's output: nodes in order of first appearance, weighted edges grouped by
+        # source in the order they were first seen
+        edges = {}
+        endpoints = set()
+        for (u, v), count in self.counts.items():
+            edges.setdefault(u, []).append((v, count))
+            endpoints.add(u)
+            endpoints.add(v)
+        graph = nx.DiGraph()
+        graph.add_nodes_from(name for name in self.names if name in endpoints)
+        for source in list(graph):
+            graph.add_edges_from((source, v, {'weight': count}) for v, count in edges.get(source, ()))
+        return graph
+
+
+def update_graph(graph, changes):
+    # applies the {(u, v): count} returned by add_sequence/add_file to a graph built from the same counter; the graph
+    # version is bumped so cached queries on it are not reused
+    if changes:
+        graph.graph['version'] = graph.graph.get('version', 0) + 1
+    for (u, v), count in changes.items():
+        if count:
+            graph.add_edge(u, v, weight=count)
+        elif graph.has_edge(u, v):
+            graph.remove_edge(u, v)
+    return graph
+
+
+if __name__ == "__main__":
+    counter = TransitionCounter.from_paths(sys.argv[1:] or 'data/13_demos')
+    for (u, v), count in counter.counts.items():
+        print(f"{u} -> {v}: {count}")
@@ -1,47 +1,52 @@
-import networkx as nx
+import logging
 import numpy as np
-import random
+import heapq
+from collections import OrderedDict, deque
+import profiling
+from jobs import checkpoint
+from csr import CSRGraph
+import csr
+from rich_index import RichIndex, as_list
+from sampler import monte_carlo_widest_path
 
-def match(precondition, effect):
-    for key in precondition:
-        if not isinstance(precondition[key], list):
-            precondition[key] = [precondition[key]]
-    for key in effect:
-        if not isinstance(effect[key], list):
-            effect[key] = [effect[key]]
 
+logger = logging.getLogger(__name__)
+
+
+def match(precondition, effect):
     for key, precondition_values in precondition.items():
-        if key in effect:
-            effect_values = effect[key]
-            if not any(value in effect_values for value in precondition_values):
-                return False
-        else:
+        if key not in effect:
+            return False
+        effect_values = as_list(effect[key])
+        if not any(value in effect_values for value in as_list(precondition_values)):
             return False
     return True
 
 
+@profiling.stage('refine_graph')
 def refine_graph(graph, rich_info):
-    refined_graph = nx.DiGraph()
-    for node in graph.nodes:
-        refined_graph.add_node(node)
-
-    for u, v, data in graph.edges(data=True):
-        if u in rich_info and v in rich_info:
-            if 'effect' in rich_info[u] and 'precondition' in rich_info[v]:
-                eff = rich_info[u]['effect']
-                pre = rich_info[v]['precondition']
-                if match(pre, eff):
-                    refined_graph.add_edge(u, v, weight=data['weight'])
-                else:
-                    print("=======================================")
-                    print("Remove edge due to mismatch")
-                    print("Current node: ", u)
-                    print("effect: ", eff)
-                    print("neighbor: ", v)
-                    print("precondition: ", pre)
-                    print("=======================================")
-        else:
-            print(f"Removing edge ({u}, {v}) as one or both nodes are not in rich_info.")
+    # checks run on the CSR arrays of graph, rich info is looked up once per node rather than once per edge; a
+    # CSRGraph is refined into a CSRGraph, a networkx graph into a DiGraph. Callers running several of the functions
+    # below on one graph convert it once with CSRGraph.from_networkx and pass that
+    arrays = graph if isinstance(graph, CSRGraph) else CSRGraph.from_networkx(graph)
+    index = RichIndex(rich_info)
+    node_ids = index.ids(arrays.names)
+    sources = arrays.sources()
+    compatible = index.compatible_ids(node_ids[sources], node_ids[arrays.targets])
+    refined = arrays.edge_subgraph(compatible)
+    refined_graph = refined if isinstance(graph, CSRGraph) else refined.to_networkx()
+
+    # removals are logged at debug level, as Refiner.refine does, rather than printed for every edge
+    if logger.isEnabledFor(logging.DEBUG):
+        names = arrays.names
+        for u, v in zip(sources[~compatible].tolist(), arrays.targets[~compatible].tolist()):
+            u, v = names[u], names[v]
+            if u in rich_info and v in rich_info:
+                if 'effect' in rich_info[u] and 'precondition' in rich_info[v]:
+                    logger.debug("Removing edge (%s, %s): effect %s does not satisfy precondition %s.",
+                                 u, v, rich_info[u]['effect'], rich_info[v]['precondition'])
+            else:
+                logger.debug("Removing edge (%s, %s) as one or both nodes are not in rich_info.", u, v)
     return refined_graph
 
 
@@ -70,47 +75,274 @@ def modify_file(file_path):
         file.writelines(corrected_lines)
 
 
+def adjacency_matrix(graph, format='csr', dtype=None):
+    # sparse weight matrix of graph (networkx or CSRGraph) built from the CSR arrays in one pass, with the node of
+    # every row and column: matrix[i, j] is the weight of nodes[i] -> nodes[j]. Needs scipy
+    arrays = graph if isinstance(graph, CSRGraph) else CSRGraph.from_networkx(graph)
+    return arrays.to_sparse(format, dtype), arrays.names
+
+
 def nx_to_matrix(graph):
-    nodes = list(graph.nodes())
-    num_nodes = len(nodes)
-    node_to_index = {node: index for index, node in enumerate(nodes)}
+    # dense weight matrix in node order, n x n floats, so only for small graphs; adjacency_matrix scales
+    arrays = graph if isinstance(graph, CSRGraph) else CSRGraph.from_networkx(graph)
+    matrix = np.zeros((arrays.number_of_nodes(), arrays.number_of_nodes()))
+    matrix[arrays.sources(), arrays.targets] = arrays.weights
+    return matrix
 
-    matrix = np.zeros((num_nodes, num_nodes))
 
-    for edge in graph.edges(data=True):
-        source, target, data = edge
-        source_index = node_to_index[source]
-        target_index = node_to_index[target]
-        matrix[source_index][target_index] = data['weight']
+@profiling.stage('widest_path')
+def widest_path(graph, start_node, end_node):
+    # max-min variant of Dijkstra: always expand the node reachable through the widest bottleneck so far
+    if isinstance(graph, CSRGraph):
+        return csr.widest_path(graph, start_node, end_node)
+    best_width = {start_node: np.inf}
+    previous = {start_node: None}
+    done = set()
+    heap = [(-np.inf, 0, start_node)]
+    counter = 1
+    while heap:
+        neg_width, _, current_node = heapq.heappop(heap)
+        if current_node in done:
+            continue
+        if current_node == end_node:
+            path = []
+            while current_node is not None:
+                path.append(current_node)
+                current_node = previous[current_node]
+            return path[::-1], -neg_width
+        done.add(current_node)
+        for neighbor, data in graph[current_node].items():
+            if 'weight' not in data or neighbor in done:
+                continue
+            width = min(-neg_width, data['weight'])
+            if width > best_width.get(neighbor, -np.inf):
+                best_width[neighbor] = width
+                previous[neighbor] = current_node
+                heapq.heappush(heap, (-width, counter, neighbor))
+                counter += 1
+    return None, -np.inf
 
-    return matrix
+
+def _weights(graph, reverse=False):
+    # the weighted edges as plain {u: {v: weight}} dicts, much cheaper to walk than graph views in the searches below
+    if isinstance(graph, CSRGraph):
+        arrays = graph.reverse() if reverse else graph
+        names = arrays.names
+        indptr, targets, weights = arrays.lists()
+        return {u: {names[targets[j]]: weights[j] for j in range(indptr[i], indptr[i + 1])}
+                for i, u in enumerate(names)}
+    adjacency = graph.pred if reverse and graph.is_directed() else graph.adj
+    return {u: {v: data['weight'] for v, data in neighbors.items() if 'weight' in data}
+            for u, neighbors in adjacency.items()}
+
+
+def _widest(weights, start_node, end_node=None, ignore_nodes=(), ignore_edges=()):
+    # widest_path's search, returning the best bottleneck of every node it settled; it stops once end_node is settled
+    best_width = {start_node: np.inf}
+    done = set(ignore_nodes)
+    heap = [(-np.inf, 0, start_node)]
+    counter = 1
+    while heap:
+        neg_width, _, current_node = heapq.heappop(heap)
+        if current_node in done:
+            continue
+        if current_node == end_node:
+            break
+        done.add(current_node)
+        for neighbor, weight in weights[current_node].items():
+            if neighbor in done or (current_node, neighbor) in ignore_edges:
+                continue
+            width = min(-neg_width, weight)
+            if width > best_width.get(neighbor, -np.inf):
+                best_width[neighbor] = width
+                heapq.heappush(heap, (-width, counter, neighbor))
+                counter += 1
+    return best_width
 
 
-def monte_carlo_widest_path(graph, start_node, end_node, iterations=3000, randomness_factor=0.2):
-    best_path = None
-    best_min_width = -np.inf
-    for _ in range(iterations):
-        path = [start_node]
-        visited = set([start_node])
-        current_node = start_node
-        min_width = np.inf
-
-        while current_node != end_node:
-            next_nodes = [n for n, d in graph[current_node].items() if 'weight' in d and n not in visited]
-            if len(next_nodes) == 0:
-                break
-            if random.random() < randomness_factor:
-                chosen_node = random.choice(next_nodes)
+def _fewest_edges(weights, start_node, end_node, width, ignore_nodes, ignore_edges, bounds):
+    # A* over the edges at least width wide, bounds holding the widest bottleneck and a lower bound on the edges left
+    # from every node to end_node; nodes that cannot reach end_node that wide are not entered
+    widths, hops = bounds
+    distance = {start_node: 0}
+    previous = {start_node: None}
+    done = set(ignore_nodes)
+    heap = [(hops.get(start_node, 0), 0, start_node)]
+    counter = 1
+    while heap:
+        _, _, current_node = heapq.heappop(heap)
+        if current_node in done:
+            continue
+        if current_node == end_node:
+            path = []
+            while current_node is not None:
+                path.append(current_node)
+                current_node = previous[current_node]
+            return path[::-1]
+        done.add(current_node)
+        for neighbor, weight in weights[current_node].items():
+            if (weight < width or neighbor in done or widths.get(neighbor, -np.inf) < width
+                    or (current_node, neighbor) in ignore_edges):
+                continue
+            if distance[current_node] + 1 < distance.get(neighbor, np.inf):
+                distance[neighbor] = distance[current_node] + 1
+                previous[neighbor] = current_node
+                heapq.heappush(heap, (distance[neighbor] + hops[neighbor], counter, neighbor))
+                counter += 1
+    return None
+
+
+def _bounds_to(weights, reverse_weights, end_node):
+    # widest bottleneck and fewest edges from every node to end_node over the whole graph, no spur path does better
+    width = _widest(reverse_weights, end_node)
+    hops = {end_node: 0}
+    queue = deque([end_node])
+    while queue:
+        current_node = queue.popleft()
+        for neighbor in reverse_weights[current_node]:
+            if neighbor not in hops:
+                hops[neighbor] = hops[current_node] + 1
+                queue.append(neighbor)
+    return width, hops
+
+
+def _spur_width(weights, start_node, end_node, cap, ignore_nodes, ignore_edges, bounds, floor=-np.inf):
+    # bottleneck of the widest path, capped, searched best first on the width it could still reach through a node and
+    # then on the edges it needs at least, so the search heads for end_node instead of settling the whole graph. Paths
+    # narrower than floor are not followed
+    widths, hops = bounds
+    best_width = {start_node: cap}
+    distance = {start_node: 0}
+    done = set(ignore_nodes)
+    heap = [(-min(cap, widths.get(start_node, -np.inf)), hops.get(start_node, 0), 0, start_node)]
+    counter = 1
+    while heap:
+        _, _, _, current_node = heapq.heappop(heap)
+        if current_node in done:
+            continue
+        if current_node == end_node:
+            return best_width[end_node]
+        done.add(current_node)
+        for neighbor, weight in weights[current_node].items():
+            if neighbor in done or neighbor not in hops or (current_node, neighbor) in ignore_edges:
+                continue
+            width = min(best_width[current_node], weight)
+            if width > best_width.get(neighbor, -np.inf) and min(width, widths[neighbor]) >= floor:
+                best_width[neighbor] = width
+                distance[neighbor] = distance[current_node] + 1
+                heapq.heappush(heap, (-min(width, widths[neighbor]), distance[neighbor] + hops[neighbor], counter,
+                                      neighbor))
+                counter += 1
+    return -np.inf
+
+
+@profiling.stage('k_widest_paths')
+def k_widest_paths(graph, start_node, end_node, k):
+    # Yen's algorithm over loopless paths ranked by bottleneck width, then by number of edges. Every spur path is the
+    # fewest-edge one among the widest left by its root path, so each deviation yields the best path it can; as in
+    # Lawler's variant a path only spurs from where it left its parent. The width bound of every spur node (the widest
+    # bottleneck to end_node in the whole graph) is tried first, which most spurs reach; the spurs that do not need a
+    # widest search, which is skipped once enough queued candidates are already better
+    if k < 1 or start_node not in graph or end_node not in graph:
+        return []
+    weights = _weights(graph)
+    checkpoint()
+    bounds = _bounds_to(weights, _weights(graph, reverse=True), end_node)
+    widths, hops = bounds
+    checkpoint()
+    width = _spur_width(weights, start_node, end_node, np.inf, (), (), bounds)
+    if width == -np.inf:
+        return []
+    paths = [(_fewest_edges(weights, start_node, end_node, width, (), (), bounds), width)]
+    seen = {tuple(paths[0][0])}
+    candidates = []
+    deviation = 0
+
+    def worst_needed():
+        # rank of the last candidate that would still make it into the k paths, None while there are too few
+        needed = k - len(paths)
+        return heapq.nsmallest(needed, candidates)[-1][:2] if len(candidates) >= needed else None
+
+    def push(root, spur, width, i):
+        candidate = root[:-1] + spur
+        if tuple(candidate) not in seen:
+            seen.add(tuple(candidate))
+            heapq.heappush(candidates, (-width, len(candidate), len(seen), i, candidate))
+
+    while len(paths) < k:
+        checkpoint()
+        last_path = paths[-1][0]
+        root_width = np.inf
+        for u, v in zip(last_path[:deviation], last_path[1:deviation + 1]):
+            root_width = min(root_width, weights[u][v])
+        narrower = []
+        for i in range(deviation, len(last_path) - 1):
+            checkpoint()
+            spur_node = last_path[i]
+            root = last_path[:i + 1]
+            if i > deviation:
+                root_width = min(root_width, weights[last_path[i - 1]][spur_node])
+            bound = min(root_width, widths[spur_node])
+            worst = worst_needed()
+            if worst is not None and worst <= (-bound, i + 1 + hops[spur_node]):
+                continue
+            ignore_edges = {(p[i], p[i + 1]) for p, _ in paths if len(p) > i + 1 and p[:i + 1] == root}
+            spur = _fewest_edges(weights, spur_node, end_node, bound, root[:-1], ignore_edges, bounds)
+            if spur is None:
+                narrower.append((i, root, root_width, ignore_edges, bound))
             else:
-                widths = [graph[current_node][n]['weight'] for n in next_nodes]
-                max_width_index = np.argmax(widths)
-                chosen_node = next_nodes[max_width_index]
-            min_width = min(min_width, graph[current_node][chosen_node]['weight'])
-            current_node = chosen_node
-            path.append(current_node)
-            visited.add(current_node)
-
-        if current_node == end_node and min_width > best_min_width:
-            best_path = path
-            best_min_width = min_width
-    return best_path, best_min_width
\ No newline at end of file
+                push(root, spur, bound, i)
+
+        for i, root, root_width, ignore_edges, bound in narrower:
+            checkpoint()
+            worst = worst_needed()
+            if worst is not None and -worst[0] >= bound:
+                continue
+            floor = -worst[0] if worst is not None else -np.inf
+            width = _spur_width(weights, root[-1], end_node, root_width, root[:-1], ignore_edges, bounds, floor)
+            if width != -np.inf:
+                spur = _fewest_edges(weights, root[-1], end_node, width, root[:-1], ignore_edges, bounds)
+                push(root, spur, width, i)
+        if not candidates:
+            break
+        neg_width, _, _, deviation, path = heapq.heappop(candidates)
+        paths.append((path, -neg_width))
+    return paths
+
+
+class PathCache:
+    # LRU cache of k_widest_paths answers keyed by (graph version, start, end, k). Graphs edited in place carry a
+    # version in graph.graph['version']; a different graph object (Refine and Recover swap G) empties the cache. A
+    # CSRGraph is never edited, so it has no version
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.graph = None
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        self.graph = None
+        self.entries.clear()
+
+    def get(self, graph, start_node, end_node, k):
+        if graph is not self.graph:
+            self.clear()
+            self.graph = graph
+        version = None if isinstance(graph, CSRGraph) else graph.graph.get('version')
+        key = (version, start_node, end_node, k)
+        paths = self.entries.get(key)
+        if paths is None:
+            # a query with a larger k, or one that ran out of paths, answers this one too
+            paths = next((found[:k] for (v, s, e, n), found in self.entries.items()
+                          if (v, s, e) == key[:3] and (n >= k or len(found) < n)), None)
+        if paths is None:
+            self.misses += 1
+            paths = k_widest_paths(graph, start_node, end_node, k)
+        else:
+            self.hits += 1
+        self.entries[key] = paths
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return paths